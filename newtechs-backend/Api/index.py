@@ -4,7 +4,15 @@ import os
 import sys
 
 # Add the src directory to the path
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'newtechs-backend', 'src'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+# Each invocation is short-lived; don't keep pooled connections around
+os.environ.setdefault('DATABASE_PROFILE', 'serverless')
+# Cold starts don't precompress static files; the .gz/.br variants are built at
+# deploy time with flask --app src.main precompress-static
+os.environ.setdefault('STATIC_PRECOMPRESS', 'off')
+# The schema is created at deploy time (flask --app src.main init-db), not per cold start;
+# APP_BLUEPRINTS limits the blueprints loaded, e.g. user,blog,engagement
 
 from main import create_app
 
@@ -0,0 +1,94 @@
+"""Check the single-pass HTML cleaner against the golden corpus and time it.
+
+Every cleaner_corpus/<name>.html must clean to cleaner_corpus/<name>.expected.html
+(the output of the previous regex-per-pass cleaner, kept below as
+legacy_clean_html_content). Then both cleaners are timed per post, and their
+peak traced memory is reported, for the corpus, a long post and a code-heavy
+post that makes the old patterns go quadratic.
+
+Usage: python benchmarks/cleaner_benchmark.py
+"""
+import glob
+import os
+import re
+import sys
+import timeit
+import tracemalloc
+from html import unescape
+
+import common  # noqa: F401 (puts the backend on sys.path)
+from src.services.blogger_import import clean_html_content
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cleaner_corpus')
+
+def legacy_clean_html_content(html_content):
+    """The previous cleaner: twelve regex passes over the whole post"""
+    if not html_content:
+        return ""
+    content = unescape(html_content)
+    content = re.sub(r'style="[^"]*"', '', content)
+    content = re.sub(r'class="[^"]*"', '', content)
+    content = re.sub(r'data-[^=]*="[^"]*"', '', content)
+    content = re.sub(r'<div[^>]*>', '<div>', content)
+    content = re.sub(r'<span[^>]*>', '<span>', content)
+    content = re.sub(r'<p[^>]*>', '<p>', content)
+    content = re.sub(r'https://blogger\.googleusercontent\.com/img/[^"]*', '', content)
+    content = re.sub(r'<(\w+)[^>]*>\s*</\1>', '', content)
+    content = re.sub(r'<(\w+)[^>]*>\s*<br\s*/?\s*>\s*</\1>', '', content)
+    content = re.sub(r'\s+', ' ', content)
+    content = re.sub(r'>\s+<', '><', content)
+    return content.strip()
+
+def load_corpus():
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, '*.html'))):
+        if path.endswith('.expected.html'):
+            continue
+        with open(path) as source, open(path[:-len('.html')] + '.expected.html') as expected:
+            corpus.append((os.path.basename(path), source.read(), expected.read().rstrip('\n')))
+    return corpus
+
+def check_golden(corpus):
+    failures = [name for name, source, expected in corpus if clean_html_content(source) != expected]
+    for name in failures:
+        print(f"MISMATCH {name}")
+    print(f"golden corpus: {len(corpus) - len(failures)}/{len(corpus)} match")
+    return not failures
+
+def measure(cleaner, posts, number):
+    """Best-of-5 microseconds per post, and peak traced KiB for one pass"""
+    best = min(timeit.repeat(lambda: [cleaner(post) for post in posts], number=number, repeat=5))
+    per_post = best / (number * len(posts)) * 1e6
+
+    tracemalloc.start()
+    for post in posts:
+        cleaner(post)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return per_post, peak / 1024
+
+def main():
+    corpus = load_corpus()
+    ok = check_golden(corpus)
+
+    posts = [source for _, source, _ in corpus]
+    long_post = ''.join(posts) * 10
+    # Code samples unescape to text full of '<' with no matching '>'; the old
+    # `<(\w+)[^>]*>` patterns rescan to the end of the post at each of them
+    code_post = '<pre>' + 'for (i = 0; i<n; i++) { total += a[i]; }\n' * 2000 + '</pre>'
+
+    workloads = [
+        ('corpus posts', posts, 200),
+        (f'long post ({len(long_post) // 1024} KiB)', [long_post], 20),
+        (f'code post ({len(code_post) // 1024} KiB)', [code_post], 1)
+    ]
+    print(f"{'workload':<22} {'cleaner':<8} {'us/post':>12} {'peak KiB':>10}")
+    for label, workload, number in workloads:
+        for name, cleaner in [('legacy', legacy_clean_html_content), ('single', clean_html_content)]:
+            per_post, peak = measure(cleaner, workload, number)
+            print(f"{label:<22} {name:<8} {per_post:>12.1f} {peak:>10.0f}")
+
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
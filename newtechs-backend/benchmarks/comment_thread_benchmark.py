@@ -0,0 +1,77 @@
+"""Check that GET /api/comments/<post_id> costs a constant number of queries.
+
+Seeds posts with 10, 100 and 1,000 comment threads (a mix of top-level
+comments, nested replies and some spam), counts the SQL statements each
+request runs and times it. Exits with status 1 if the query count grows
+with the thread size.
+
+Usage: python benchmarks/comment_thread_benchmark.py [per_page]   (default: 20)
+"""
+import random
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from common import make_app, seed_posts, timed, cleanup
+from src.models.user import db
+from src.models.blog import Comment
+
+THREAD_SIZES = [10, 100, 1000]
+
+def seed_thread(post_id, size, seed):
+    rng = random.Random(seed)
+    start = datetime.utcnow() - timedelta(days=30)
+    comments = []
+    for i in range(size):
+        parent = rng.choice(comments) if comments and rng.random() < 0.7 else None
+        comments.append(Comment(
+            id=f'{post_id}-{i}',
+            post_id=post_id,
+            parent_id=parent.id if parent else None,
+            author_name=f'Reader {i % 40}',
+            content=f'Comment {i} on post {post_id}',
+            status='spam' if rng.random() < 0.05 else 'approved',
+            created_at=start + timedelta(minutes=i)
+        ))
+    db.session.add_all(comments)
+
+def main():
+    per_page = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    app = make_app()
+    try:
+        seed_posts(app, len(THREAD_SIZES))
+        with app.app_context():
+            for post_id, size in enumerate(THREAD_SIZES, start=1):
+                seed_thread(post_id, size, seed=post_id)
+            db.session.commit()
+            engines = list(db.engines.values())  # Primary and read-only pool
+
+        client = app.test_client()
+        statements = []
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+        query_counts = []
+        print(f"{'comments':>9} {'queries':>8} {'returned':>9} {'p50':>9} {'p95':>9}")
+        for post_id, size in enumerate(THREAD_SIZES, start=1):
+            url = f'/api/comments/{post_id}?per_page={per_page}'
+            del statements[:]
+            data = client.get(url).get_json()
+            query_counts.append(len(statements))
+
+            def count(comments):
+                return sum(1 + count(comment['replies']) for comment in comments)
+
+            p50, p95 = timed(lambda: client.get(url))
+            print(f"{size:>9} {query_counts[-1]:>8} {count(data['comments']):>9} {p50:>7.1f}ms {p95:>7.1f}ms")
+    finally:
+        cleanup(app)
+
+    if len(set(query_counts)) != 1:
+        print(f"FAIL: query count grows with thread size: {query_counts}")
+        sys.exit(1)
+    print(f"ok: {query_counts[0]} queries per request for every thread size")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Shared helpers for the benchmark scripts in this folder"""
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import text
+from src.models.user import db
+from src.services.database import init_database
+from src.models.blog import Blog, Post, Category, Author  # noqa: F401 (registers models)
+from src.routes.blog import blog_bp
+from src.routes.engagement import engagement_bp
+from src.routes.migration import migration_bp
+
+WORDS = (
+    "cloud crypto bitcoin ethereum gadget review android iphone laptop network "
+    "security privacy startup funding gambia africa mobile money blockchain wallet "
+    "processor battery camera display software update release launch market price "
+    "analysis insight community developer python javascript server database cache"
+).split()
+
+# Zipf-like vocabulary so term frequencies look like real prose
+VOCABULARY = WORDS + [f"term{i}" for i in range(20000)]
+CUM_WEIGHTS = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(VOCABULARY))))
+
+def make_app(db_path=None):
+    """Build a Flask app with the API blueprints on a throwaway SQLite file"""
+    if db_path is None:
+        fd, db_path = tempfile.mkstemp(suffix='.db', prefix='newtechs-bench-')
+        os.close(fd)
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.register_blueprint(blog_bp, url_prefix='/api')
+    app.register_blueprint(migration_bp, url_prefix='/api')
+    app.register_blueprint(engagement_bp)
+    init_database(app)
+    with app.app_context():
+        db.create_all()
+    app.config['BENCH_DB_PATH'] = db_path
+    return app
+
+def random_text(rng, words):
+    return ' '.join(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=words))
+
+def seed_posts(app, count, blogs=7, content_words=150, same_title=None, seed=42):
+    """Insert `count` synthetic posts spread over `blogs` blogs"""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    with app.app_context():
+        if not Blog.query.count():
+            db.session.add_all([Blog(name=f'Blog {i}', slug=f'blog-{i}', title=f'Blog {i}') for i in range(blogs)])
+            db.session.add(Author(name='Bench'))
+            db.session.commit()
+
+        start = db.session.execute(text("SELECT COALESCE(MAX(id), 0) FROM posts")).scalar()
+        batch = []
+        for i in range(start + 1, start + count + 1):
+            title = same_title or f"{random_text(rng, 6)} {i}"
+            batch.append({
+                'title': title,
+                'slug': f"post-{i}",
+                'content': f"<p>{random_text(rng, content_words)}</p>",
+                'excerpt': random_text(rng, 25),
+                'status': 'published',
+                'blog_id': (i % blogs) + 1,
+                'author_id': 1,
+                'views': rng.randint(0, 5000),
+                'is_featured': i % 50 == 0,
+                'published_at': now - timedelta(minutes=i),
+                'created_at': now,
+                'updated_at': now
+            })
+            if len(batch) >= 5000:
+                db.session.execute(Post.__table__.insert(), batch)
+                batch = []
+        if batch:
+            db.session.execute(Post.__table__.insert(), batch)
+        db.session.commit()
+
+def timed(func, repeat=20):
+    """Return (median, p95) wall time of func() in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2], samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+def cleanup(app):
+    path = app.config.get('BENCH_DB_PATH')
+    for suffix in ('', '-wal', '-shm'):
+        if path and os.path.exists(path + suffix):
+            os.remove(path + suffix)
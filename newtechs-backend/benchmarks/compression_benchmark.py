@@ -0,0 +1,102 @@
+"""Response sizes and request times with negotiated compression, per payload.
+
+Each payload is requested through the test client:
+
+  identity     no Accept-Encoding, the body goes out as built
+  gzip/cold    Accept-Encoding: gzip with the compressed-body cache emptied first
+  gzip/cached  the same request once its compressed body is cached by ETag
+
+Post pages embed the live view count, so every view changes their body and
+they are compressed on each request. Brotli rows are added when brotli is
+installed. The last rows compare index.html as stored with its precompressed
+static variants.
+
+Usage: python benchmarks/compression_benchmark.py [post_count] [body_kb]   (default: 2000 100)
+"""
+import gzip
+import sys
+import tempfile
+
+from common import make_app, seed_posts, timed, cleanup
+from src.models.user import db
+from src.models.blog import Post
+from src.models.search import ensure_search_index
+from src.services.compression import (response_compression, available_encodings, compress, precompress_static,
+                                      STATIC_LEVELS)
+from src.services.json_provider import init_json
+
+INDEX_HTML = '<!doctype html><html><head><title>NewTechs</title></head><body><div id="root"></div>' + \
+             ''.join(f'<script type="module" src="/assets/chunk-{i}.js"></script>' for i in range(150)) + \
+             '</body></html>'
+
+def main():
+    post_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    body_kb = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    app = make_app()
+    init_json(app)
+    app.config['MAX_PER_PAGE'] = 100
+    response_compression.init_app(app)
+    try:
+        seed_posts(app, post_count)
+        seed_posts(app, 1, content_words=body_kb * 1024 // 7, seed=7)  # One long post, about 7 characters a word
+        with app.app_context():
+            ensure_search_index()
+            long_post = db.session.get(Post, db.session.query(db.func.max(Post.id)).scalar())
+            post_url = f'/api/blogs/{long_post.blog.slug}/posts/{long_post.slug}'
+            db.session.remove()
+
+        payloads = [
+            ('blogs', '/api/blogs'),
+            ('listing', '/api/blogs/blog-1/posts?per_page=100'),
+            ('search', '/api/search?q=bitcoin&per_page=50'),
+            ('post page', post_url),
+        ]
+        client = app.test_client()
+        encodings = available_encodings()
+        print(f"{post_count} posts; post page body ~{body_kb} KB; codings: {', '.join(encodings)}")
+        print(f"{'payload':<11}{'mode':<14}{'body':>10}{'ratio':>8}{'p50':>10}{'p95':>10}")
+        for name, url in payloads:
+            identity = client.get(url)
+            if identity.status_code != 200:
+                raise RuntimeError(f'{url} returned {identity.status_code}')
+            size = len(identity.get_data())
+            p50, p95 = timed(lambda: client.get(url))
+            print(f"{name:<11}{'identity':<14}{size / 1024:>8.1f}KB{1:>8.2f}{p50:>8.2f}ms{p95:>8.2f}ms")
+
+            for encoding in reversed(encodings):
+                headers = {'Accept-Encoding': encoding}
+                response = client.get(url, headers=headers)
+                if response.headers.get('Content-Encoding') != encoding:
+                    raise RuntimeError(f'{url} was not answered with {encoding}')
+                if encoding == 'gzip' and len(gzip.decompress(response.get_data())) != size:
+                    raise RuntimeError(f'{url}: gzip body does not decompress to the identity body')
+                compressed = len(response.get_data())
+
+                def cold():
+                    response_compression.cache.clear()
+                    client.get(url, headers=headers)
+
+                p50, p95 = timed(cold)
+                print(f"{'':<11}{encoding + '/cold':<14}{compressed / 1024:>8.1f}KB{compressed / size:>8.2f}"
+                      f"{p50:>8.2f}ms{p95:>8.2f}ms")
+                client.get(url, headers=headers)
+                p50, p95 = timed(lambda: client.get(url, headers=headers))
+                print(f"{'':<11}{encoding + '/cached':<14}{compressed / 1024:>8.1f}KB{compressed / size:>8.2f}"
+                      f"{p50:>8.2f}ms{p95:>8.2f}ms")
+
+        with tempfile.TemporaryDirectory() as folder:
+            with open(f'{folder}/index.html', 'w') as f:
+                f.write(INDEX_HTML)
+            data = INDEX_HTML.encode('utf-8')
+            p50, _ = timed(lambda: precompress_static(folder), repeat=5)  # Fresh variants are skipped
+            print(f"{'index.html':<11}{'identity':<14}{len(data) / 1024:>8.1f}KB{1:>8.2f}")
+            for encoding in reversed(encodings):
+                variant = compress(data, encoding, STATIC_LEVELS[encoding])
+                print(f"{'':<11}{encoding + ' variant':<14}{len(variant) / 1024:>8.1f}KB{len(variant) / len(data):>8.2f}")
+            print(f"precompress_static() rerun on a built folder: {p50:.2f}ms")
+    finally:
+        cleanup(app)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Peak memory of one 100-post listing page when post bodies are large.
+
+Every scenario runs in a fresh interpreter against the same database:
+
+  full      the listing as it was built before content was deferred: whole
+            Post rows, bodies included, serialized with to_dict()
+  deferred  GET /api/blogs/<slug>/posts, which never selects content
+
+Peak RSS is the process high-water mark (ru_maxrss) once the page is built;
+growth is that peak minus the high-water mark after a one-post warm-up page.
+Linux carries the high-water mark across exec, so the database is seeded in a
+child process too and this one never grows past a few MB.
+
+Usage: python benchmarks/listing_memory_benchmark.py [body_kb] [per_page]   (default: 200 100)
+"""
+import json
+import os
+import resource
+import subprocess
+import sys
+
+BLOG_SLUG = 'blog-0'
+SCENARIOS = ['full', 'deferred']
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+
+def run_once(scenario, db_path, per_page):
+    """Child process: build the page once and print the memory figures as JSON"""
+    from flask import jsonify
+    from sqlalchemy.orm import undefer
+    from common import make_app
+    from src.models.blog import Post, post_listing_options
+
+    app = make_app(db_path)
+    app.config['MAX_PER_PAGE'] = per_page
+    client = app.test_client()
+    url = f'/api/blogs/{BLOG_SLUG}/posts?per_page='
+    client.get(url + '1')
+    warm = peak_rss_mb()
+
+    if scenario == 'full':
+        with app.test_request_context():
+            posts = (Post.query.filter_by(blog_id=1, status='published')
+                     .options(undefer(Post.content), *post_listing_options())
+                     .order_by(Post.published_at.desc()).limit(per_page).all())
+            body = jsonify({'success': True, 'posts': [post.to_dict() for post in posts]}).get_data()
+    else:
+        response = client.get(url + str(per_page))
+        if response.status_code != 200:
+            raise RuntimeError(f'{url}{per_page} returned {response.status_code}')
+        body = response.get_data()
+
+    print(json.dumps({'warm': warm, 'peak': peak_rss_mb(), 'posts': len(json.loads(body)['posts']), 'bytes': len(body)}))
+
+def prepare(body_kb, per_page):
+    """Child process: seed a throwaway database and print its path"""
+    from common import make_app, seed_posts
+
+    app = make_app()
+    # About 7 characters per generated word
+    seed_posts(app, per_page * 2, blogs=1, content_words=body_kb * 1024 // 7)
+    print(app.config['BENCH_DB_PATH'])
+
+def child(*args):
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), *map(str, args)],
+                            capture_output=True, text=True, check=True).stdout
+    return output.strip().splitlines()[-1]
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'run':
+        run_once(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == 'prepare':
+        prepare(int(sys.argv[2]), int(sys.argv[3]))
+        return
+
+    body_kb = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    per_page = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    db_path = child('prepare', body_kb, per_page)
+    try:
+        print(f"{per_page}-post page of {BLOG_SLUG}, bodies of ~{body_kb} KB")
+        print(f"{'scenario':<10}{'posts':>7}{'response':>11}{'peak RSS':>11}{'growth':>10}")
+        for scenario in SCENARIOS:
+            result = json.loads(child('run', scenario, db_path, per_page))
+            print(f"{scenario:<10}{result['posts']:>7}{result['bytes'] / 1024:>9.0f}KB{result['peak']:>9.1f}MB"
+                  f"{result['peak'] - result['warm']:>8.1f}MB")
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Check that the post listings cost a constant number of queries per page size.
+
+Counts the SQL statements of GET /api/blogs/<slug>/posts, /api/featured-posts
+and /api/search at several page sizes, on posts with several authors and
+categories each. Author, blog and category lookups must stay one query per
+page, so the count may not grow with per_page; exits with status 1 if it does.
+
+Usage: python benchmarks/listing_query_check.py [post_count]   (default: 6000)
+"""
+import sys
+
+from sqlalchemy import event, text
+
+from common import make_app, seed_posts, cleanup
+from src.models.user import db
+from src.models.blog import Author, Category
+from src.models.search import ensure_search_index
+from src.services.cache import response_cache
+
+PAGE_SIZES = [5, 20, 100]
+AUTHORS = 20
+ENDPOINTS = {
+    'blog posts': '/api/blogs/blog-1/posts?per_page={}',
+    'blog posts (cursor)': '/api/blogs/blog-1/posts?cursor=&per_page={}',
+    'featured posts': '/api/featured-posts?limit={}',
+    'search': '/api/search?q=bitcoin&per_page={}',
+}
+
+def seed_relations(app):
+    """Spread posts over AUTHORS authors and give each two categories of its blog"""
+    with app.app_context():
+        db.session.add_all([Author(name=f'Author {i}', email=f'author{i}@example.com') for i in range(AUTHORS)])
+        blog_ids = [row[0] for row in db.session.execute(text("SELECT id FROM blogs"))]
+        db.session.add_all([Category(name=f'Topic {i}', slug=f'topic-{i}', blog_id=blog_id)
+                            for blog_id in blog_ids for i in range(4)])
+        db.session.commit()
+        db.session.execute(text(f"UPDATE posts SET author_id = 2 + id % {AUTHORS}"))
+        db.session.execute(text("""
+            INSERT INTO post_categories (post_id, category_id)
+            SELECT posts.id, categories.id FROM posts JOIN categories ON categories.blog_id = posts.blog_id
+            WHERE (posts.id + categories.id) % 2 = 0
+        """))
+        db.session.commit()
+        ensure_search_index()
+        return list(db.engines.values())  # Primary and read-only pool
+
+def main():
+    post_count = int(sys.argv[1]) if len(sys.argv) > 1 else 6000
+    app = make_app()
+    app.config['RESPONSE_CACHE_BACKEND'] = 'none'  # Every request has to reach the database
+    response_cache.init_app(app)
+    failures = []
+    try:
+        seed_posts(app, post_count)
+        engines = seed_relations(app)
+
+        client = app.test_client()
+        statements = []
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+        print(f"{'endpoint':<22}" + ''.join(f"{f'per_page={size}':>14}" for size in PAGE_SIZES))
+        for name, url in ENDPOINTS.items():
+            counts = []
+            for size in PAGE_SIZES:
+                del statements[:]
+                response = client.get(url.format(size))
+                if response.status_code != 200:
+                    raise RuntimeError(f'{url.format(size)} returned {response.status_code}')
+                if len(response.get_json()['posts']) != size:
+                    raise RuntimeError(f'{url.format(size)} returned a short page; seed more posts')
+                counts.append(len(statements))
+            print(f"{name:<22}" + ''.join(f"{count:>14}" for count in counts))
+            if len(set(counts)) != 1:
+                failures.append(f'{name}: {counts}')
+    finally:
+        cleanup(app)
+
+    if failures:
+        print(f"FAIL: query count grows with per_page: {'; '.join(failures)}")
+        sys.exit(1)
+    print("ok: query counts do not depend on the page size")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""Load test the WSGI and ASGI deployments: requests/second and p99 latency.
+
+Each mode is started in its own process on the same seeded SQLite file: the
+threaded Werkzeug server that app.run() uses (WSGI) and uvicorn with the async
+views of src/asgi.py (ASGI). This process then holds 100 and 1,000 concurrent
+keep-alive connections against it for a fixed time with a mix of the
+read-heavy endpoints (post pages, blog listings, featured, trending, popular).
+
+Run it on a machine with spare cores; the load generator shares the CPU with
+the server otherwise.
+
+Usage: python benchmarks/load_test.py [post_count] [seconds] [cache]   (default: 20000 10 on)
+       cache=off disables the response cache so every request reaches the database
+"""
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+from common import make_app, seed_posts, cleanup
+from src.models.blog import Blog, Post
+
+CONNECTIONS = [100, 1000]
+MODES = ['wsgi', 'asgi']
+PORT = 5057
+
+def build_app(db_path, cache=True):
+    """The benchmark app with the services main.py wires up"""
+    from src.services.view_counter import view_counter
+    from src.services.cache import response_cache
+    from src.services.trending import trending
+    from src.services.async_db import async_db
+
+    app = make_app(db_path)
+    app.config['RESPONSE_CACHE_BACKEND'] = 'memory' if cache else 'none'
+    for extension in (view_counter, response_cache, trending, async_db):
+        extension.init_app(app)
+    return app
+
+def serve(mode, db_path, port, cache):
+    app = build_app(db_path, cache)
+    if mode == 'wsgi':
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_request(self, *args):
+                pass
+
+        make_server('127.0.0.1', port, app, threaded=True, request_handler=QuietHandler).serve_forever()
+    else:
+        import uvicorn
+        from src.routes.async_reads import async_reads
+        from src.services.asgi import AsgiApp
+        uvicorn.run(AsgiApp(app, async_reads), host='127.0.0.1', port=port, log_level='warning', backlog=4096)
+
+def request_mix(app, count, seed=7):
+    """Paths weighted like site traffic: mostly post pages, then listings"""
+    rng = random.Random(seed)
+    with app.app_context():
+        blogs = [blog.slug for blog in Blog.query.all()]
+        posts = [(blog.slug, slug) for blog, slug in
+                 Post.query.join(Post.blog).with_entities(Blog, Post.slug).filter(Post.status == 'published')
+                 .order_by(Post.id).limit(2000)]
+    choices = [
+        (50, lambda: '/api/blogs/%s/posts/%s' % rng.choice(posts)),
+        (20, lambda: f'/api/blogs/{rng.choice(blogs)}/posts?page={rng.randint(1, 5)}'),
+        (5, lambda: f'/api/blogs/{rng.choice(blogs)}/posts?cursor=&per_page=10'),
+        (5, lambda: '/api/blogs'),
+        (5, lambda: '/api/featured-posts'),
+        (10, lambda: f"/api/trending-posts?timeframe={rng.choice(['day', 'week', 'all'])}"),
+        (5, lambda: f'/api/popular-posts/{rng.choice(blogs)}'),
+    ]
+    weights = [weight for weight, _ in choices]
+    return [rng.choices(choices, weights)[0][1]() for _ in range(count)]
+
+async def read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('closed')
+    status = int(status_line.split()[1])
+    length, close = 0, False
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin1').partition(':')
+        name = name.strip().lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'connection' and value.strip().lower() == 'close':
+            close = True
+    await reader.readexactly(length)
+    return status, close
+
+async def client(port, paths, offset, deadline, results):
+    """One keep-alive connection issuing requests back to back until the deadline"""
+    reader = writer = None
+    i = offset
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            started = time.perf_counter()
+            writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode())
+            status, close = await read_response(reader)
+            results['latencies'].append(time.perf_counter() - started)
+            results['statuses'][status] = results['statuses'].get(status, 0) + 1
+            if close:
+                writer.close()
+                reader = writer = None
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+            results['errors'] += 1
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.05)
+    if writer is not None:
+        writer.close()
+
+async def run_load(port, paths, connections, seconds):
+    results = {'latencies': [], 'statuses': {}, 'errors': 0}
+    deadline = time.perf_counter() + seconds
+    started = time.perf_counter()
+    await asyncio.gather(*[client(port, paths, n * 97, deadline, results) for n in range(connections)])
+    elapsed = time.perf_counter() - started
+    latencies = sorted(results['latencies'])
+    pick = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000 if latencies else float('nan')
+    return {
+        'requests': len(latencies),
+        'rps': len(latencies) / elapsed,
+        'p50': pick(0.50),
+        'p99': pick(0.99),
+        'errors': results['errors'],
+        'non_200': sum(count for status, count in results['statuses'].items() if status not in (200, 304))
+    }
+
+def wait_for_port(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'server on port {port} did not start')
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        serve(sys.argv[2], sys.argv[3], int(sys.argv[4]), sys.argv[5] == 'on')
+        return
+
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    cache = sys.argv[3] if len(sys.argv) > 3 else 'on'
+
+    app = build_app(None, cache == 'on')
+    try:
+        seed_posts(app, size)
+        paths = request_mix(app, 5000)
+        db_path = app.config['BENCH_DB_PATH']
+        print(f"{size} posts, {seconds:g}s per run, response cache {cache}")
+        print(f"{'mode':<6}{'conns':>7}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}{'non-2xx':>9}")
+
+        for mode in MODES:
+            server = subprocess.Popen([sys.executable, os.path.abspath(__file__), 'serve', mode, db_path, str(PORT), cache])
+            try:
+                wait_for_port(PORT)
+                asyncio.run(run_load(PORT, paths[:200], 20, 2))  # Warm up: trending refresh, pools, cache
+                for connections in CONNECTIONS:
+                    result = asyncio.run(run_load(PORT, paths, connections, seconds))
+                    print(f"{mode:<6}{connections:>7}{result['requests']:>10}{result['rps']:>10.0f}"
+                          f"{result['p50']:>10.1f}{result['p99']:>10.1f}{result['errors']:>8}{result['non_200']:>9}")
+            finally:
+                server.terminate()
+                server.wait()
+    finally:
+        cleanup(app)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Time the Blogger import serially and with a process pool.
+
+Generates one synthetic feed.atom per blog created by /api/migrate/setup-blogs
+(seven by default) and imports them with each worker count.
+
+Usage: python benchmarks/migration_benchmark.py [posts_per_blog] [max_workers]
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from common import make_app, cleanup, random_text
+from src.models.user import db
+from src.models.blog import Blog
+from src.services.blogger_import import BloggerImporter, import_feeds
+
+FEED_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:blogger="http://schemas.google.com/blogger/2018">\n'
+)
+
+def write_feed(path, posts, seed):
+    rng = random.Random(seed)
+    with open(path, 'w') as feed:
+        feed.write(FEED_HEADER)
+        for i in range(posts):
+            paragraphs = ''.join(
+                f'&lt;div class="post-body" style="margin:0" data-id="{j}"&gt;&lt;p style="x"&gt;{random_text(rng, 40)}&lt;/p&gt;'
+                f'&lt;span&gt; &lt;/span&gt;&lt;img src="https://blogger.googleusercontent.com/img/{seed}/{i}/{j}.png"/&gt;&lt;/div&gt;\n'
+                for j in range(20)
+            )
+            feed.write(
+                f'<entry><id>tag:blogger.com,1999:blog-{seed}.post-{i}</id>'
+                f'<blogger:type>POST</blogger:type><blogger:status>LIVE</blogger:status>'
+                f'<author><name>Author {i % 4}</name></author><title>{random_text(rng, 6)}</title>'
+                f'<content type="html">{paragraphs}</content><published>2024-05-01T10:00:00Z</published>'
+                f'<blogger:filename>/2024/05/post-{i}.html</blogger:filename>'
+                f'<category term="{rng.choice(["News", "Reviews", "Crypto", "Guides"])}"/></entry>\n'
+            )
+        feed.write('</feed>\n')
+
+def run(feed_dir, workers):
+    app = make_app()
+    try:
+        with app.app_context():
+            app.test_client().post('/api/migrate/setup-blogs')
+            blogs = Blog.query.order_by(Blog.id).all()
+            feeds = [(blog, os.path.join(feed_dir, blog.slug, 'feed.atom'), blog.slug) for blog in blogs]
+
+            importer = BloggerImporter()
+            importer.preload()
+            started = time.perf_counter()
+            import_feeds(importer, feeds, workers=workers)
+            elapsed = time.perf_counter() - started
+            db.session.remove()
+            return importer.results['posts_imported'], elapsed
+    finally:
+        cleanup(app)
+
+def main():
+    posts_per_blog = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else min(7, os.cpu_count() or 1)
+    slugs = ['newtechs', 'crypto-updates', 'techspot365', 'themasterminds',
+             'the-gambia-network', 'the-grand-bantaba', 'dibz-inc']
+
+    feed_dir = tempfile.mkdtemp(prefix='newtechs-feeds-')
+    try:
+        for seed, slug in enumerate(slugs):
+            os.makedirs(os.path.join(feed_dir, slug))
+            write_feed(os.path.join(feed_dir, slug, 'feed.atom'), posts_per_blog, seed)
+
+        print(f"{'workers':>8} {'posts':>8} {'seconds':>9} {'posts/s':>9} {'speedup':>8}")
+        baseline = None
+        for workers in range(1, max_workers + 1):
+            imported, elapsed = run(feed_dir, workers)
+            baseline = baseline or elapsed
+            print(f"{workers:>8} {imported:>8} {elapsed:>9.2f} {imported / elapsed:>9.0f} {baseline / elapsed:>7.2f}x")
+    finally:
+        shutil.rmtree(feed_dir)
+
+if __name__ == '__main__':
+    main()
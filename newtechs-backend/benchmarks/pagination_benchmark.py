@@ -0,0 +1,64 @@
+"""Compare page 1 and page 1000 of /api/blogs/<slug>/posts with OFFSET and cursor pagination.
+
+Requests go through the test client, so serialization is included and is the
+same for both modes; the difference is the COUNT(*) plus OFFSET scan that
+.paginate() runs against the keyset seek.
+
+Usage: python benchmarks/pagination_benchmark.py [post_count] [per_page]   (default: 100000 10)
+"""
+import sys
+
+from common import make_app, seed_posts, timed, cleanup
+from src.models.user import db
+from src.models.blog import Post
+from src.services.pagination import encode_cursor
+
+BLOG_SLUG = 'blog-1'
+PAGES = [1, 1000]
+
+def cursor_for_page(blog_id, page, per_page):
+    """Cursor a client would hold after walking to `page`, None past the last page"""
+    if page == 1:
+        return ''
+    post = (Post.query.filter_by(blog_id=blog_id, status='published')
+            .order_by(Post.published_at.desc(), Post.id.desc())
+            .offset((page - 1) * per_page - 1).first())
+    if post is None:
+        return None
+    return encode_cursor(post.published_at, post.id)
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    per_page = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    app = make_app()
+    try:
+        seed_posts(app, size)
+        client = app.test_client()
+        url = f'/api/blogs/{BLOG_SLUG}/posts?per_page={per_page}'
+
+        with app.app_context():
+            blog_id = 2  # seed_posts creates blog-0 .. blog-6 in order
+            blog_posts = Post.query.filter_by(blog_id=blog_id).count()
+            cursors = {page: cursor_for_page(blog_id, page, per_page) for page in PAGES}
+            db.session.remove()
+
+        pages = [page for page in PAGES if cursors[page] is not None]
+        print(f"{blog_posts} posts in {BLOG_SLUG}, per_page={per_page}")
+        for page in sorted(set(PAGES) - set(pages)):
+            print(f"skipping page {page}: {BLOG_SLUG} has fewer than {(page - 1) * per_page + 1} posts")
+        print(f"{'mode':<22} {'page':>6} {'p50':>10} {'p95':>10}")
+        for page in pages:
+            offset50, offset95 = timed(lambda: client.get(f'{url}&page={page}'))
+            print(f"{'offset':<22} {page:>6} {offset50:>8.1f}ms {offset95:>8.1f}ms")
+        for page in pages:
+            cursor50, cursor95 = timed(lambda: client.get(f'{url}&cursor={cursors[page]}'))
+            print(f"{'cursor':<22} {page:>6} {cursor50:>8.1f}ms {cursor95:>8.1f}ms")
+        for page in pages:
+            total50, total95 = timed(lambda: client.get(f'{url}&cursor={cursors[page]}&include_total=1'))
+            print(f"{'cursor + total':<22} {page:>6} {total50:>8.1f}ms {total95:>8.1f}ms")
+    finally:
+        cleanup(app)
+
+if __name__ == '__main__':
+    main()
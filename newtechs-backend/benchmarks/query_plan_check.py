@@ -0,0 +1,195 @@
+"""Fail if an API endpoint's queries fall back to a full scan of a large table.
+
+Calls each listed endpoint through the test client on a seeded database,
+records every SELECT (and WITH ... SELECT) it runs and checks its EXPLAIN
+QUERY PLAN for `SCAN <table>` on posts, comments, categories or
+post_categories. The CTE queries of some endpoints must also use a given
+index, e.g. the comment thread walk must go through (post_id, parent_id).
+Full-text queries that join posts must start from the FTS index, otherwise
+MATCH runs once per post picked out by a status index. A later cursor page
+must range-seek past the cursor instead of walking every earlier row.
+Exits with status 1 listing the offending queries, so it can gate CI or a
+deploy.
+
+The LIKE search fallback is left out on purpose: substring matching can't use
+an index, which is why search goes through the FTS5 index. So are background
+jobs like the trending refresh, which rank every post by design.
+
+Usage: python benchmarks/query_plan_check.py [-v]
+"""
+import re
+import sys
+
+from sqlalchemy import event, text
+
+from common import make_app, seed_posts, cleanup
+from src.models.user import db
+from src.models.blog import Blog, Post, Category, Comment
+from src.models.schema import upgrade_schema
+from src.models.search import FTS_TABLE, ensure_search_index
+from src.services.pagination import encode_cursor
+from src.services.trending import trending
+
+WATCHED_TABLES = {'posts', 'comments', 'categories', 'post_categories'}
+SCAN_RE = re.compile(r'^SCAN (\w+)')
+READ_PREFIXES = ('SELECT', 'WITH')
+
+# Endpoint -> index its WITH (CTE) query has to use
+CTE_INDEXES = {
+    'GET /api/comments/1': 'ix_comments_post_parent_status_created',
+}
+
+# Endpoint -> range its plan has to seek; {cursor} points into the middle of blog-1
+RANGE_SEEKS = {
+    'GET /api/blogs/blog-1/posts?cursor={cursor}': 'published_at<?',
+}
+
+ENDPOINTS = [
+    'GET /api/blogs',
+    'GET /api/blogs/blog-1',
+    'GET /api/blogs/blog-1/posts',
+    'GET /api/blogs/blog-1/posts?page=50',
+    'GET /api/blogs/blog-1/posts?category=news',
+    'GET /api/blogs/blog-1/posts?cursor=',
+    'GET /api/blogs/blog-1/posts?cursor={cursor}',
+    'GET /api/blogs/blog-1/posts/post-1',
+    'GET /api/blogs/blog-1/categories',
+    'GET /api/featured-posts',
+    'GET /api/search?q=bitcoin',
+    'GET /api/search?q=bitcoin&cursor=',
+    'GET /api/comments/1',
+    'GET /api/popular-posts/blog-1',
+    'GET /api/trending-posts',
+    'GET /api/trending-posts?blog=blog-1&timeframe=month',
+    'POST /api/analytics/post-view',
+]
+
+def seed_extras(app, categories_per_blog=20):
+    """Categories and comments so the joins and comment queries have realistic rows to plan against"""
+    with app.app_context():
+        blog_ids = [blog_id for (blog_id,) in db.session.query(Post.blog_id).distinct()]
+        db.session.add_all([
+            Category(name=f'Category {i}', slug='news' if i == 0 else f'category-{i}', blog_id=blog_id)
+            for blog_id in blog_ids for i in range(categories_per_blog)
+        ])
+        db.session.flush()
+        db.session.execute(text(
+            "INSERT INTO post_categories (post_id, category_id) "
+            "SELECT posts.id, categories.id FROM posts JOIN categories ON categories.blog_id = posts.blog_id "
+            "WHERE (posts.id + categories.id) % 10 = 0"
+        ))
+        db.session.add_all([
+            Comment(id=f'comment-{post_id}-{i}', post_id=post_id, author_name='Reader', content='Nice post',
+                    status='approved', parent_id=f'comment-{post_id}-0' if i else None)
+            for post_id in range(1, 2001) for i in range(3)
+        ])
+        db.session.commit()
+
+def middle_cursor(blog_slug='blog-1'):
+    """Cursor a client holds half way through a blog's listing"""
+    blog = Blog.query.filter_by(slug=blog_slug).one()
+    listing = Post.query.filter_by(blog_id=blog.id, status='published')
+    post = (listing.order_by(Post.published_at.desc(), Post.id.desc())
+            .offset(listing.count() // 2).first())
+    return encode_cursor(post.published_at, post.id)
+
+def capture_selects(app, client, endpoint, cursor=''):
+    method, url = endpoint.split(' ', 1)
+    url = url.format(cursor=cursor)
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(READ_PREFIXES) and not executemany:
+            statements.append((statement, parameters))
+
+    with app.app_context():
+        engines = list(db.engines.values())  # Primary and read-only pool
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', record)
+    try:
+        if method == 'POST':
+            client.post(url, json={'post_id': 1})
+        else:
+            client.get(url)
+    finally:
+        for engine in engines:
+            event.remove(engine, 'before_cursor_execute', record)
+    return statements
+
+def query_plan(statement, parameters):
+    with db.engine.connect() as conn:
+        return [row[-1] for row in conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)]
+
+def table_scans(plan):
+    scans = []
+    for detail in plan:
+        match = SCAN_RE.match(detail)
+        if match and match.group(1) in WATCHED_TABLES:
+            scans.append(detail)
+    return scans
+
+def uses_index(plan, index):
+    return any(re.search(rf'\bINDEX {index}\b', detail) for detail in plan)
+
+def seeks_range(plan, seek):
+    return any(seek in detail for detail in plan)
+
+def fts_first(statement, plan):
+    """False when a MATCH query joined to posts doesn't drive from the FTS index"""
+    if ' MATCH ' not in statement or 'JOIN posts' not in statement:
+        return True
+    return bool(plan) and plan[0].startswith(f'SCAN {FTS_TABLE} ')
+
+def main():
+    verbose = '-v' in sys.argv
+    app = make_app()
+    failures = []
+    try:
+        seed_posts(app, 20000)
+        seed_extras(app)
+        with app.app_context():
+            upgrade_schema()
+            # No ANALYZE: init-db doesn't run it, so check the plans production gets
+            ensure_search_index()
+            # Ranking is a scheduled batch job; only the endpoints' read path is checked
+            trending.refresh()
+            cursor = middle_cursor()
+
+        client = app.test_client()
+        for endpoint in ENDPOINTS:
+            statements = capture_selects(app, client, endpoint, cursor)
+            index = CTE_INDEXES.get(endpoint)
+            seek = RANGE_SEEKS.get(endpoint)
+            ctes = 0
+            seeks = 0
+            with app.app_context():
+                for statement, parameters in statements:
+                    plan = query_plan(statement, parameters)
+                    scans = table_scans(plan)
+                    if not fts_first(statement, plan):
+                        scans.append(f'does not start from {FTS_TABLE}')
+                    if index and statement.lstrip().upper().startswith('WITH'):
+                        ctes += 1
+                        if not uses_index(plan, index):
+                            scans.append(f'CTE does not use {index}')
+                    if seek and seeks_range(plan, seek):
+                        seeks += 1
+                    if scans:
+                        failures.append((endpoint, statement, scans))
+            if index and not ctes:
+                failures.append((endpoint, '', [f'no CTE query captured, expected one using {index}']))
+            if seek and not seeks:
+                failures.append((endpoint, '', [f'no query seeks {seek}']))
+            status = 'FAIL' if any(failure[0] == endpoint for failure in failures) else 'ok'
+            print(f"{status:<5} {endpoint} ({len(statements)} queries)")
+    finally:
+        cleanup(app)
+
+    for endpoint, statement, scans in failures:
+        print(f"\n{endpoint}: {'; '.join(scans)}")
+        if verbose:
+            print(' '.join(statement.split()))
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Check read-replica routing against a real primary and streaming replica.
+
+Every @read_only GET must run its queries on the replica, writes on the
+primary, and a client that just wrote must read its own write from the primary
+even while the replica lags. Lag is simulated by pausing WAL replay on the
+replica (PostgreSQL only), so the replica URL needs a superuser.
+
+Usage: python benchmarks/replica_check.py <primary_url> <replica_url>
+       e.g. postgresql://postgres@/newtechs?host=/tmp/pg  postgresql://postgres@/newtechs?host=/tmp/pg-replica
+"""
+import sys
+import time
+
+from common import seed_posts  # noqa: F401 (puts the backend on sys.path)
+from flask import Flask
+from sqlalchemy import create_engine, event, text
+from src.models.user import db
+from src.models.schema import upgrade_schema
+from src.routes.blog import blog_bp
+from src.routes.engagement import engagement_bp
+from src.services.database import init_database, normalize_uri
+
+READS = [
+    '/api/blogs',
+    '/api/blogs/blog-0',
+    '/api/blogs/blog-0/posts',
+    '/api/blogs/blog-0/posts/post-7',
+    '/api/blogs/blog-0/categories',
+    '/api/featured-posts',
+    '/api/comments/7',
+    '/api/popular-posts/blog-0',
+]
+
+def make_app(primary, replica):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = normalize_uri(primary)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['DATABASE_REPLICA_URIS'] = [replica]
+    app.register_blueprint(blog_bp, url_prefix='/api')
+    app.register_blueprint(engagement_bp)
+    init_database(app)
+    with app.app_context():
+        db.create_all()
+        upgrade_schema()
+    return app
+
+def wait_for_replica(replica_engine, sql, expected, timeout=30):
+    deadline = time.time() + timeout
+    with replica_engine.connect() as conn:
+        while conn.execute(text(sql)).scalar() != expected:
+            if time.time() > deadline:
+                raise RuntimeError('replica did not catch up')
+            time.sleep(0.1)
+            conn.rollback()
+
+def main():
+    if len(sys.argv) != 3:
+        print(__doc__)
+        sys.exit(2)
+    app = make_app(sys.argv[1], sys.argv[2])
+    replica = create_engine(normalize_uri(sys.argv[2]), isolation_level='AUTOCOMMIT')
+    failures = 0
+
+    used = []
+    with app.app_context():
+        for key, engine in db.engines.items():
+            event.listen(engine, 'before_cursor_execute', lambda *args, key=key: used.append(key or 'primary'))
+        if not db.session.execute(text("SELECT COUNT(*) FROM posts")).scalar():
+            seed_posts(app, 50)
+        post_count = db.session.execute(text("SELECT COUNT(*) FROM posts")).scalar()
+    wait_for_replica(replica, "SELECT COUNT(*) FROM posts", post_count)
+
+    for url in READS:
+        used.clear()
+        response = app.test_client().get(url)
+        ok = response.status_code == 200 and set(used) == {'replica_1'}
+        failures += not ok
+        print(f"{'ok' if ok else 'FAIL':<6}GET {url} {response.status_code} {sorted(set(used))}")
+
+    writer = app.test_client()
+    with replica.connect() as conn:
+        conn.execute(text("SELECT pg_wal_replay_pause()"))
+    try:
+        used.clear()
+        response = writer.post('/api/comments/7', json={'author': 'Check', 'content': 'Read your writes'})
+        cookie = response.headers.get('Set-Cookie', '')
+        ok = response.status_code == 200 and set(used) == {'primary'} and cookie.startswith('db_primary_until=')
+        failures += not ok
+        print(f"{'ok' if ok else 'FAIL':<6}POST /api/comments/7 {response.status_code} {sorted(set(used))}")
+
+        comment_id = response.get_json()['comment']['id']
+        for name, client, expect_seen, expect_bind in [('writer', writer, True, 'primary'),
+                                                       ('other client', app.test_client(), False, 'replica_1')]:
+            used.clear()
+            ids = [comment['id'] for comment in client.get('/api/comments/7').get_json()['comments']]
+            ok = (comment_id in ids) == expect_seen and set(used) == {expect_bind}
+            failures += not ok
+            print(f"{'ok' if ok else 'FAIL':<6}{name} {'sees' if comment_id in ids else 'does not see'} "
+                  f"the comment while replay is paused {sorted(set(used))}")
+    finally:
+        with replica.connect() as conn:
+            conn.execute(text("SELECT pg_wal_replay_resume()"))
+
+    print('ok' if not failures else f'{failures} check(s) failed')
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
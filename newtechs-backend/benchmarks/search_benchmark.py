@@ -0,0 +1,51 @@
+"""Compare /api/search query latency of the FTS5 index against the LIKE scan.
+
+Only the search query itself (total count plus one page of ids) is timed, since
+serializing the page is identical for both paths.
+
+Usage: python benchmarks/search_benchmark.py [post_count ...]   (default: 10000 100000)
+"""
+import sys
+
+from common import make_app, seed_posts, timed, cleanup
+from src.models.user import db
+from src.models.blog import Post
+from src.models.search import ensure_search_index, search_posts_fts
+
+QUERIES = ['bitcoin', 'mobile money', '"term12 term40"', 'term123*', 'term9876']
+
+def like_search(query, per_page=10):
+    search_query = db.session.query(Post.id).filter(Post.status == 'published').filter(
+        db.or_(
+            Post.title.contains(query),
+            Post.content.contains(query),
+            Post.excerpt.contains(query)
+        )
+    )
+    total = search_query.count()
+    ids = [row[0] for row in search_query.order_by(Post.published_at.desc()).limit(per_page)]
+    return total, ids
+
+def fts_search(query, per_page=10):
+    return search_posts_fts(query, limit=per_page)
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000]
+    print(f"{'posts':>8} {'query':<18} {'LIKE p50':>10} {'LIKE p95':>10} {'FTS p50':>10} {'FTS p95':>10}")
+    for size in sizes:
+        app = make_app()
+        try:
+            seed_posts(app, size)
+            with app.app_context():
+                ensure_search_index()
+                for query in QUERIES:
+                    like_text = query.strip('"*')
+                    like50, like95 = timed(lambda: like_search(like_text), repeat=5)
+                    fts50, fts95 = timed(lambda: fts_search(query))
+                    print(f"{size:>8} {query:<18} {like50:>9.1f}ms {like95:>9.1f}ms {fts50:>9.1f}ms {fts95:>9.1f}ms")
+                db.session.remove()
+        finally:
+            cleanup(app)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""Time building and encoding the JSON of the largest API payloads, per serialization path.
+
+Payload shapes:
+
+  listing    a 100-post page of one blog, GET /api/blogs/<slug>/posts?per_page=100
+  search     50 search hits with snippets, GET /api/search (the FTS query itself
+             runs once up front, it is the same for every path)
+  migration  GET /api/migrate/status with many blogs and 10 recent jobs
+
+Paths:
+
+  objects/json    Post and Blog objects through to_dict(), Flask's stock json
+                  provider: the endpoints before rows and orjson
+  objects/orjson  the same dicts encoded by OrjsonProvider
+  rows/json       row tuples (listing_posts(), migration_overview()), StdlibJSONProvider
+  rows/orjson     row tuples encoded by OrjsonProvider: the endpoints now
+
+build is the queries plus the dicts, encode is jsonify() down to response bytes;
+both are medians. Bodies are checked to decode to the same JSON on every path.
+
+Usage: python benchmarks/serialization_benchmark.py [post_count] [blog_count]   (default: 20000 50)
+"""
+import json
+import random
+import sys
+import uuid
+
+from flask import jsonify
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import text
+
+from common import make_app, seed_posts, timed, cleanup
+from src.models.user import db
+from src.models.blog import Blog, Post, Category, Author, POST_LISTING_COLUMNS, listing_posts, post_listing_options
+from src.models.migration import MigrationJob, MigrationJobBlog
+from src.models.search import ensure_search_index, search_posts_fts
+from src.routes.migration import migration_overview
+from src.services.json_provider import StdlibJSONProvider, OrjsonProvider, orjson
+
+PER_PAGE = 100
+SEARCH_HITS = 50
+SEARCH_QUERY = 'bitcoin'
+CATEGORIES_PER_BLOG = 8
+JOBS = 10
+
+def seed_extras(app, blog_count):
+    """Categories (two or three per post), jobs with per-blog progress"""
+    rng = random.Random(7)
+    with app.app_context():
+        categories = [
+            {'name': f'Topic {i}', 'slug': f'topic-{i}', 'description': f'Posts about topic {i}', 'blog_id': blog_id}
+            for blog_id in range(1, blog_count + 1) for i in range(CATEGORIES_PER_BLOG)
+        ]
+        db.session.execute(Category.__table__.insert(), categories)
+        links = []
+        for post_id, blog_id in db.session.execute(text("SELECT id, blog_id FROM posts")):
+            first = (blog_id - 1) * CATEGORIES_PER_BLOG + 1
+            for offset in rng.sample(range(CATEGORIES_PER_BLOG), rng.choice((2, 3))):
+                links.append({'post_id': post_id, 'category_id': first + offset})
+        db.session.execute(text("INSERT INTO post_categories (post_id, category_id) VALUES (:post_id, :category_id)"),
+                           links)
+        for _ in range(JOBS):
+            job = MigrationJob(id=str(uuid.uuid4()), status='completed', options=json.dumps({'batch_size': 500}),
+                               results=json.dumps({'imported': 1000, 'skipped': 3}), attempts=1)
+            job.blogs = [MigrationJobBlog(source=f'takeout-{blog_id}', blog_id=blog_id,
+                                          feed_path=f'/takeout/{blog_id}/feed.atom', status='completed',
+                                          entries_seen=400, imported=395, skipped=5)
+                         for blog_id in range(1, min(blog_count, 8) + 1)]
+            db.session.add(job)
+        db.session.commit()
+        ensure_search_index()
+
+def listing_objects():
+    posts = (Post.query.filter_by(blog_id=1, status='published').options(*post_listing_options())
+             .order_by(Post.published_at.desc()).limit(PER_PAGE).all())
+    return {'success': True, 'posts': [post.to_dict() for post in posts]}
+
+def listing_rows():
+    rows = (Post.query.filter_by(blog_id=1, status='published').with_entities(*POST_LISTING_COLUMNS)
+            .order_by(Post.published_at.desc()).limit(PER_PAGE).all())
+    return {'success': True, 'posts': listing_posts(rows)}
+
+def search_objects(hits):
+    posts = {post.id: post for post in
+             Post.query.filter(Post.id.in_([post_id for post_id, _ in hits])).options(*post_listing_options())}
+    return {'success': True, 'posts': [dict(posts[post_id].to_dict(), snippet=snippet) for post_id, snippet in hits]}
+
+def search_rows(hits):
+    rows = Post.query.filter(Post.id.in_([post_id for post_id, _ in hits])).with_entities(*POST_LISTING_COLUMNS).all()
+    posts = {post['id']: post for post in listing_posts(rows)}
+    return {'success': True, 'posts': [dict(posts[post_id], snippet=snippet) for post_id, snippet in hits]}
+
+def migration_objects():
+    """GET /migrate/status as it was: Blog objects and two counts per blog"""
+    blogs = Blog.query.all()
+    blog_stats = [{
+        'blog': blog.to_dict(),
+        'posts': Post.query.filter_by(blog_id=blog.id).count(),
+        'categories': Category.query.filter_by(blog_id=blog.id).count()
+    } for blog in blogs]
+    return {
+        'success': True,
+        'stats': {
+            'total_blogs': len(blogs),
+            'total_posts': Post.query.count(),
+            'total_categories': Category.query.count(),
+            'total_authors': Author.query.count(),
+            'blog_breakdown': blog_stats
+        },
+        'recent_jobs': [dict(job.to_dict(), active=False)
+                        for job in MigrationJob.query.order_by(MigrationJob.created_at.desc()).limit(10)]
+    }
+
+def migration_rows():
+    return {'success': True, **migration_overview()}
+
+PATHS = [
+    ('objects/json', DefaultJSONProvider, 'objects'),
+    ('objects/orjson', OrjsonProvider, 'objects'),
+    ('rows/json', StdlibJSONProvider, 'rows'),
+    ('rows/orjson', OrjsonProvider, 'rows'),
+]
+
+def main():
+    post_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    blog_count = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    if orjson is None:
+        raise SystemExit('orjson is not installed; the orjson paths need it')
+
+    app = make_app()
+    try:
+        seed_posts(app, post_count, blogs=blog_count)
+        seed_extras(app, blog_count)
+        with app.app_context():
+            _, hits = search_posts_fts(SEARCH_QUERY, limit=SEARCH_HITS)
+        shapes = {
+            'listing': {'objects': listing_objects, 'rows': listing_rows},
+            'search': {'objects': lambda: search_objects(hits), 'rows': lambda: search_rows(hits)},
+            'migration': {'objects': migration_objects, 'rows': migration_rows},
+        }
+
+        print(f"{post_count} posts in {blog_count} blogs, {len(hits)} search hits")
+        print(f"{'payload':<11}{'path':<16}{'build':>9}{'encode':>10}{'total':>10}{'body':>10}")
+        for shape, builders in shapes.items():
+            reference = None
+            for name, provider, source in PATHS:
+                app.json = provider(app)
+                build = builders[source]
+
+                def build_fresh():
+                    with app.app_context():  # New session: nothing comes from the identity map
+                        return build()
+
+                with app.app_context():
+                    payload = build()
+                    body = jsonify(payload).get_data()
+                    encode50, _ = timed(lambda: jsonify(payload).get_data(), repeat=50)
+                build50, _ = timed(build_fresh, repeat=20)
+
+                if reference is None:
+                    reference = json.loads(body)
+                elif json.loads(body) != reference:
+                    raise RuntimeError(f'{shape} {name}: body differs from {PATHS[0][0]}')
+                print(f"{shape:<11}{name:<16}{build50:>7.2f}ms{encode50:>8.2f}ms{build50 + encode50:>8.2f}ms"
+                      f"{len(body) / 1024:>8.0f}KB")
+    finally:
+        cleanup(app)
+
+if __name__ == '__main__':
+    main()
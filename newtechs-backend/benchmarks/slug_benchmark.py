@@ -0,0 +1,101 @@
+"""Create posts that all have the same title and time their slug allocation.
+
+  probe      the old loop: one SELECT per suffix (-1, -2, ...) until one is free
+  allocator  SlugAllocator, as create_post does now: one query per post
+  bulk       POST /api/posts/bulk with every post in one request
+
+probe and allocator insert one post per commit, as create_post does, minus
+the HTTP layer. Per-post figures are for the last 100 posts, where the probe
+loop is slowest. probe costs O(n) queries per post, so it runs on fewer posts.
+
+Usage: python benchmarks/slug_benchmark.py [post_count] [probe_count]   (default: 5000 300)
+"""
+import sys
+import time
+
+from sqlalchemy import event
+
+from common import make_app, cleanup
+from src.models.user import db
+from src.models.blog import Blog, Post, Author
+from src.routes.blog import create_slug
+from src.services.slugs import SlugAllocator
+
+TITLE = 'Weekly Roundup'
+TAIL = 100
+
+def probe_slug(blog_id, base):
+    slug = base
+    counter = 1
+    while Post.query.filter_by(blog_id=blog_id, slug=slug).first():
+        slug = f"{base}-{counter}"
+        counter += 1
+    return slug
+
+def allocator_slug(blog_id, base):
+    return SlugAllocator(blog_id).allocate(base)
+
+def create_posts(app, blog_id, count, allocate):
+    """Insert `count` posts one commit each; returns (seconds, tail ms per post, tail queries per post, last slug)"""
+    queries = [0]
+    def count_query(*args):
+        queries[0] += 1
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', count_query)
+        try:
+            base = create_slug(TITLE)
+            tail = min(TAIL, count)  # Fewer posts than TAIL: average over all of them
+            started = tail_started = time.perf_counter()
+            tail_queries = 0
+            for i in range(count):
+                if i == count - tail:
+                    tail_started, tail_queries = time.perf_counter(), queries[0]
+                post = Post(title=TITLE, slug=allocate(blog_id, base), content='<p>Roundup</p>',
+                            blog_id=blog_id, author_id=1)
+                db.session.add(post)
+                db.session.commit()
+            finished = time.perf_counter()
+            return (finished - started, (finished - tail_started) * 1000 / tail,
+                    (queries[0] - tail_queries) / tail, post.slug)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count_query)
+
+def report(name, count, seconds, per_post_ms, per_post_queries, last_slug):
+    print(f"{name:<10}{count:>7}{seconds:>9.2f}s{count / seconds:>10.0f}{per_post_ms:>10.2f}ms"
+          f"{per_post_queries:>9.1f}  {last_slug}")
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    probe_count = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    if count < 1 or probe_count < 1:
+        sys.exit('post_count and probe_count must be at least 1')
+
+    app = make_app()
+    try:
+        with app.app_context():
+            db.session.add_all([Blog(name=f'Blog {i}', slug=f'blog-{i}', title=f'Blog {i}') for i in range(3)])
+            db.session.add(Author(name='Admin'))
+            db.session.commit()
+
+        print(f"Posts titled {TITLE!r}; per post = mean over the last {TAIL} (or all, if fewer)")
+        print(f"{'mode':<10}{'posts':>7}{'total':>10}{'posts/s':>10}{'per post':>12}{'queries':>9}  last slug")
+        report('probe', probe_count, *create_posts(app, 1, probe_count, probe_slug))
+        report('allocator', count, *create_posts(app, 2, count, allocator_slug))
+
+        client = app.test_client()
+        started = time.perf_counter()
+        response = client.post('/api/posts/bulk', json=[
+            {'title': TITLE, 'content': '<p>Roundup</p>', 'blog_id': 3} for _ in range(count)
+        ])
+        seconds = time.perf_counter() - started
+        body = response.get_json()
+        if response.status_code != 200 or body['summary']['created'] != count:
+            raise RuntimeError(f"bulk: {response.status_code} {body.get('summary') or body}")
+        print(f"{'bulk':<10}{count:>7}{seconds:>9.2f}s{count / seconds:>10.0f}{'-':>12}{'-':>9}  "
+              f"{body['results'][-1]['slug']}")
+    finally:
+        cleanup(app)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Cold start of the app: import time, create_app() and the first request.
+
+Every run is a fresh interpreter, as on a serverless cold start, with the
+serverless pool profile. Scenarios:
+
+  schema   create_app() plus create_schema(), which every startup used to run
+  factory  create_app() with all blueprints; the schema comes from init-db
+  lean     create_app() without the migration blueprint (APP_BLUEPRINTS)
+
+Usage: python benchmarks/startup_benchmark.py [runs] [post_count]   (default: 10 2000)
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SCENARIOS = {
+    'schema': {},
+    'factory': {},
+    'lean': {'APP_BLUEPRINTS': 'user,blog,engagement'},
+}
+FIRST_REQUEST = '/api/blogs/blog-1/posts?per_page=10'
+HEAVY_MODULES = ['xml.etree.ElementTree', 'concurrent.futures.process']
+
+def run_once(scenario, db_path):
+    """Child process: time the startup phases and print them as JSON"""
+    started = time.perf_counter()
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from src.main import create_app
+    imported = time.perf_counter()
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}'})
+    if scenario == 'schema':
+        from src.models.schema import create_schema
+        with app.app_context():
+            create_schema()
+    created = time.perf_counter()
+
+    response = app.test_client().get(FIRST_REQUEST)
+    finished = time.perf_counter()
+    print(json.dumps({
+        'import': imported - started,
+        'create_app': created - imported,
+        'first_request': finished - created,
+        'status': response.status_code,
+        'heavy': [name for name in HEAVY_MODULES if name in sys.modules],
+    }))
+
+def prepare(post_count):
+    from common import make_app, seed_posts
+    from src.models.schema import create_schema
+
+    app = make_app()
+    seed_posts(app, post_count)
+    with app.app_context():
+        create_schema()
+    return app
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'run':
+        run_once(sys.argv[2], sys.argv[3])
+        return
+
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    post_count = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    from common import cleanup
+
+    app = prepare(post_count)
+    db_path = app.config['BENCH_DB_PATH']
+    try:
+        print(f"{runs} cold starts per scenario, {post_count} posts, first request GET {FIRST_REQUEST}")
+        print(f"{'scenario':<10}{'process':>10}{'import':>10}{'create':>10}{'first req':>11}  heavy modules loaded")
+        for scenario, env in SCENARIOS.items():
+            env = dict(os.environ, DATABASE_PROFILE='serverless', **env)
+            samples = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                output = subprocess.run([sys.executable, os.path.abspath(__file__), 'run', scenario, db_path],
+                                        env=env, capture_output=True, text=True, check=True).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                result['process'] = time.perf_counter() - started
+                if result['status'] != 200:
+                    raise RuntimeError(f"{scenario}: first request returned {result['status']}")
+                samples.append(result)
+            median = lambda key: statistics.median(sample[key] for sample in samples) * 1000
+            print(f"{scenario:<10}{median('process'):>8.0f}ms{median('import'):>8.0f}ms{median('create_app'):>8.0f}ms"
+                  f"{median('first_request'):>9.0f}ms  {', '.join(samples[0]['heavy']) or '-'}")
+    finally:
+        cleanup(app)
+
+if __name__ == '__main__':
+    main()
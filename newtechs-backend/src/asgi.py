@@ -0,0 +1,14 @@
+"""ASGI entry point: uvicorn src.asgi:app --host 0.0.0.0 --port 5000
+
+The read-heavy blog and engagement endpoints are served by the async views in
+routes/async_reads.py; every other request runs the Flask app on a thread pool.
+Like the WSGI app it expects an up-to-date schema (flask --app src.main init-db).
+"""
+from src.main import create_app
+from src.routes.async_reads import async_reads
+from src.services.asgi import AsgiApp
+from src.services.async_db import async_db
+
+flask_app = create_app()
+async_db.init_app(flask_app)
+app = AsgiApp(flask_app, async_reads)
@@ -3,52 +3,107 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+from importlib import import_module
+from flask import Flask, current_app
 from flask_cors import CORS
-from src.models.user import db
-from src.models.blog import Blog, Post, Category, Author, Comment, NewsletterSubscriber  # Import blog models
-from src.routes.user import user_bp
-from src.routes.blog import blog_bp
-from src.routes.migration import migration_bp
-from src.routes.engagement import engagement_bp
-
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
-
-# Enable CORS for all routes
-CORS(app, origins=['http://localhost:3000', 'http://localhost:5000'])
-
-# Register blueprints
-app.register_blueprint(user_bp, url_prefix='/api')
-app.register_blueprint(blog_bp, url_prefix='/api')
-app.register_blueprint(migration_bp, url_prefix='/api')
-app.register_blueprint(engagement_bp)
-
-# Database configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
-
-# Create all tables
-with app.app_context():
-    db.create_all()
-
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
+from src.models.schema import create_schema
+from src.services.view_counter import view_counter
+from src.services.cache import response_cache
+from src.services.trending import trending
+from src.services.view_analytics import view_analytics
+from src.services.metrics import request_metrics
+from src.services.database import init_database, database_uri
+from src.services.json_provider import init_json
+from src.services.compression import response_compression, precompress_static, send_static
+
+# SQLite file by default; DATABASE_URL selects another backend (e.g. postgresql://...)
+DEFAULT_DATABASE_URI = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+
+# Blueprint name -> (module, attribute, url_prefix). A module is imported only
+# when its blueprint is loaded, so a deployment can leave out e.g. the Blogger
+# migration endpoints with BLUEPRINTS / APP_BLUEPRINTS=user,blog,engagement.
+BLUEPRINTS = {
+    'user': ('src.routes.user', 'user_bp', '/api'),
+    'blog': ('src.routes.blog', 'blog_bp', '/api'),
+    'migration': ('src.routes.migration', 'migration_bp', '/api'),
+    'engagement': ('src.routes.engagement', 'engagement_bp', None),
+}
+
+def blueprint_names(app):
+    names = app.config.setdefault('BLUEPRINTS', os.environ.get('APP_BLUEPRINTS') or list(BLUEPRINTS))
+    if isinstance(names, str):
+        names = names.split(',')
+    names = [name.strip() for name in names if name.strip()]
+    unknown = [name for name in names if name not in BLUEPRINTS]
+    if unknown:
+        raise ValueError(f'Unknown blueprint(s) {", ".join(unknown)}; expected some of {", ".join(BLUEPRINTS)}')
+    return names
+
+def create_app(config=None):
+    """Build the Flask app.
+
+    Startup doesn't touch the database schema: create and upgrade it with
+    `flask --app src.main init-db` (python src/main.py does it before serving).
+    """
+    app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri(DEFAULT_DATABASE_URI)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config.update(config or {})
+    init_json(app)  # orjson when installed, see JSON_PROVIDER
+
+    # Enable CORS for all routes
+    CORS(app, origins=['http://localhost:3000', 'http://localhost:5000'])
+
+    # Register blueprints
+    for name in blueprint_names(app):
+        module, attribute, url_prefix = BLUEPRINTS[name]
+        app.register_blueprint(getattr(import_module(module), attribute), url_prefix=url_prefix)
+
+    init_database(app)  # Pool per DATABASE_PROFILE, SQLite pragmas, read replicas
+    view_counter.init_app(app)
+    response_cache.init_app(app)
+    trending.init_app(app)
+    view_analytics.init_app(app)
+    request_metrics.init_app(app)  # Server-Timing, /api/metrics, slow-query log
+    response_compression.init_app(app)  # gzip/br above COMPRESSION_MIN_SIZE; runs before the metrics hook
+
+    app.add_url_rule('/', defaults={'path': ''}, view_func=serve)
+    app.add_url_rule('/<path:path>', view_func=serve)
+    app.cli.command('init-db')(init_db)
+    app.cli.command('precompress-static')(precompress_static_command)
+    return app
+
+def init_db():
+    """Create the tables, apply pending schema migrations, build the search index and the first trending ranking"""
+    applied = create_schema()
+    print(f"Schema up to date (applied: {', '.join(map(str, applied)) or 'none'})")
+    ranked = trending.refresh()
+    print(f"Trending ranked: {', '.join(f'{timeframe} {count}' for timeframe, count in ranked.items())}")
+
+def precompress_static_command():
+    """Build the .gz/.br variants of the static files (run at deploy time with STATIC_PRECOMPRESS=off)"""
+    written = precompress_static(current_app.static_folder, current_app.config['COMPRESSION_MIN_SIZE'])
+    print(f"Precompressed {len(written)} file(s) in {current_app.static_folder}")
+
 def serve(path):
-    static_folder_path = app.static_folder
+    static_folder_path = current_app.static_folder
     if static_folder_path is None:
             return "Static folder not configured", 404
 
+    # Precompressed variants and Cache-Control, see src/services/compression.py
     if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
+        return send_static(current_app, static_folder_path, path)
     else:
         index_path = os.path.join(static_folder_path, 'index.html')
         if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
+            return send_static(current_app, static_folder_path, 'index.html')
         else:
             return "index.html not found", 404
 
 
 if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        init_db()
     app.run(host='0.0.0.0', port=5000, debug=True)
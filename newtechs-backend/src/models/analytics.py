@@ -0,0 +1,67 @@
+from sqlalchemy.dialects import postgresql, sqlite
+from src.models.user import db
+
+class ViewEvent(db.Model):
+    """Append-only log of post views, written in batches by the view counter.
+
+    Each row counts a post's views within one minute (viewed_at, truncated).
+
+    The rollup watermark is an event id, so ids must never be reused: with a
+    plain rowid SQLite would restart at 1 once compaction empties the table.
+    """
+    __tablename__ = 'view_events'
+
+    id = db.Column(db.Integer, primary_key=True)
+    post_id = db.Column(db.Integer, nullable=False)
+    viewed_at = db.Column(db.DateTime, nullable=False)
+    views = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    recorded_at = db.Column(db.DateTime)  # When the view counter wrote the row
+
+    __table_args__ = (
+        db.Index('ix_view_events_viewed_at', 'viewed_at'),  # Compaction
+        {'sqlite_autoincrement': True}
+    )
+
+class PostViewRollup(db.Model):
+    """Views per post per hour or day, aggregated from view_events"""
+    __tablename__ = 'post_view_rollups'
+
+    post_id = db.Column(db.Integer, primary_key=True)
+    granularity = db.Column(db.String(4), primary_key=True)  # hour, day
+    bucket = db.Column(db.DateTime, primary_key=True)  # Start of the hour or day, UTC
+    views = db.Column(db.Integer, nullable=False, default=0)
+
+class BlogViewRollup(db.Model):
+    """Views per blog per hour or day, aggregated from view_events"""
+    __tablename__ = 'blog_view_rollups'
+
+    blog_id = db.Column(db.Integer, primary_key=True)
+    granularity = db.Column(db.String(4), primary_key=True)
+    bucket = db.Column(db.DateTime, primary_key=True)
+    views = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_blog_view_rollups_granularity_bucket', 'granularity', 'bucket'),  # Site-wide series
+    )
+
+class RollupState(db.Model):
+    """Watermark of the last event folded into the rollups"""
+    __tablename__ = 'rollup_state'
+
+    name = db.Column(db.String(50), primary_key=True)
+    last_event_id = db.Column(db.Integer, nullable=False, default=0)
+    last_event_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+
+def upsert_counters(connection, table, key_columns, rows):
+    """Insert rows, adding their non-key columns onto existing rows with the same key"""
+    if not rows:
+        return
+    dialect = postgresql if connection.dialect.name == 'postgresql' else sqlite
+    statement = dialect.insert(table)
+    counters = [name for name in rows[0] if name not in key_columns]
+    statement = statement.on_conflict_do_update(
+        index_elements=key_columns,
+        set_={name: table.c[name] + getattr(statement.excluded, name) for name in counters}
+    )
+    connection.execute(statement, rows)
@@ -1,6 +1,17 @@
+import re
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from html import unescape
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import column_property, selectinload
 from src.models.user import db
+from src.models.trending import record_activity
+
+# Characters of content kept in Post.content_preview
+PREVIEW_LENGTH = 200
+
+_HIDDEN_ELEMENT_RE = re.compile(r'<(script|style)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+_TAG_RE = re.compile(r'<[^>]*>')
 
 class Blog(db.Model):
     __tablename__ = 'blogs'
@@ -36,11 +47,14 @@ class Blog(db.Model):
             'is_active': self.is_active,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'post_count': len(self.posts) if self.posts else 0
+            'post_count': self.post_count or 0
         }
 
 class Category(db.Model):
     __tablename__ = 'categories'
+    __table_args__ = (
+        db.Index('ix_categories_blog_name', 'blog_id', 'name'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -60,7 +74,7 @@ class Category(db.Model):
             'description': self.description,
             'blog_id': self.blog_id,
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'post_count': len(self.posts) if self.posts else 0
+            'post_count': self.post_count or 0
         }
 
 class Author(db.Model):
@@ -84,28 +98,42 @@ class Author(db.Model):
             'bio': self.bio,
             'avatar_url': self.avatar_url,
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'post_count': len(self.posts) if self.posts else 0
+            'post_count': self.post_count or 0
         }
 
 # Association table for many-to-many relationship between posts and categories
 post_categories = db.Table('post_categories',
     db.Column('post_id', db.Integer, db.ForeignKey('posts.id'), primary_key=True),
-    db.Column('category_id', db.Integer, db.ForeignKey('categories.id'), primary_key=True)
+    db.Column('category_id', db.Integer, db.ForeignKey('categories.id'), primary_key=True),
+    # The primary key only serves lookups by post; category post counts go by category
+    db.Index('ix_post_categories_category', 'category_id')
 )
 
 class Post(db.Model):
     __tablename__ = 'posts'
+    __table_args__ = (
+        db.Index('ix_posts_blog_status_published', 'blog_id', 'status', 'published_at'),  # blog listings
+        db.Index('uq_posts_blog_slug', 'blog_id', 'slug', unique=True),  # post pages, slug allocation
+        db.Index('ix_posts_original_id', 'original_id'),  # migration de-duplication
+        db.Index('ix_posts_status_featured_published', 'status', 'is_featured', 'published_at'),  # featured posts
+        db.Index('ix_posts_status_views', 'status', 'views'),  # popular and trending
+        db.Index('ix_posts_author', 'author_id'),  # author post counts
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(300), nullable=False)
     slug = db.Column(db.String(300), nullable=False)
-    content = db.Column(db.Text, nullable=False)
+    content = db.deferred(db.Column(db.Text, nullable=False))  # Loaded by post pages only, never by listings
     excerpt = db.Column(db.Text)
+    content_preview = db.Column(db.Text)  # Start of content, the excerpt fallback of listings; set with content
+    search_text = db.deferred(db.Column(db.Text))  # Content without markup, indexed for search; set with content
     featured_image = db.Column(db.String(500))
     status = db.Column(db.String(20), default='published')  # draft, published, archived
     blog_id = db.Column(db.Integer, db.ForeignKey('blogs.id'), nullable=False)
     author_id = db.Column(db.Integer, db.ForeignKey('authors.id'), nullable=False)
     views = db.Column(db.Integer, default=0)
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Approved comments
+    read_time = db.Column(db.Integer, nullable=False, default=1, server_default='1')  # Minutes, set with content
     is_featured = db.Column(db.Boolean, default=False)
     meta_title = db.Column(db.String(300))
     meta_description = db.Column(db.String(500))
@@ -148,6 +176,11 @@ class Post(db.Model):
 
 class Comment(db.Model):
     __tablename__ = 'comments'
+    __table_args__ = (
+        db.Index('ix_comments_post_parent_status_created', 'post_id', 'parent_id', 'status', 'created_at'),  # comment threads
+        db.Index('ix_comments_post_status', 'post_id', 'status'),  # approved comment counts
+        db.Index('ix_comments_parent', 'parent_id'),  # replies of a comment
+    )
     
     id = db.Column(db.String(36), primary_key=True)  # UUID
     post_id = db.Column(db.Integer, db.ForeignKey('posts.id'), nullable=False)
@@ -213,29 +246,141 @@ class NewsletterSubscriber(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
-# Update Post model to include comment count
-def update_post_comment_count():
-    """Add comment_count property to Post model"""
-    @property
-    def comment_count(self):
-        return Comment.query.filter_by(post_id=self.id, status='approved').count()
-    
-    Post.comment_count = comment_count
+def content_preview(content):
+    """Start of the content for listings of posts without an excerpt"""
+    return content[:PREVIEW_LENGTH] if content else ''
 
-# Add read_time property to Post model
-def update_post_read_time():
-    """Add read_time property to Post model"""
-    @property
-    def read_time(self):
-        if not self.content:
-            return 1
-        # Estimate reading time: average 200 words per minute
-        word_count = len(self.content.split())
-        return max(1, round(word_count / 200))
-    
-    Post.read_time = read_time
+def content_text(content):
+    """Visible text of HTML content: what search indexes and builds snippets from"""
+    if not content:
+        return ''
+    text = _TAG_RE.sub(' ', _HIDDEN_ELEMENT_RE.sub(' ', content))
+    return ' '.join(unescape(text).split())
+
+def estimate_read_time(content):
+    """Estimate reading time in minutes: average 200 words per minute"""
+    if not content:
+        return 1
+    return max(1, round(len(content.split()) / 200))
+
+# Denormalized fields: read_time, content_preview and search_text follow content,
+# comment_count follows approved comments
+@event.listens_for(Post.content, 'set')
+def _update_content_fields(post, value, oldvalue, initiator):
+    post.read_time = estimate_read_time(value)
+    post.content_preview = content_preview(value)
+    post.search_text = content_text(value)
+
+def _adjust_comment_count(connection, post_id, delta):
+    posts = Post.__table__
+    connection.execute(
+        posts.update().where(posts.c.id == post_id).values(
+            comment_count=posts.c.comment_count + delta,
+            updated_at=posts.c.updated_at  # A new comment doesn't modify the post itself
+        )
+    )
+    record_activity(connection, comments={post_id: delta})
+
+@event.listens_for(Comment, 'after_insert')
+def _comment_inserted(mapper, connection, comment):
+    if comment.status == 'approved':
+        _adjust_comment_count(connection, comment.post_id, 1)
+
+@event.listens_for(Comment, 'after_update')
+def _comment_moderated(mapper, connection, comment):
+    history = inspect(comment).attrs.status.history
+    if not history.has_changes():
+        return
+    was_approved = 'approved' in (history.deleted or ())
+    if was_approved != (comment.status == 'approved'):
+        _adjust_comment_count(connection, comment.post_id, -1 if was_approved else 1)
+
+@event.listens_for(Comment, 'after_delete')
+def _comment_deleted(mapper, connection, comment):
+    if comment.status == 'approved':
+        _adjust_comment_count(connection, comment.post_id, -1)
+
+# Post counts as deferred aggregate subqueries, so to_dict() never loads whole
+# post collections just to count them
+Blog.post_count = column_property(
+    select(func.count(Post.id)).where(Post.blog_id == Blog.id).correlate_except(Post).scalar_subquery(),
+    deferred=True
+)
+Author.post_count = column_property(
+    select(func.count(Post.id)).where(Post.author_id == Author.id).correlate_except(Post).scalar_subquery(),
+    deferred=True
+)
+Category.post_count = column_property(
+    select(func.count(post_categories.c.post_id))
+    .where(post_categories.c.category_id == Category.id)
+    .correlate_except(post_categories)
+    .scalar_subquery(),
+    deferred=True
+)
+
+def post_listing_options():
+    """Loader options that fetch author, blog and categories for a page of posts
+    in one extra query each, with their post counts included"""
+    return (
+        selectinload(Post.author).undefer(Author.post_count),
+        selectinload(Post.blog).undefer(Blog.post_count),
+        selectinload(Post.categories).undefer(Category.post_count)
+    )
+
+
+# Listings can also be read as row tuples rather than Post objects: the columns
+# to_dict() reads, datetimes left for the JSON provider to write
+POST_LISTING_COLUMNS = (
+    Post.id, Post.title, Post.slug, Post.excerpt, Post.featured_image, Post.status, Post.blog_id,
+    Post.author_id, Post.views, Post.is_featured, Post.meta_title, Post.meta_description,
+    Post.published_at, Post.created_at, Post.updated_at
+)
+AUTHOR_COLUMNS = (Author.id, Author.name, Author.email, Author.bio, Author.avatar_url, Author.created_at,
+                  Author.post_count)
+BLOG_COLUMNS = (Blog.id, Blog.name, Blog.slug, Blog.title, Blog.description, Blog.tagline, Blog.logo_url,
+                Blog.primary_color, Blog.secondary_color, Blog.is_active, Blog.created_at, Blog.updated_at,
+                Blog.post_count)
+CATEGORY_COLUMNS = (Category.id, Category.name, Category.slug, Category.description, Category.blog_id,
+                    Category.created_at, Category.post_count)
+
+def post_listing_related(rows):
+    """Selects of the authors, blogs and categories of a page of POST_LISTING_COLUMNS
+    rows, one each like the loads of post_listing_options()"""
+    return (
+        select(*AUTHOR_COLUMNS).where(Author.id.in_({row.author_id for row in rows})),
+        select(*BLOG_COLUMNS).where(Blog.id.in_({row.blog_id for row in rows})),
+        select(post_categories.c.post_id, *CATEGORY_COLUMNS)
+        .join(post_categories, post_categories.c.category_id == Category.id)
+        .where(post_categories.c.post_id.in_([row.id for row in rows]))
+        .order_by(post_categories.c.post_id, Category.id)
+    )
+
+def counted_dict(row):
+    """Dict of a row that has a post_count column, as to_dict() reports it"""
+    data = row._asdict()
+    data['post_count'] = data['post_count'] or 0
+    return data
+
+def post_listing_dicts(rows, authors, blogs, categories):
+    """Post.to_dict() of each row of a page, given the results of post_listing_related()"""
+    authors = {row.id: counted_dict(row) for row in authors}
+    blogs = {row.id: counted_dict(row) for row in blogs}
+    categories_by_post = {}
+    for row in categories:
+        data = counted_dict(row)
+        categories_by_post.setdefault(data.pop('post_id'), []).append(data)
 
-# Apply the updates
-update_post_comment_count()
-update_post_read_time()
+    posts = []
+    for row in rows:
+        data = row._asdict()
+        data['author'] = authors.get(row.author_id)
+        data['blog'] = blogs.get(row.blog_id)
+        data['categories'] = categories_by_post.get(row.id, [])
+        posts.append(data)
+    return posts
 
+def listing_posts(rows):
+    """post_listing_dicts() for rows read through db.session"""
+    if not rows:
+        return []
+    return post_listing_dicts(rows, *(db.session.execute(query).all() for query in post_listing_related(rows)))
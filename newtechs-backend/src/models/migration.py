@@ -0,0 +1,70 @@
+import json
+from datetime import datetime
+from src.models.user import db
+
+class MigrationJob(db.Model):
+    __tablename__ = 'migration_jobs'
+
+    id = db.Column(db.String(36), primary_key=True)  # UUID
+    status = db.Column(db.String(20), default='pending')  # pending, running, completed, failed
+    options = db.Column(db.Text)  # JSON: batch_size, workers
+    results = db.Column(db.Text)  # JSON summary of the last run
+    error = db.Column(db.Text)
+    attempts = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    blogs = db.relationship('MigrationJobBlog', backref='job', lazy=True, cascade='all, delete-orphan',
+                            order_by='MigrationJobBlog.id')
+
+    def to_dict(self, include_blogs=True):
+        data = {
+            'id': self.id,
+            'status': self.status,
+            'options': json.loads(self.options) if self.options else {},
+            'results': json.loads(self.results) if self.results else None,
+            'error': self.error,
+            'attempts': self.attempts,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+        if include_blogs:
+            data['blogs'] = [blog.to_dict() for blog in self.blogs]
+
+        return data
+
+class MigrationJobBlog(db.Model):
+    """Per-blog progress of a migration job, committed together with each imported batch"""
+    __tablename__ = 'migration_job_blogs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.String(36), db.ForeignKey('migration_jobs.id'), nullable=False)
+    source = db.Column(db.String(200), nullable=False)  # Blogger takeout folder
+    blog_id = db.Column(db.Integer, db.ForeignKey('blogs.id'), nullable=False)
+    feed_path = db.Column(db.String(500), nullable=False)
+    status = db.Column(db.String(20), default='pending')  # pending, running, completed, failed
+    entries_seen = db.Column(db.Integer, default=0)
+    imported = db.Column(db.Integer, default=0)
+    skipped = db.Column(db.Integer, default=0)
+    errors = db.Column(db.Integer, default=0)
+    last_error = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'source': self.source,
+            'blog_id': self.blog_id,
+            'status': self.status,
+            'entries_seen': self.entries_seen or 0,
+            'imported': self.imported or 0,
+            'skipped': self.skipped or 0,
+            'errors': self.errors or 0,
+            'last_error': self.last_error,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
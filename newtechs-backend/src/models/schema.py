@@ -0,0 +1,248 @@
+from datetime import datetime
+from sqlalchemy import bindparam, func, inspect, select
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+from src.models.blog import (Post, Comment, Category, post_categories, content_text, estimate_read_time,
+                             PREVIEW_LENGTH)
+from src.models.analytics import ViewEvent, RollupState
+from src.models.search import FTS_TABLE, drop_search_index
+from src.services.slugs import SlugAllocator
+
+class SchemaMigration(db.Model):
+    """Versioned schema steps applied to this database.
+
+    db.create_all() creates missing tables but never alters existing ones, so
+    changes to tables that already hold data go through upgrade_schema().
+    """
+    __tablename__ = 'schema_migrations'
+
+    version = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'version': self.version,
+            'name': self.name,
+            'applied_at': self.applied_at.isoformat() if self.applied_at else None
+        }
+
+def _create_indexes(conn, *tables, unique=False):
+    for table in tables:
+        for index in table.indexes:
+            if bool(index.unique) == unique:
+                index.create(conn, checkfirst=True)
+
+def add_query_indexes(conn):
+    # Unique indexes come with the steps that first clean up the rows they would reject
+    _create_indexes(conn, Post.__table__, Comment.__table__, Category.__table__, post_categories)
+
+def _add_missing_columns(conn, table, *columns):
+    existing = {column['name'] for column in inspect(conn).get_columns(table.name)}
+    for name in columns:
+        if name in existing:
+            continue
+        column = table.c[name]
+        ddl = f"ALTER TABLE {table.name} ADD COLUMN {name} {column.type.compile(conn.dialect)}"
+        if not column.nullable:
+            ddl += f" NOT NULL DEFAULT {column.server_default.arg}"
+        conn.exec_driver_sql(ddl)
+
+def backfill_post_counters(conn, batch_size=500):
+    """Recompute comment_count and read_time for every post, batch_size posts at a time"""
+    posts = Post.__table__
+    comments = Comment.__table__
+    approved = (
+        select(func.count()).where(comments.c.post_id == posts.c.id, comments.c.status == 'approved')
+        .scalar_subquery()
+    )
+    keep_updated_at = {'updated_at': posts.c.updated_at}
+    update_read_time = posts.update().where(posts.c.id == bindparam('post_id')).values(
+        read_time=bindparam('minutes'), **keep_updated_at
+    )
+
+    updated = 0
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            select(posts.c.id, posts.c.content).where(posts.c.id > last_id).order_by(posts.c.id).limit(batch_size)
+        ).all()
+        if not rows:
+            return updated
+
+        first_id, last_id = rows[0].id, rows[-1].id
+        conn.execute(posts.update().where(posts.c.id.between(first_id, last_id)).values(
+            comment_count=approved, **keep_updated_at
+        ))
+        conn.execute(update_read_time, [{'post_id': row.id, 'minutes': estimate_read_time(row.content)} for row in rows])
+        updated += len(rows)
+
+def add_post_counters(conn):
+    _add_missing_columns(conn, Post.__table__, 'comment_count', 'read_time')
+    backfill_post_counters(conn)
+
+def backfill_content_previews(conn, batch_size=500):
+    """Set content_preview from content for every post, batch_size posts at a time"""
+    posts = Post.__table__
+    set_preview = posts.update().values(
+        content_preview=func.substr(posts.c.content, 1, PREVIEW_LENGTH), updated_at=posts.c.updated_at
+    )
+    updated = 0
+    last_id = 0
+    while True:
+        ids = conn.scalars(select(posts.c.id).where(posts.c.id > last_id).order_by(posts.c.id).limit(batch_size)).all()
+        if not ids:
+            return updated
+        conn.execute(set_preview.where(posts.c.id.between(ids[0], ids[-1])))
+        last_id = ids[-1]
+        updated += len(ids)
+
+def add_content_previews(conn):
+    _add_missing_columns(conn, Post.__table__, 'content_preview')
+    backfill_content_previews(conn)
+
+def backfill_search_text(conn, batch_size=500):
+    """Set search_text from content for every post, batch_size posts at a time"""
+    posts = Post.__table__
+    set_text = posts.update().where(posts.c.id == bindparam('post_id')).values(
+        search_text=bindparam('text'), updated_at=posts.c.updated_at
+    )
+    updated = 0
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            select(posts.c.id, posts.c.content).where(posts.c.id > last_id).order_by(posts.c.id).limit(batch_size)
+        ).all()
+        if not rows:
+            return updated
+        conn.execute(set_text, [{'post_id': row.id, 'text': content_text(row.content)} for row in rows])
+        last_id = rows[-1].id
+        updated += len(rows)
+
+def add_search_text(conn):
+    if conn.dialect.name == 'sqlite':
+        ddl = conn.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+        ).scalar()
+        if ddl is not None and 'search_text' not in ddl:
+            # Indexed raw HTML; ensure_search_index() rebuilds it over search_text
+            drop_search_index(conn)
+    _add_missing_columns(conn, Post.__table__, 'search_text')
+    backfill_search_text(conn)
+
+def dedupe_post_slugs(conn):
+    """Rename the second and later posts sharing a (blog_id, slug) to the next free suffixes; returns how many"""
+    posts = Post.__table__
+    duplicates = conn.execute(
+        select(posts.c.blog_id, posts.c.slug).group_by(posts.c.blog_id, posts.c.slug).having(func.count() > 1)
+    ).all()
+    allocators = {}
+    renames = []
+    for blog_id, slug in duplicates:
+        allocator = allocators.setdefault(blog_id, SlugAllocator(blog_id, conn))
+        allocator.load([slug])
+        post_ids = conn.scalars(
+            select(posts.c.id).where(posts.c.blog_id == blog_id, posts.c.slug == slug).order_by(posts.c.id)
+        ).all()
+        renames.extend({'post_id': post_id, 'new_slug': allocator.allocate(slug)} for post_id in post_ids[1:])
+    if renames:
+        conn.execute(posts.update().where(posts.c.id == bindparam('post_id')).values(
+            slug=bindparam('new_slug'), updated_at=posts.c.updated_at
+        ), renames)
+    return len(renames)
+
+def add_unique_post_slugs(conn):
+    dedupe_post_slugs(conn)
+    if 'ix_posts_blog_slug' in {index['name'] for index in inspect(conn).get_indexes(Post.__tablename__)}:
+        conn.exec_driver_sql('DROP INDEX ix_posts_blog_slug')  # Superseded by uq_posts_blog_slug
+    _create_indexes(conn, Post.__table__, unique=True)
+
+def add_comment_thread_status(conn):
+    # Without ANALYZE statistics SQLite rated (post_id, parent_id) and
+    # ix_comments_post_status alike for the thread walk; a third equality
+    # column settles it
+    if 'ix_comments_post_parent_created' in {index['name'] for index in inspect(conn).get_indexes(Comment.__tablename__)}:
+        conn.exec_driver_sql('DROP INDEX ix_comments_post_parent_created')
+    _create_indexes(conn, Comment.__table__)
+
+def add_view_event_autoincrement(conn):
+    """Rebuild view_events with AUTOINCREMENT so ids stay above the rollup watermark"""
+    if conn.dialect.name != 'sqlite':
+        return  # Serial and identity columns never reuse ids
+    ddl = conn.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'view_events'"
+    ).scalar()
+    if ddl is None or 'AUTOINCREMENT' in ddl.upper():
+        return
+
+    conn.exec_driver_sql('ALTER TABLE view_events RENAME TO view_events_old')
+    conn.exec_driver_sql('DROP INDEX IF EXISTS ix_view_events_viewed_at')
+    ViewEvent.__table__.create(conn)
+    conn.exec_driver_sql('INSERT INTO view_events (id, post_id, viewed_at) SELECT id, post_id, viewed_at FROM view_events_old')
+    conn.exec_driver_sql('DROP TABLE view_events_old')
+
+    # Start past both the surviving events and the watermark of compacted ones
+    watermark = conn.execute(select(func.max(RollupState.last_event_id))).scalar() or 0
+    last_id = conn.execute(select(func.max(ViewEvent.id))).scalar() or 0
+    conn.exec_driver_sql("DELETE FROM sqlite_sequence WHERE name = 'view_events'")
+    conn.exec_driver_sql("INSERT INTO sqlite_sequence (name, seq) VALUES ('view_events', ?)", (max(watermark, last_id),))
+
+def add_view_event_counts(conn):
+    # Existing rows are single views, which the column's default of 1 says
+    _add_missing_columns(conn, ViewEvent.__table__, 'views')
+
+def add_view_event_recorded_at(conn):
+    # Existing rows stay NULL, which the rollup treats as long settled
+    _add_missing_columns(conn, ViewEvent.__table__, 'recorded_at')
+
+# (version, name, step); steps must be idempotent since fresh databases already
+# get the current schema from create_all()
+MIGRATIONS = [
+    (1, 'Indexes for post listings, lookups, comments and categories', add_query_indexes),
+    (2, 'Denormalized post comment_count and read_time', add_post_counters),
+    (3, 'Unique post slugs per blog', add_unique_post_slugs),
+    (4, 'Denormalized post content_preview', add_content_previews),
+    (5, 'Comment thread index with status', add_comment_thread_status),
+    (6, 'Never reuse view event ids', add_view_event_autoincrement),
+    (7, 'Plain-text post content for search', add_search_text),
+    (8, 'Per-minute view counts in view_events', add_view_event_counts),
+    (9, 'Write time of view events', add_view_event_recorded_at),
+]
+
+def current_version():
+    return db.session.query(db.func.max(SchemaMigration.version)).scalar() or 0
+
+def upgrade_schema():
+    """Apply pending migration steps in order, each in its own transaction; returns the versions applied"""
+    applied = {version for (version,) in db.session.query(SchemaMigration.version)}
+    db.session.commit()
+
+    newly_applied = []
+    for version, name, step in MIGRATIONS:
+        if version in applied:
+            continue
+        try:
+            with db.engine.begin() as conn:
+                step(conn)
+                conn.execute(SchemaMigration.__table__.insert().values(
+                    version=version, name=name, applied_at=datetime.utcnow()
+                ))
+        except IntegrityError:
+            # Another process recorded this version first
+            continue
+        newly_applied.append(version)
+    return newly_applied
+
+def create_schema():
+    """Create missing tables, apply pending steps and build the search index; returns the versions applied.
+
+    The app doesn't do this at startup; run it once per deploy with
+    `flask --app src.main init-db`.
+    """
+    from src.models import analytics, blog, migration, trending, user  # noqa: F401 (registers every table)
+    from src.models.search import ensure_search_index
+
+    db.create_all()
+    applied = upgrade_schema()
+    ensure_search_index()
+    return applied
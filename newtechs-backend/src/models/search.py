@@ -0,0 +1,171 @@
+import re
+from html import escape
+from sqlalchemy import bindparam, text
+from src.models.user import db
+
+# External-content FTS5 index over posts; the triggers below keep it in sync with
+# every insert, delete and title/excerpt/search_text update (create_post, migrations).
+# It indexes search_text, the content without markup, so tag and attribute names
+# don't match and snippets never contain HTML from the post
+FTS_TABLE = 'posts_fts'
+INDEXED_COLUMNS = 'title, excerpt, search_text'
+
+_CREATE_STATEMENTS = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        {INDEXED_COLUMNS},
+        content='posts', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS posts_fts_ai AFTER INSERT ON posts BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {INDEXED_COLUMNS})
+        VALUES (new.id, new.title, new.excerpt, new.search_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS posts_fts_ad AFTER DELETE ON posts BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {INDEXED_COLUMNS})
+        VALUES ('delete', old.id, old.title, old.excerpt, old.search_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS posts_fts_au AFTER UPDATE OF {INDEXED_COLUMNS} ON posts BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {INDEXED_COLUMNS})
+        VALUES ('delete', old.id, old.title, old.excerpt, old.search_text);
+        INSERT INTO {FTS_TABLE}(rowid, {INDEXED_COLUMNS})
+        VALUES (new.id, new.title, new.excerpt, new.search_text);
+    END"""
+]
+TRIGGERS = ('posts_fts_ai', 'posts_fts_ad', 'posts_fts_au')
+
+# bm25() column weights: title, excerpt, search_text
+BM25_WEIGHTS = (10.0, 5.0, 1.0)
+
+# snippet() match markers: control characters no post text contains, swapped
+# for <mark> once the rest of the snippet is escaped
+_MARK_START, _MARK_END = '\x02', '\x03'
+
+_TOKEN_RE = re.compile(r'"([^"]*)"|(\S+)')
+_WORD_RE = re.compile(r'\w+')
+
+def search_index_available():
+    """Check whether the FTS5 index can be used on the current database"""
+    return db.engine.dialect.name == 'sqlite'
+
+def ensure_search_index():
+    """Create the FTS5 index and sync triggers, populating it on first creation"""
+    if not search_index_available():
+        return False
+
+    with db.engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': FTS_TABLE}
+        ).first()
+        for statement in _CREATE_STATEMENTS:
+            conn.execute(text(statement))
+        if not exists:
+            conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    return True
+
+def drop_search_index(conn):
+    """Drop the index and its triggers; ensure_search_index() recreates and repopulates them"""
+    for trigger in TRIGGERS:
+        conn.exec_driver_sql(f'DROP TRIGGER IF EXISTS {trigger}')
+    conn.exec_driver_sql(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+def rebuild_search_index():
+    """Rebuild the whole index from the posts table"""
+    with db.engine.begin() as conn:
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+def build_match_query(query):
+    """Turn user input into a safe FTS5 MATCH expression.
+
+    Words are ANDed, "quoted text" becomes a phrase and a trailing * makes a
+    prefix query. Everything else is treated as plain text.
+    """
+    terms = []
+    for phrase, word in _TOKEN_RE.findall(query):
+        if phrase:
+            words = _WORD_RE.findall(phrase)
+            if words:
+                terms.append('"%s"' % ' '.join(words))
+            continue
+
+        words = _WORD_RE.findall(word)
+        terms.extend(f'"{w}"' for w in words)
+        if words and word.endswith('*'):
+            terms[-1] += '*'
+    return ' '.join(terms)
+
+def search_posts_fts(query, blog_id=None, status='published', limit=10, offset=0, order='relevance',
+                     after=None, with_total=True):
+    """Run a ranked full-text search.
+
+    Returns (total, [(post_id, snippet), ...]) for the requested page, or None
+    when the query contains no searchable terms. `after` is a (published_at, id)
+    keyset position for date-ordered cursor pages; total is None without with_total.
+    """
+    match = build_match_query(query)
+    if not match:
+        return None
+
+    filters = f"{FTS_TABLE} MATCH :match AND posts.status = :status"
+    params = {'match': match, 'status': status}
+    if blog_id is not None:
+        filters += " AND posts.blog_id = :blog_id"
+        params['blog_id'] = blog_id
+
+    # CROSS JOIN pins the FTS index as the outer loop. Without statistics the
+    # planner would otherwise start from posts via a status-leading index and
+    # evaluate MATCH once per published post
+    total = None
+    if with_total:
+        total = db.session.execute(
+            text(f"SELECT COUNT(*) FROM {FTS_TABLE} CROSS JOIN posts ON posts.id = {FTS_TABLE}.rowid WHERE {filters}"),
+            params
+        ).scalar()
+
+    bind_types = []
+    if after is not None:
+        order = 'date'
+        after_published_at, params['after_id'] = after
+        if after_published_at is None:
+            filters += " AND posts.published_at IS NULL AND posts.id < :after_id"
+        else:
+            filters += (" AND (posts.published_at < :after_published_at"
+                        " OR (posts.published_at = :after_published_at AND posts.id < :after_id)"
+                        " OR posts.published_at IS NULL)")
+            params['after_published_at'] = after_published_at
+            # Stored with the DateTime column's string format, so bind it the same way
+            bind_types.append(bindparam('after_published_at', type_=db.DateTime))
+
+    if order == 'date':
+        order_by = "posts.published_at DESC, posts.id DESC"
+    else:
+        order_by = "bm25(%s, %s, %s, %s)" % ((FTS_TABLE,) + BM25_WEIGHTS)
+
+    # Rank first and build snippets only for the requested page; snippet() in the
+    # ranked query would be evaluated for every match before sorting
+    post_ids = db.session.execute(
+        text(
+            f"SELECT posts.id FROM {FTS_TABLE} CROSS JOIN posts ON posts.id = {FTS_TABLE}.rowid "
+            f"WHERE {filters} ORDER BY {order_by} LIMIT :limit OFFSET :offset"
+        ).bindparams(*bind_types),
+        dict(params, limit=limit, offset=offset)
+    ).scalars().all()
+    if not post_ids:
+        return total, []
+
+    id_params = {f'id_{i}': post_id for i, post_id in enumerate(post_ids)}
+    snippets = dict(db.session.execute(
+        text(
+            f"SELECT rowid, snippet({FTS_TABLE}, -1, :mark_start, :mark_end, '...', 24) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH :match AND rowid IN ({', '.join(':' + key for key in id_params)})"
+        ),
+        dict(id_params, match=match, mark_start=_MARK_START, mark_end=_MARK_END)
+    ).all())
+
+    return total, [(post_id, highlight(snippets.get(post_id))) for post_id in post_ids]
+
+def highlight(snippet):
+    """HTML of a snippet: its text escaped, its matches in <mark>"""
+    if snippet is None:
+        return None
+    return escape(snippet).replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
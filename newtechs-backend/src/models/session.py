@@ -0,0 +1,51 @@
+import time
+from flask import current_app, g, has_app_context, has_request_context, request
+from flask_sqlalchemy.session import Session
+
+STICKY_COOKIE = 'db_primary_until'
+
+def reads_from_primary():
+    """Whether this request must read its own writes: it wrote, or its client did moments ago"""
+    if g.get('db_wrote'):
+        return True
+    if not has_request_context():
+        return False
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+class RoutingSession(Session):
+    """db.session that sends the reads of @read_only views to a read bind.
+
+    Only statements that would use the default engine are rerouted. Flushes and
+    INSERT/UPDATE/DELETE statements always go to the primary and mark the
+    request as having written, which keeps the rest of the request and, for a
+    short while, the same client on the primary (read-your-writes). One session
+    (one request) reads from a single replica.
+    """
+
+    def __init__(self, db, **kwargs):
+        super().__init__(db, **kwargs)
+        self._read_bind = None
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or not has_app_context() or engine is not self._db.engines.get(None):
+            return engine
+
+        if self._flushing or getattr(clause, 'is_dml', False):
+            g.db_wrote = True
+            return engine
+
+        routing = current_app.extensions.get('db_routing')
+        if routing is not None and g.get('read_only') and not reads_from_primary():
+            if self._read_bind is None:
+                self._read_bind = routing.next_read_bind()
+            if self._read_bind is not None:
+                return self._db.engines[self._read_bind]
+        return engine
+
+    def close(self):
+        super().close()
+        self._read_bind = None
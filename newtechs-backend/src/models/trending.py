@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+from sqlalchemy import or_
+from sqlalchemy.dialects import postgresql, sqlite
+from src.models.user import db
+from src.models.analytics import upsert_counters
+
+class PostActivity(db.Model):
+    """Views and approved comments a post received during one hour"""
+    __tablename__ = 'post_activity'
+
+    post_id = db.Column(db.Integer, db.ForeignKey('posts.id'), primary_key=True)
+    bucket = db.Column(db.DateTime, primary_key=True)  # Start of the hour, UTC
+    views = db.Column(db.Integer, nullable=False, default=0)
+    comments = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_post_activity_bucket', 'bucket'),
+    )
+
+class TrendingPost(db.Model):
+    """Materialized trending ranking per timeframe, rebuilt by the trending engine"""
+    __tablename__ = 'trending_posts'
+
+    timeframe = db.Column(db.String(10), primary_key=True)  # day, week, month, all
+    post_id = db.Column(db.Integer, db.ForeignKey('posts.id'), primary_key=True)
+    blog_id = db.Column(db.Integer, nullable=False)
+    score = db.Column(db.Float, nullable=False)
+    normalized_score = db.Column(db.Integer, nullable=False)  # 0-100 relative to the timeframe's top post
+    views = db.Column(db.Integer, nullable=False, default=0)  # In the window
+    comments = db.Column(db.Integer, nullable=False, default=0)
+    computed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_trending_posts_timeframe_score', 'timeframe', 'score'),
+        db.Index('ix_trending_posts_timeframe_blog_score', 'timeframe', 'blog_id', 'score'),
+    )
+
+class RefreshLease(db.Model):
+    """Which process refreshes a materialized table, and until when it may without renewing"""
+    __tablename__ = 'refresh_leases'
+
+    name = db.Column(db.String(50), primary_key=True)
+    owner = db.Column(db.String(100))
+    expires_at = db.Column(db.DateTime)
+
+def claim_lease(connection, name, owner, seconds, now=None):
+    """Take or renew the named lease for `seconds`; returns whether owner holds it.
+
+    One conditional UPDATE decides between concurrent processes: it matches
+    only when the lease is free, expired or already owner's.
+    """
+    now = now or datetime.utcnow()
+    table = RefreshLease.__table__
+    dialect = postgresql if connection.dialect.name == 'postgresql' else sqlite
+    connection.execute(dialect.insert(table).values(name=name).on_conflict_do_nothing(index_elements=['name']))
+    claimed = connection.execute(
+        table.update()
+        .where(table.c.name == name,
+               or_(table.c.owner.is_(None), table.c.owner == owner, table.c.expires_at < now))
+        .values(owner=owner, expires_at=now + timedelta(seconds=seconds))
+    )
+    return claimed.rowcount == 1
+
+def hour_bucket(moment=None):
+    return (moment or datetime.utcnow()).replace(minute=0, second=0, microsecond=0)
+
+def record_activity(connection, views=None, comments=None, moment=None):
+    """Add {post_id: count} views and comments to the current hour's buckets.
+
+    Runs on the caller's connection so the counters commit together with the
+    write that produced them (view counter flush, comment insert).
+    """
+    bucket = hour_bucket(moment)
+    rows = {}
+    for post_id, count in (views or {}).items():
+        rows.setdefault(int(post_id), {'post_id': int(post_id), 'bucket': bucket, 'views': 0, 'comments': 0})['views'] += count
+    for post_id, count in (comments or {}).items():
+        rows.setdefault(int(post_id), {'post_id': int(post_id), 'bucket': bucket, 'views': 0, 'comments': 0})['comments'] += count
+    upsert_counters(connection, PostActivity.__table__, ['post_id', 'bucket'], list(rows.values()))
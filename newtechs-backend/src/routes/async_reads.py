@@ -0,0 +1,297 @@
+"""Async versions of the read-heavy blog and engagement endpoints, served in ASGI mode.
+
+They answer exactly like the WSGI views in blog.py and engagement.py (same
+bodies, cache entries and validators) but query through async_db, so a request
+waiting on the database doesn't hold a worker thread.
+"""
+import asyncio
+from flask import request, jsonify, current_app
+from sqlalchemy import desc, func, select
+from sqlalchemy.orm import contains_eager, joinedload, undefer
+from src.models.blog import (Blog, Post, Category, POST_LISTING_COLUMNS, post_listing_options, post_listing_related,
+                             post_listing_dicts)
+from src.models.trending import TrendingPost
+from src.routes.blog import post_etag
+from src.routes.engagement import trending_response, lifetime_rows, popular_response
+from src.services.asgi import AsyncRoutes
+from src.services.async_db import async_db
+from src.services.view_counter import view_counter
+from src.services.cache import response_cache, cache_tags, blog_tag
+from src.services.http_cache import conditional, last_modified, latest, not_modified, with_validators
+from src.services.pagination import (page_size, cursor_requested, total_requested, decode_cursor, after_position,
+                                     null_tail, cursor_pagination, DEFAULT_MAX_PER_PAGE)
+from src.services.trending import trending, TIMEFRAMES
+
+async_reads = AsyncRoutes()
+
+async def posts_last_modified(session, blog_id=None):
+    query = select(func.max(Post.updated_at))
+    if blog_id is not None:
+        query = query.where(Post.blog_id == blog_id)
+    return await session.scalar(query)
+
+async def active_blog(session, slug, *options):
+    return await session.scalar(select(Blog).filter_by(slug=slug, is_active=True).options(*options).limit(1))
+
+async def listing_posts(session, rows):
+    """models.blog.listing_posts() on an AsyncSession"""
+    if not rows:
+        return []
+    related = [(await session.execute(query)).all() for query in post_listing_related(rows)]
+    return post_listing_dicts(rows, *related)
+
+async def keyset_page(session, query, per_page, cursor, include_total=False):
+    """pagination.keyset_page for a select() of rows run on an AsyncSession"""
+    position = decode_cursor(cursor)
+    total = None
+    if include_total:
+        total = await session.scalar(select(func.count()).select_from(query.order_by(None).subquery()))
+
+    ordered = query.order_by(Post.published_at.desc(), Post.id.desc())
+    if position is not None:
+        ordered = ordered.where(after_position(position))
+    rows = (await session.execute(ordered.limit(per_page + 1))).all()
+
+    tail = null_tail(position, rows, per_page)
+    if tail is not None:
+        rows += (await session.execute(
+            query.where(tail).order_by(Post.id.desc()).limit(per_page + 1 - len(rows))
+        )).all()
+    return rows[:per_page], cursor_pagination(rows, per_page, total)
+
+@async_reads.route('/api/blogs')
+@response_cache.cached()
+@conditional
+async def get_blogs():
+    """Get all blogs"""
+    try:
+        cache_tags('blogs')
+        async with async_db.session() as session:
+            blogs = (await session.scalars(
+                select(Blog).filter_by(is_active=True).options(undefer(Blog.post_count))
+            )).all()
+            last_modified(await posts_last_modified(session), *[blog.updated_at for blog in blogs])
+        return jsonify({
+            'success': True,
+            'blogs': [blog.to_dict() for blog in blogs]
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@async_reads.route('/api/blogs/<slug>')
+@response_cache.cached()
+@conditional
+async def get_blog(slug):
+    """Get specific blog by slug"""
+    try:
+        cache_tags(blog_tag(slug))
+        async with async_db.session() as session:
+            blog = await active_blog(session, slug, undefer(Blog.post_count))
+            if not blog:
+                return jsonify({'success': False, 'error': 'Blog not found'}), 404
+            last_modified(blog.updated_at, await posts_last_modified(session, blog.id))
+        return jsonify({
+            'success': True,
+            'blog': blog.to_dict()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@async_reads.route('/api/blogs/<blog_slug>/posts')
+@conditional
+async def get_blog_posts(blog_slug):
+    """Get posts for a specific blog"""
+    try:
+        async with async_db.session() as session:
+            blog = await active_blog(session, blog_slug)
+            if not blog:
+                return jsonify({'success': False, 'error': 'Blog not found'}), 404
+            last_modified(blog.updated_at, await posts_last_modified(session, blog.id))
+
+            page = request.args.get('page', 1, type=int)
+            per_page = page_size()
+            status = request.args.get('status', 'published')
+            category = request.args.get('category')
+
+            query = select(*POST_LISTING_COLUMNS).filter_by(blog_id=blog.id, status=status)
+            if category:
+                query = query.join(Post.categories).where(Category.slug == category)
+
+            if cursor_requested():
+                try:
+                    posts, pagination = await keyset_page(session, query, per_page, request.args.get('cursor'),
+                                                          total_requested())
+                except ValueError as e:
+                    return jsonify({'success': False, 'error': str(e)}), 400
+                return jsonify({
+                    'success': True,
+                    'posts': await listing_posts(session, posts),
+                    'pagination': pagination
+                })
+
+            # Same numbers as Flask-SQLAlchemy's paginate(error_out=False)
+            current = max(page, 1)
+            total = await session.scalar(select(func.count()).select_from(query.subquery()))
+            rows = (await session.execute(
+                query.order_by(Post.published_at.desc()).limit(per_page).offset((current - 1) * per_page)
+            )).all()
+            posts = await listing_posts(session, rows)
+            pages = (total + per_page - 1) // per_page if total else 0
+
+        return jsonify({
+            'success': True,
+            'posts': posts,
+            'pagination': {
+                'page': page,
+                'per_page': per_page,
+                'total': total,
+                'pages': pages,
+                'has_next': current < pages,
+                'has_prev': current > 1
+            }
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@async_reads.route('/api/blogs/<blog_slug>/posts/<post_slug>')
+async def get_post(blog_slug, post_slug):
+    """Get specific post"""
+    try:
+        async with async_db.session() as session:
+            blog = await active_blog(session, blog_slug, undefer(Blog.post_count))
+            if not blog:
+                return jsonify({'success': False, 'error': 'Blog not found'}), 404
+
+            # Content stays deferred: a revalidation answered 304 never reads it
+            post = await session.scalar(
+                select(Post).filter_by(blog_id=blog.id, slug=post_slug, status='published')
+                .options(*post_listing_options()).limit(1)
+            )
+            if not post:
+                return jsonify({'success': False, 'error': 'Post not found'}), 404
+
+            # A full buffer is written from a background thread, never on the event loop
+            view_counter.increment(post.id)
+
+            etag = post_etag(post, blog)
+            modified = latest(post.updated_at, blog.updated_at)
+            unchanged = not_modified(etag, modified, weak=True)
+            if unchanged is not None:
+                return unchanged
+
+            # Lazy loads can't run under asyncio, so fetch the content explicitly
+            await session.refresh(post, ['content'])
+
+        post_data = post.to_dict(include_content=True)
+        post_data['views'] = (post.views or 0) + view_counter.pending(post.id)
+
+        return with_validators(jsonify({
+            'success': True,
+            'post': post_data
+        }), etag, modified, weak=True)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@async_reads.route('/api/blogs/<blog_slug>/categories')
+@response_cache.cached()
+@conditional
+async def get_blog_categories(blog_slug):
+    """Get categories for a specific blog"""
+    try:
+        cache_tags(blog_tag(blog_slug))
+        async with async_db.session() as session:
+            blog = await active_blog(session, blog_slug)
+            if not blog:
+                return jsonify({'success': False, 'error': 'Blog not found'}), 404
+            last_modified(blog.updated_at, await posts_last_modified(session, blog.id))
+
+            categories = (await session.scalars(
+                select(Category).filter_by(blog_id=blog.id).options(undefer(Category.post_count))
+            )).all()
+        return jsonify({
+            'success': True,
+            'categories': [category.to_dict() for category in categories]
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@async_reads.route('/api/featured-posts')
+@response_cache.cached()
+async def get_featured_posts():
+    """Get featured posts across all blogs"""
+    try:
+        cache_tags('posts')
+        limit = request.args.get('limit', 6, type=int)
+        async with async_db.session() as session:
+            rows = (await session.execute(
+                select(*POST_LISTING_COLUMNS).filter_by(status='published', is_featured=True)
+                .order_by(Post.published_at.desc())
+                .limit(limit)
+            )).all()
+            posts = await listing_posts(session, rows)
+        return jsonify({
+            'success': True,
+            'posts': posts
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@async_reads.route('/api/trending-posts')
+@response_cache.cached()
+async def get_trending_posts():
+    try:
+        cache_tags('posts', 'trending')
+        limit = min(max(int(request.args.get('limit', 10)), 1), current_app.config.get('MAX_PER_PAGE', DEFAULT_MAX_PER_PAGE))
+        timeframe = request.args.get('timeframe', 'week')
+        blog_slug = request.args.get('blog')
+
+        if timeframe not in TIMEFRAMES:  # all time
+            timeframe = 'all'
+
+        # The first read after startup looks up the last ranking time on the sync engine
+        materialized = await asyncio.to_thread(trending.ensure_fresh)
+        if materialized:
+            query = select(TrendingPost, Post)\
+                .join(Post, Post.id == TrendingPost.post_id)\
+                .where(TrendingPost.timeframe == timeframe)
+            order = TrendingPost.score.desc()
+        else:
+            # First ranking still being computed: rank by lifetime totals meanwhile
+            score = trending.lifetime_score()
+            query = select(Post, score.label('score')).where(score > 0)
+            order = desc('score')
+        # The ranking may predate a post's unpublishing or its blog's deactivation
+        query = query.join(Post.blog).where(Post.status == 'published', Blog.is_active.is_(True))\
+            .options(contains_eager(Post.blog), joinedload(Post.author))
+        if blog_slug:
+            query = query.where(Blog.slug == blog_slug)
+            cache_tags(blog_tag(blog_slug))
+
+        async with async_db.session() as session:
+            rows = (await session.execute(query.order_by(order).limit(limit))).all()
+        if not materialized and rows:
+            rows = lifetime_rows(rows, timeframe)
+        return jsonify(trending_response(rows, timeframe))
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@async_reads.route('/api/popular-posts/<blog_slug>')
+@response_cache.cached()
+async def get_popular_posts(blog_slug):
+    try:
+        cache_tags(blog_tag(blog_slug))
+        limit = int(request.args.get('limit', 5))
+        async with async_db.session() as session:
+            blog = await session.scalar(select(Blog).filter_by(slug=blog_slug).limit(1))
+            if not blog:
+                return jsonify({'success': False, 'error': 'Blog not found'}), 404
+
+            posts = (await session.scalars(
+                select(Post)
+                .filter_by(blog_id=blog.id, status='published')
+                .order_by(Post.views.desc())
+                .limit(limit)
+            )).all()
+        return jsonify(popular_response(posts, blog))
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
@@ -1,6 +1,18 @@
-from flask import Blueprint, request, jsonify
-from src.models.blog import Blog, Post, Category, Author, db
+from flask import Blueprint, request, jsonify, current_app
+from src.models.blog import Blog, Post, Category, Author, db, POST_LISTING_COLUMNS, listing_posts
 from src.models.user import db as user_db
+from src.models.search import search_index_available, search_posts_fts
+from src.services.view_counter import view_counter
+from src.services.cache import response_cache, cache_tags, blog_tag
+from src.services.database import read_only
+from src.services.metrics import query_budget
+from src.services.bulk_posts import BulkPostWriter, iter_ndjson, DEFAULT_BULK_BATCH_SIZE
+from src.services.slugs import SlugAllocator, with_slug_retry
+from src.services.http_cache import conditional, last_modified, latest, make_etag, not_modified, with_validators
+from src.services.pagination import (page_size, cursor_requested, total_requested, decode_cursor,
+                                     keyset_page, cursor_pagination)
+from sqlalchemy import func
+from sqlalchemy.orm import undefer
 from datetime import datetime
 import re
 
@@ -12,12 +24,31 @@ def create_slug(text):
     slug = re.sub(r'[-\s]+', '-', slug)
     return slug.strip('-')
 
+def posts_last_modified(blog_id=None):
+    """Latest post change, which also moves the post counts shown on blogs and categories"""
+    query = db.session.query(func.max(Post.updated_at))
+    if blog_id is not None:
+        query = query.filter(Post.blog_id == blog_id)
+    return query.scalar()
+
+def post_etag(post, blog):
+    """ETag of a post page. Linking or unlinking categories leaves posts.updated_at
+    alone, so the categories shown are hashed in as well"""
+    categories = sorted((category.id, category.name, category.slug, category.description)
+                        for category in post.categories)
+    return make_etag('post', post.id, post.updated_at, blog.updated_at, post.author_id, categories)
+
 # Blog endpoints
 @blog_bp.route('/blogs', methods=['GET'])
+@read_only
+@response_cache.cached()
+@conditional
 def get_blogs():
     """Get all blogs"""
     try:
-        blogs = Blog.query.filter_by(is_active=True).all()
+        cache_tags('blogs')
+        blogs = Blog.query.filter_by(is_active=True).options(undefer(Blog.post_count)).all()
+        last_modified(posts_last_modified(), *[blog.updated_at for blog in blogs])
         return jsonify({
             'success': True,
             'blogs': [blog.to_dict() for blog in blogs]
@@ -26,12 +57,17 @@ def get_blogs():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @blog_bp.route('/blogs/<slug>', methods=['GET'])
+@read_only
+@response_cache.cached()
+@conditional
 def get_blog(slug):
     """Get specific blog by slug"""
     try:
+        cache_tags(blog_tag(slug))
         blog = Blog.query.filter_by(slug=slug, is_active=True).first()
         if not blog:
             return jsonify({'success': False, 'error': 'Blog not found'}), 404
+        last_modified(blog.updated_at, posts_last_modified(blog.id))
         
         return jsonify({
             'success': True,
@@ -67,6 +103,7 @@ def create_blog():
         
         db.session.add(blog)
         db.session.commit()
+        response_cache.invalidate('blogs')
         
         return jsonify({
             'success': True,
@@ -78,30 +115,48 @@ def create_blog():
 
 # Post endpoints
 @blog_bp.route('/blogs/<blog_slug>/posts', methods=['GET'])
+@read_only
+@query_budget(8)
+@conditional
 def get_blog_posts(blog_slug):
     """Get posts for a specific blog"""
     try:
         blog = Blog.query.filter_by(slug=blog_slug, is_active=True).first()
         if not blog:
             return jsonify({'success': False, 'error': 'Blog not found'}), 404
+        last_modified(blog.updated_at, posts_last_modified(blog.id))
         
         page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
+        per_page = page_size()
         status = request.args.get('status', 'published')
         category = request.args.get('category')
         
-        query = Post.query.filter_by(blog_id=blog.id, status=status)
+        # Rows rather than Post objects; listing_posts() serializes them with their relations
+        query = Post.query.filter_by(blog_id=blog.id, status=status).with_entities(*POST_LISTING_COLUMNS)
         
         if category:
             query = query.join(Post.categories).filter(Category.slug == category)
         
+        # Cursor mode: keyset on (published_at, id), no OFFSET and no COUNT unless asked for
+        if cursor_requested():
+            try:
+                posts, pagination = keyset_page(query, per_page, request.args.get('cursor'), total_requested())
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+            
+            return jsonify({
+                'success': True,
+                'posts': listing_posts(posts),
+                'pagination': pagination
+            })
+        
         posts = query.order_by(Post.published_at.desc()).paginate(
             page=page, per_page=per_page, error_out=False
         )
         
         return jsonify({
             'success': True,
-            'posts': [post.to_dict() for post in posts.items],
+            'posts': listing_posts(posts.items),
             'pagination': {
                 'page': page,
                 'per_page': per_page,
@@ -115,6 +170,8 @@ def get_blog_posts(blog_slug):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @blog_bp.route('/blogs/<blog_slug>/posts/<post_slug>', methods=['GET'])
+@read_only
+@query_budget(10)
 def get_post(blog_slug, post_slug):
     """Get specific post"""
     try:
@@ -122,18 +179,31 @@ def get_post(blog_slug, post_slug):
         if not blog:
             return jsonify({'success': False, 'error': 'Blog not found'}), 404
         
+        # Content stays deferred: a revalidation answered 304 never reads it
         post = Post.query.filter_by(blog_id=blog.id, slug=post_slug, status='published').first()
         if not post:
             return jsonify({'success': False, 'error': 'Post not found'}), 404
         
-        # Increment view count
-        post.views += 1
-        db.session.commit()
+        # Buffer the view; it is written to the database in the next batch.
+        # Revalidations are page views too, so count them before answering 304
+        view_counter.increment(post.id)
         
-        return jsonify({
+        # Validators come from the rows' updated_at, so an unchanged post is
+        # answered without serializing it. The ETag is weak: it leaves out the live
+        # view count and post counts, so it vouches for meaning, not bytes.
+        etag = post_etag(post, blog)
+        modified = latest(post.updated_at, blog.updated_at)
+        unchanged = not_modified(etag, modified, weak=True)
+        if unchanged is not None:
+            return unchanged
+        
+        post_data = post.to_dict(include_content=True)  # Loads the content
+        post_data['views'] = (post.views or 0) + view_counter.pending(post.id)
+        
+        return with_validators(jsonify({
             'success': True,
-            'post': post.to_dict(include_content=True)
-        })
+            'post': post_data
+        }), etag, modified, weak=True)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -142,61 +212,59 @@ def create_post():
     """Create new post"""
     try:
         data = request.get_json()
-        
-        # Get or create author
-        author_name = data.get('author_name', 'Admin')
-        author = Author.query.filter_by(name=author_name).first()
-        if not author:
-            author = Author(name=author_name, email=data.get('author_email'))
-            db.session.add(author)
-            db.session.flush()
-        
-        # Create slug from title
-        slug = create_slug(data.get('title', ''))
-        
-        # Ensure unique slug within blog
         blog_id = data.get('blog_id')
-        counter = 1
-        original_slug = slug
-        while Post.query.filter_by(blog_id=blog_id, slug=slug).first():
-            slug = f"{original_slug}-{counter}"
-            counter += 1
-        
-        post = Post(
-            title=data.get('title'),
-            slug=slug,
-            content=data.get('content'),
-            excerpt=data.get('excerpt'),
-            featured_image=data.get('featured_image'),
-            blog_id=blog_id,
-            author_id=author.id,
-            status=data.get('status', 'published'),
-            is_featured=data.get('is_featured', False),
-            meta_title=data.get('meta_title'),
-            meta_description=data.get('meta_description'),
-            original_url=data.get('original_url'),
-            original_id=data.get('original_id'),
-            published_at=datetime.fromisoformat(data['published_at']) if data.get('published_at') else datetime.utcnow()
-        )
-        
-        db.session.add(post)
-        db.session.flush()
-        
-        # Add categories
-        category_names = data.get('categories', [])
-        for cat_name in category_names:
-            category = Category.query.filter_by(name=cat_name, blog_id=blog_id).first()
-            if not category:
-                category = Category(
-                    name=cat_name,
-                    slug=create_slug(cat_name),
-                    blog_id=blog_id
-                )
-                db.session.add(category)
+        base_slug = create_slug(data.get('title', ''))
+
+        def write():
+            # Get or create author
+            author_name = data.get('author_name', 'Admin')
+            author = Author.query.filter_by(name=author_name).first()
+            if not author:
+                author = Author(name=author_name, email=data.get('author_email'))
+                db.session.add(author)
                 db.session.flush()
-            post.categories.append(category)
-        
-        db.session.commit()
+
+            post = Post(
+                title=data.get('title'),
+                slug=SlugAllocator(blog_id).allocate(base_slug),  # Unique within the blog
+                content=data.get('content'),
+                excerpt=data.get('excerpt'),
+                featured_image=data.get('featured_image'),
+                blog_id=blog_id,
+                author_id=author.id,
+                status=data.get('status', 'published'),
+                is_featured=data.get('is_featured', False),
+                meta_title=data.get('meta_title'),
+                meta_description=data.get('meta_description'),
+                original_url=data.get('original_url'),
+                original_id=data.get('original_id'),
+                published_at=datetime.fromisoformat(data['published_at']) if data.get('published_at') else datetime.utcnow()
+            )
+
+            db.session.add(post)
+            db.session.flush()
+
+            # Add categories
+            category_names = data.get('categories', [])
+            for cat_name in category_names:
+                category = Category.query.filter_by(name=cat_name, blog_id=blog_id).first()
+                if not category:
+                    category = Category(
+                        name=cat_name,
+                        slug=create_slug(cat_name),
+                        blog_id=blog_id
+                    )
+                    db.session.add(category)
+                    db.session.flush()
+                post.categories.append(category)
+
+            db.session.commit()
+            return post
+
+        post = with_slug_retry(write)  # Runs again if a concurrent writer took the slug first
+
+        blog = db.session.get(Blog, blog_id)
+        response_cache.invalidate('blogs', 'posts', *([blog_tag(blog.slug)] if blog else []))
         
         return jsonify({
             'success': True,
@@ -206,16 +274,72 @@ def create_post():
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+@blog_bp.route('/posts/bulk', methods=['POST'])
+def create_posts_bulk():
+    """Create many posts from a JSON array (or {"posts": [...]}) or an NDJSON stream, one post per line.
+
+    Items take the same fields as create_post, plus an optional slug; items
+    whose original_id was already ingested are skipped.
+    """
+    try:
+        batch_size = request.args.get('batch_size', current_app.config.get('BULK_BATCH_SIZE', DEFAULT_BULK_BATCH_SIZE),
+                                      type=int)
+        max_posts = current_app.config.get('BULK_MAX_POSTS', 10000)
+
+        if request.mimetype in NDJSON_MIMETYPES:
+            items = iter_ndjson(request.stream)  # Streamed: each batch is written as soon as it is read
+        else:
+            items = request.get_json(silent=True)
+            if isinstance(items, dict):
+                items = items.get('posts')
+            if not isinstance(items, list):
+                return jsonify({'success': False, 'error': 'Expected a JSON array of posts or an NDJSON body'}), 400
+            if len(items) > max_posts:
+                return jsonify({'success': False, 'error': f'At most {max_posts} posts per request'}), 413
+
+        writer = BulkPostWriter(batch_size)
+        truncated = False
+        for item in items:
+            if writer.summary['received'] >= max_posts:
+                truncated = True
+                break
+            writer.add(item)
+        results, summary = writer.finish()
+
+        if writer.blog_ids:
+            slugs = db.session.scalars(db.select(Blog.slug).where(Blog.id.in_(writer.blog_ids))).all()
+            response_cache.invalidate('blogs', 'posts', *[blog_tag(slug) for slug in slugs])
+
+        body = {
+            'success': summary['failed'] == 0 and not truncated,
+            'results': results,
+            'summary': summary
+        }
+        if truncated:
+            body['error'] = f'Stopped after {max_posts} posts; the rest of the stream was not read'
+            return jsonify(body), 413
+        return jsonify(body)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 # Category endpoints
 @blog_bp.route('/blogs/<blog_slug>/categories', methods=['GET'])
+@read_only
+@response_cache.cached()
+@conditional
 def get_blog_categories(blog_slug):
     """Get categories for a specific blog"""
     try:
+        cache_tags(blog_tag(blog_slug))
         blog = Blog.query.filter_by(slug=blog_slug, is_active=True).first()
         if not blog:
             return jsonify({'success': False, 'error': 'Blog not found'}), 404
+        last_modified(blog.updated_at, posts_last_modified(blog.id))
         
-        categories = Category.query.filter_by(blog_id=blog.id).all()
+        categories = Category.query.filter_by(blog_id=blog.id).options(undefer(Category.post_count)).all()
         
         return jsonify({
             'success': True,
@@ -226,65 +350,136 @@ def get_blog_categories(blog_slug):
 
 # Featured posts endpoint
 @blog_bp.route('/featured-posts', methods=['GET'])
+@read_only
+@response_cache.cached()
+@query_budget(4)
 def get_featured_posts():
     """Get featured posts across all blogs"""
     try:
+        cache_tags('posts')
         limit = request.args.get('limit', 6, type=int)
         
         posts = Post.query.filter_by(status='published', is_featured=True)\
+                         .with_entities(*POST_LISTING_COLUMNS)\
                          .order_by(Post.published_at.desc())\
                          .limit(limit).all()
         
         return jsonify({
             'success': True,
-            'posts': [post.to_dict() for post in posts]
+            'posts': listing_posts(posts)
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 # Search endpoint
 @blog_bp.route('/search', methods=['GET'])
+@read_only
+@query_budget(8)
 def search_posts():
     """Search posts across all blogs"""
     try:
         query = request.args.get('q', '')
         blog_slug = request.args.get('blog')
         page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
+        per_page = page_size()
+        use_cursor = cursor_requested()
         
         if not query:
             return jsonify({'success': False, 'error': 'Search query required'}), 400
         
-        search_query = Post.query.filter_by(status='published')
-        
+        position = None
+        if use_cursor:
+            # Cursors are keyed on (published_at, id), so cursor pages are ordered by date
+            if request.args.get('sort', 'date') != 'date':
+                return jsonify({'success': False, 'error': 'Cursor pagination requires sort=date'}), 400
+            try:
+                position = decode_cursor(request.args.get('cursor'))
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+        
+        blog_id = None
         if blog_slug:
             blog = Blog.query.filter_by(slug=blog_slug).first()
             if blog:
-                search_query = search_query.filter_by(blog_id=blog.id)
-        
-        search_query = search_query.filter(
-            db.or_(
-                Post.title.contains(query),
-                Post.content.contains(query),
-                Post.excerpt.contains(query)
+                blog_id = blog.id
+        
+        # Ranked full-text search through the FTS5 index when available
+        if search_index_available():
+            sort = request.args.get('sort', 'date' if use_cursor else 'relevance')
+            if use_cursor:
+                result = search_posts_fts(query, blog_id=blog_id, limit=per_page + 1, order='date',
+                                          after=position, with_total=total_requested())
+            else:
+                result = search_posts_fts(query, blog_id=blog_id, limit=per_page,
+                                          offset=(max(page, 1) - 1) * per_page, order=sort)
+            total, hits = result if result else (0, [])
+            
+            rows_by_id = {}
+            if hits:
+                rows_by_id = {
+                    row.id: row for row in
+                    Post.query.filter(Post.id.in_([post_id for post_id, _ in hits]))
+                              .with_entities(*POST_LISTING_COLUMNS).all()
+                }
+            
+            if use_cursor:
+                pagination = cursor_pagination([rows_by_id[post_id] for post_id, _ in hits if post_id in rows_by_id],
+                                               per_page, total)
+                hits = hits[:per_page]
+            
+            posts_by_id = {post['id']: post for post in
+                           listing_posts([rows_by_id[post_id] for post_id, _ in hits if post_id in rows_by_id])}
+            results = []
+            for post_id, snippet in hits:
+                if post_id in posts_by_id:
+                    post_data = posts_by_id[post_id]
+                    post_data['snippet'] = snippet
+                    results.append(post_data)
+            
+            if not use_cursor:
+                pages = (total + per_page - 1) // per_page if per_page > 0 else 0
+                pagination = {
+                    'page': page,
+                    'per_page': per_page,
+                    'total': total,
+                    'pages': pages,
+                    'has_next': page < pages,
+                    'has_prev': page > 1
+                }
+        else:
+            search_query = Post.query.filter_by(status='published').with_entities(*POST_LISTING_COLUMNS)
+            if blog_id is not None:
+                search_query = search_query.filter_by(blog_id=blog_id)
+            
+            search_query = search_query.filter(
+                db.or_(
+                    Post.title.contains(query),
+                    Post.content.contains(query),
+                    Post.excerpt.contains(query)
+                )
             )
-        )
-        
-        posts = search_query.order_by(Post.published_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+            
+            if use_cursor:
+                posts, pagination = keyset_page(search_query, per_page, request.args.get('cursor'), total_requested())
+                results = listing_posts(posts)
+            else:
+                posts = search_query.order_by(Post.published_at.desc()).paginate(
+                    page=page, per_page=per_page, error_out=False
+                )
+                results = listing_posts(posts.items)
+                pagination = {
+                    'page': page,
+                    'per_page': per_page,
+                    'total': posts.total,
+                    'pages': posts.pages,
+                    'has_next': posts.has_next,
+                    'has_prev': posts.has_prev
+                }
         
         return jsonify({
             'success': True,
-            'posts': [post.to_dict() for post in posts.items],
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': posts.total,
-                'pages': posts.pages,
-                'has_next': posts.has_next,
-                'has_prev': posts.has_prev
-            },
+            'posts': results,
+            'pagination': pagination,
             'query': query
         })
     except Exception as e:
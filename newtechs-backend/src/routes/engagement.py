@@ -1,16 +1,36 @@
-from flask import Blueprint, request, jsonify
-from datetime import datetime, timedelta
+from flask import Blueprint, request, jsonify, current_app
+from datetime import datetime, timedelta, timezone
 import uuid
 import re
 from src.models.blog import db, Post, Blog, Comment, NewsletterSubscriber
+from src.models.trending import TrendingPost
+from sqlalchemy.orm import contains_eager, joinedload
+from src.services.view_counter import view_counter
+from src.services.cache import response_cache, cache_tags, blog_tag
+from src.services.database import read_only, database_stats
+from src.services.metrics import request_metrics, query_budget, internal_only
+from src.services.comments import DEFAULT_MAX_DEPTH, load_comment_thread
+from src.services.compression import response_compression
+from src.services.pagination import page_size, DEFAULT_MAX_PER_PAGE
+from src.services.trending import trending, TIMEFRAMES
+from src.services.view_analytics import view_analytics, GRANULARITIES, MAX_SERIES_POINTS
 
 engagement_bp = Blueprint('engagement', __name__)
 
 # Comments endpoints
 @engagement_bp.route('/api/comments/<post_id>', methods=['GET'])
+@read_only
+@query_budget(2)  # A page of top-level comments and one CTE for all replies
 def get_comments(post_id):
     try:
-        comments = Comment.query.filter_by(post_id=post_id, parent_id=None).order_by(Comment.created_at.desc()).all()
+        per_page = page_size(default=20)
+        max_depth = current_app.config.get('COMMENT_MAX_DEPTH', DEFAULT_MAX_DEPTH)
+        depth = min(max(request.args.get('depth', max_depth, type=int), 0), max_depth)
+        
+        try:
+            comments, children, pagination = load_comment_thread(post_id, per_page, request.args.get('cursor'), depth)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
         def serialize_comment(comment):
             return {
@@ -20,12 +40,13 @@ def get_comments(post_id):
                 'content': comment.content,
                 'timestamp': comment.created_at.isoformat(),
                 'avatar': comment.avatar_url,
-                'replies': [serialize_comment(reply) for reply in comment.replies]
+                'replies': [serialize_comment(reply) for reply in children.get(comment.id, [])]
             }
         
         return jsonify({
             'success': True,
-            'comments': [serialize_comment(comment) for comment in comments]
+            'comments': [serialize_comment(comment) for comment in comments],
+            'pagination': pagination
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -49,6 +70,11 @@ def create_comment(post_id):
         if not post:
             return jsonify({'success': False, 'error': 'Post not found'}), 404
         
+        # Replies must point at a comment on the same post (also enforced by the foreign key)
+        parent_id = data.get('replyTo')
+        if parent_id and not Comment.query.filter_by(id=parent_id, post_id=post.id).first():
+            return jsonify({'success': False, 'error': 'Parent comment not found'}), 400
+        
         # Create comment
         comment = Comment(
             id=str(uuid.uuid4()),
@@ -56,7 +82,7 @@ def create_comment(post_id):
             author_name=data['author'],
             author_email=email,
             content=data['content'],
-            parent_id=data.get('replyTo'),
+            parent_id=parent_id,
             ip_address=request.remote_addr,
             user_agent=request.headers.get('User-Agent', ''),
             status='approved'  # Auto-approve for now, add moderation later
@@ -64,6 +90,8 @@ def create_comment(post_id):
         
         db.session.add(comment)
         db.session.commit()
+        # Comments move the post's comment_count and its trending score
+        response_cache.invalidate(blog_tag(post.blog.slug), 'trending')
         
         return jsonify({
             'success': True,
@@ -150,74 +178,110 @@ def unsubscribe_newsletter():
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def trending_response(rows, timeframe):
+    """Body of /api/trending-posts from (TrendingPost, Post) rows"""
+    trending_posts = []
+    for rank, (entry, post) in enumerate(rows, start=1):
+        trending_posts.append({
+            'id': post.id,
+            'title': post.title,
+            'slug': post.slug,
+            'excerpt': post.excerpt or (post.content_preview or '') + '...',
+            'blog': {
+                'name': post.blog.title,
+                'slug': post.blog.slug,
+                'color': post.blog.primary_color
+            },
+            'author': post.author.name if post.author else None,
+            'publishedAt': post.published_at.isoformat() if post.published_at else None,
+            'readTime': post.read_time or 5,
+            'views': post.views,
+            'featuredImage': post.featured_image,
+            'rank': rank,
+            'trending_score': entry.normalized_score
+        })
+    
+    return {
+        'success': True,
+        'posts': trending_posts,
+        'timeframe': timeframe,
+        'total': len(trending_posts),
+        'computed_at': rows[0][0].computed_at.isoformat() if rows else None
+    }
+
+def lifetime_rows(rows, timeframe):
+    """(TrendingPost, Post) rows, not persisted, from (Post, lifetime score) rows"""
+    top_score = rows[0][1] or 1
+    now = datetime.utcnow()
+    return [(TrendingPost(timeframe=timeframe, post_id=post.id, blog_id=post.blog_id, score=score,
+                          normalized_score=round(100 * score / top_score), views=post.views or 0,
+                          comments=post.comment_count, computed_at=now), post)
+            for post, score in rows]
+
+def popular_response(posts, blog):
+    """Body of /api/popular-posts/<slug> from its posts"""
+    popular_posts = []
+    for post in posts:
+        popular_posts.append({
+            'id': post.id,
+            'title': post.title,
+            'slug': post.slug,
+            'excerpt': post.excerpt or (post.content_preview or '')[:150] + '...',
+            'views': post.views,
+            'publishedAt': post.published_at.isoformat() if post.published_at else None,
+            'readTime': post.read_time or 5,
+            'featuredImage': post.featured_image
+        })
+    
+    return {
+        'success': True,
+        'posts': popular_posts,
+        'blog': {
+            'name': blog.title,
+            'slug': blog.slug
+        }
+    }
+
 # Trending posts endpoint
 @engagement_bp.route('/api/trending-posts', methods=['GET'])
+@read_only
+@response_cache.cached()
 def get_trending_posts():
     try:
-        limit = int(request.args.get('limit', 10))
+        cache_tags('posts', 'trending')
+        limit = min(max(int(request.args.get('limit', 10)), 1), current_app.config.get('MAX_PER_PAGE', DEFAULT_MAX_PER_PAGE))
         timeframe = request.args.get('timeframe', 'week')
         blog_slug = request.args.get('blog')
         
-        # Calculate date threshold based on timeframe
-        now = datetime.utcnow()
-        if timeframe == 'day':
-            threshold = now - timedelta(days=1)
-        elif timeframe == 'week':
-            threshold = now - timedelta(weeks=1)
-        elif timeframe == 'month':
-            threshold = now - timedelta(days=30)
-        else:  # all time
-            threshold = datetime.min
-        
-        # Build query
-        query = db.session.query(Post).join(Blog)
+        if timeframe not in TIMEFRAMES:  # all time
+            timeframe = 'all'
+        
+        # Scores are precomputed with time decay by the trending engine; this is one indexed read
+        materialized = trending.ensure_fresh()
+        if materialized:
+            query = db.session.query(TrendingPost, Post)\
+                              .join(Post, Post.id == TrendingPost.post_id)\
+                              .filter(TrendingPost.timeframe == timeframe)
+            order = TrendingPost.score.desc()
+        else:
+            # First ranking still being computed: rank by lifetime totals meanwhile
+            score = trending.lifetime_score()
+            query = db.session.query(Post, score.label('score')).filter(score > 0)
+            order = db.desc('score')
+        # The ranking may predate a post's unpublishing or its blog's deactivation
+        query = query.join(Post.blog).filter(Post.status == 'published', Blog.is_active.is_(True))\
+                     .options(contains_eager(Post.blog), joinedload(Post.author))
         
         # Filter by blog if specified
         if blog_slug:
             query = query.filter(Blog.slug == blog_slug)
+            cache_tags(blog_tag(blog_slug))
         
-        # Filter by timeframe
-        if timeframe != 'all':
-            query = query.filter(Post.published_at >= threshold)
-        
-        # Order by trending score (views + comments + shares)
-        # For now, we'll use a simple scoring system based on views
-        posts = query.filter(Post.status == 'published').order_by(
-            Post.views.desc()
-        ).limit(limit).all()
-        
-        trending_posts = []
-        for post in posts:
-            # Calculate comment count manually
-            comment_count = Comment.query.filter_by(post_id=post.id, status='approved').count()
-            
-            # Calculate trending score
-            trending_score = min(100, (post.views // 10) + (comment_count * 5))
-            
-            trending_posts.append({
-                'id': post.id,
-                'title': post.title,
-                'slug': post.slug,
-                'excerpt': post.excerpt or post.content[:200] + '...',
-                'blog': {
-                    'name': post.blog.title,
-                    'slug': post.blog.slug,
-                    'color': post.blog.primary_color
-                },
-                'author': post.author,
-                'publishedAt': post.published_at.isoformat() if post.published_at else None,
-                'readTime': post.read_time or 5,
-                'views': post.views,
-                'featuredImage': post.featured_image,
-                'trending_score': trending_score
-            })
+        rows = query.order_by(order).limit(limit).all()
+        if not materialized and rows:
+            rows = lifetime_rows(rows, timeframe)
         
-        return jsonify({
-            'success': True,
-            'posts': trending_posts,
-            'timeframe': timeframe,
-            'total': len(trending_posts)
-        })
+        return jsonify(trending_response(rows, timeframe))
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -231,19 +295,155 @@ def track_post_view():
         if not post_id:
             return jsonify({'success': False, 'error': 'Post ID is required'}), 400
         
-        post = Post.query.get(post_id)
-        if not post:
+        row = db.session.query(Post.id, Post.views).filter_by(id=post_id).first()
+        if not row:
             return jsonify({'success': False, 'error': 'Post not found'}), 404
         
-        # Increment view count
-        post.views = (post.views or 0) + 1
-        db.session.commit()
+        # Buffer the view; it is written to the database in the next batch
+        view_counter.increment(row.id)
         
-        return jsonify({'success': True, 'views': post.views})
+        return jsonify({'success': True, 'views': (row.views or 0) + view_counter.pending(row.id)})
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@engagement_bp.route('/api/analytics/cache', methods=['GET'])
+@internal_only
+def get_cache_stats():
+    try:
+        return jsonify({'success': True, 'stats': response_cache.stats()})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@engagement_bp.route('/api/analytics/compression', methods=['GET'])
+@internal_only
+def get_compression_stats():
+    try:
+        return jsonify({'success': True, 'stats': response_compression.stats()})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@engagement_bp.route('/api/analytics/trending', methods=['GET'])
+@internal_only
+def get_trending_stats():
+    try:
+        return jsonify({'success': True, 'stats': trending.stats()})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def parse_time(value, default):
+    if not value:
+        return default
+    moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+def views_over_time(post_id=None, blog_id=None):
+    """Views per hour or day between ?start and ?end from the rollup tables"""
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in GRANULARITIES:
+        return jsonify({'success': False, 'error': 'granularity must be hour or day'}), 400
+    
+    try:
+        end = parse_time(request.args.get('end'), datetime.utcnow())
+        default_span = timedelta(days=30) if granularity == 'day' else timedelta(hours=48)
+        start = parse_time(request.args.get('start'), end - default_span)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'start and end must be ISO 8601 dates'}), 400
+    if start > end:
+        return jsonify({'success': False, 'error': 'start must be before end'}), 400
+    if (end - start) / GRANULARITIES[granularity] >= MAX_SERIES_POINTS:
+        return jsonify({'success': False, 'error': f'Range too large; at most {MAX_SERIES_POINTS} {granularity}s'}), 400
+    
+    view_analytics.ensure_fresh()
+    points = view_analytics.series(granularity, start, end, post_id=post_id, blog_id=blog_id)
+    rolled_up_through = view_analytics.watermark()
+    
+    return jsonify({
+        'success': True,
+        'granularity': granularity,
+        'start': points[0][0].isoformat(),
+        'end': points[-1][0].isoformat(),
+        'series': [{'bucket': bucket.isoformat(), 'views': views} for bucket, views in points],
+        'total': sum(views for _, views in points),
+        'rolled_up_through': rolled_up_through.isoformat() if rolled_up_through else None
+    })
+
+@engagement_bp.route('/api/analytics/views', methods=['GET'])
+@internal_only
+@read_only
+def get_site_views():
+    try:
+        return views_over_time()
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@engagement_bp.route('/api/analytics/posts/<int:post_id>/views', methods=['GET'])
+@internal_only
+@read_only
+def get_post_views(post_id):
+    try:
+        if not db.session.query(Post.id).filter_by(id=post_id).first():
+            return jsonify({'success': False, 'error': 'Post not found'}), 404
+        return views_over_time(post_id=post_id)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@engagement_bp.route('/api/analytics/blogs/<blog_slug>/views', methods=['GET'])
+@internal_only
+@read_only
+def get_blog_views(blog_slug):
+    try:
+        blog = Blog.query.filter_by(slug=blog_slug).first()
+        if not blog:
+            return jsonify({'success': False, 'error': 'Blog not found'}), 404
+        return views_over_time(blog_id=blog.id)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@engagement_bp.route('/api/analytics/rollups', methods=['GET'])
+@internal_only
+def get_rollup_stats():
+    try:
+        return jsonify({'success': True, 'stats': view_analytics.stats()})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@engagement_bp.route('/api/analytics/view-counter', methods=['GET'])
+@internal_only
+def get_view_counter_stats():
+    try:
+        return jsonify({'success': True, 'stats': view_counter.stats()})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@engagement_bp.route('/api/analytics/database', methods=['GET'])
+@internal_only
+def get_database_stats():
+    try:
+        return jsonify({'success': True, 'stats': database_stats()})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@engagement_bp.route('/api/metrics', methods=['GET'])
+@internal_only
+def get_metrics():
+    """Per-endpoint request metrics for Prometheus to scrape"""
+    return current_app.response_class(request_metrics.prometheus(), mimetype='text/plain; version=0.0.4')
+
+@engagement_bp.route('/api/analytics/slow-queries', methods=['GET'])
+@internal_only
+def get_slow_queries():
+    try:
+        return jsonify({
+            'success': True,
+            'stats': request_metrics.stats(),
+            'slow_queries': request_metrics.slow_queries()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @engagement_bp.route('/api/analytics/newsletter-stats', methods=['GET'])
 def get_newsletter_stats():
     try:
@@ -274,39 +474,23 @@ def get_newsletter_stats():
 
 # Popular posts by blog
 @engagement_bp.route('/api/popular-posts/<blog_slug>', methods=['GET'])
+@read_only
+@response_cache.cached()
 def get_popular_posts(blog_slug):
     try:
+        cache_tags(blog_tag(blog_slug))
         limit = int(request.args.get('limit', 5))
         
         blog = Blog.query.filter_by(slug=blog_slug).first()
         if not blog:
             return jsonify({'success': False, 'error': 'Blog not found'}), 404
         
-        posts = Post.query.filter_by(blog_id=blog.id, status='published').order_by(
-            Post.views.desc()
-        ).limit(limit).all()
-        
-        popular_posts = []
-        for post in posts:
-            popular_posts.append({
-                'id': post.id,
-                'title': post.title,
-                'slug': post.slug,
-                'excerpt': post.excerpt or post.content[:150] + '...',
-                'views': post.views,
-                'publishedAt': post.published_at.isoformat() if post.published_at else None,
-                'readTime': post.read_time or 5,
-                'featuredImage': post.featured_image
-            })
+        posts = db.session.query(Post)\
+                          .filter_by(blog_id=blog.id, status='published')\
+                          .order_by(Post.views.desc())\
+                          .limit(limit).all()
         
-        return jsonify({
-            'success': True,
-            'posts': popular_posts,
-            'blog': {
-                'name': blog.title,
-                'slug': blog.slug
-            }
-        })
+        return jsonify(popular_response(posts, blog))
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -1,70 +1,15 @@
-from flask import Blueprint, request, jsonify
-from src.models.blog import Blog, Post, Category, Author, db
-import xml.etree.ElementTree as ET
-import re
-from datetime import datetime
-from html import unescape
+from flask import Blueprint, request, jsonify, current_app
+from src.models.blog import Blog, Post, Category, Author, db, BLOG_COLUMNS, counted_dict
+from src.models.migration import MigrationJob
+from src.services.blogger_import import DEFAULT_BATCH_SIZE, create_slug
+from src.services.migration_jobs import claim_job, create_job, is_active, run_job, start_job
+from src.services.cache import response_cache
+from sqlalchemy import func, select
+from sqlalchemy.orm import selectinload
 import os
 
 migration_bp = Blueprint('migration', __name__)
 
-def clean_html_content(html_content):
-    """Clean and simplify HTML content from Blogger"""
-    if not html_content:
-        return ""
-    
-    # Unescape HTML entities
-    content = unescape(html_content)
-    
-    # Remove excessive styling and clean up
-    content = re.sub(r'style="[^"]*"', '', content)
-    content = re.sub(r'class="[^"]*"', '', content)
-    content = re.sub(r'data-[^=]*="[^"]*"', '', content)
-    content = re.sub(r'<div[^>]*>', '<div>', content)
-    content = re.sub(r'<span[^>]*>', '<span>', content)
-    content = re.sub(r'<p[^>]*>', '<p>', content)
-    
-    # Convert Blogger image URLs to simpler format
-    content = re.sub(r'https://blogger\.googleusercontent\.com/img/[^"]*', '', content)
-    
-    # Remove empty tags
-    content = re.sub(r'<(\w+)[^>]*>\s*</\1>', '', content)
-    content = re.sub(r'<(\w+)[^>]*>\s*<br\s*/?\s*>\s*</\1>', '', content)
-    
-    # Clean up excessive whitespace
-    content = re.sub(r'\s+', ' ', content)
-    content = re.sub(r'>\s+<', '><', content)
-    
-    return content.strip()
-
-def extract_excerpt(content, max_length=200):
-    """Extract excerpt from content"""
-    # Remove HTML tags for excerpt
-    text = re.sub(r'<[^>]+>', '', content)
-    text = re.sub(r'\s+', ' ', text).strip()
-    
-    if len(text) <= max_length:
-        return text
-    
-    # Find last complete sentence within limit
-    excerpt = text[:max_length]
-    last_period = excerpt.rfind('.')
-    if last_period > max_length * 0.7:  # If period is reasonably close to end
-        return excerpt[:last_period + 1]
-    
-    # Otherwise, cut at last space
-    last_space = excerpt.rfind(' ')
-    if last_space > 0:
-        return excerpt[:last_space] + '...'
-    
-    return excerpt + '...'
-
-def create_slug(text):
-    """Create URL-friendly slug from text"""
-    slug = re.sub(r'[^\w\s-]', '', text.lower())
-    slug = re.sub(r'[-\s]+', '-', slug)
-    return slug.strip('-')
-
 @migration_bp.route('/migrate/blogger', methods=['POST'])
 def migrate_blogger_content():
     """Migrate content from Blogger XML feeds"""
@@ -75,167 +20,81 @@ def migrate_blogger_content():
         if not blog_mapping:
             return jsonify({'success': False, 'error': 'Blog mapping required'}), 400
         
-        results = {
-            'blogs_processed': 0,
-            'posts_imported': 0,
-            'categories_created': 0,
-            'authors_created': 0,
-            'errors': []
-        }
+        errors = []
+        takeout_dir = current_app.config.get('BLOGGER_TAKEOUT_DIR', '/home/ubuntu/Takeout/Blogger/Blogs')
+        workers = data.get('workers', current_app.config.get('MIGRATION_WORKERS', 1))
+        workers = max(1, min(int(workers), os.cpu_count() or 1))
         
-        # Process each blog
+        # Resolve each blog and its feed
+        feeds = []
         for blogger_folder, blog_slug in blog_mapping.items():
-            try:
-                # Get or create blog
-                blog = Blog.query.filter_by(slug=blog_slug).first()
-                if not blog:
-                    results['errors'].append(f"Blog '{blog_slug}' not found")
-                    continue
-                
-                # Path to the Blogger feed
-                feed_path = f"/home/ubuntu/Takeout/Blogger/Blogs/{blogger_folder}/feed.atom"
-                
-                if not os.path.exists(feed_path):
-                    results['errors'].append(f"Feed file not found: {feed_path}")
-                    continue
-                
-                # Parse XML feed
-                tree = ET.parse(feed_path)
-                root = tree.getroot()
-                
-                # Define namespaces
-                namespaces = {
-                    'atom': 'http://www.w3.org/2005/Atom',
-                    'blogger': 'http://schemas.google.com/blogger/2018'
-                }
-                
-                # Process entries
-                entries = root.findall('atom:entry', namespaces)
-                
-                for entry in entries:
-                    try:
-                        # Check if it's a post (not a comment or other type)
-                        entry_type = entry.find('blogger:type', namespaces)
-                        if entry_type is None or entry_type.text != 'POST':
-                            continue
-                        
-                        # Check if it's published
-                        status = entry.find('blogger:status', namespaces)
-                        if status is None or status.text != 'LIVE':
-                            continue
-                        
-                        # Extract post data
-                        title_elem = entry.find('atom:title', namespaces)
-                        title = title_elem.text if title_elem is not None else 'Untitled'
-                        
-                        content_elem = entry.find('atom:content', namespaces)
-                        content = content_elem.text if content_elem is not None else ''
-                        content = clean_html_content(content)
-                        
-                        # Extract author
-                        author_elem = entry.find('atom:author/atom:name', namespaces)
-                        author_name = author_elem.text if author_elem is not None else 'Unknown'
-                        
-                        # Get or create author
-                        author = Author.query.filter_by(name=author_name).first()
-                        if not author:
-                            author = Author(name=author_name)
-                            db.session.add(author)
-                            db.session.flush()
-                            results['authors_created'] += 1
-                        
-                        # Extract dates
-                        published_elem = entry.find('atom:published', namespaces)
-                        published_at = datetime.fromisoformat(published_elem.text.replace('Z', '+00:00')) if published_elem is not None else datetime.utcnow()
-                        
-                        # Extract original URL and ID
-                        id_elem = entry.find('atom:id', namespaces)
-                        original_id = id_elem.text if id_elem is not None else None
-                        
-                        filename_elem = entry.find('blogger:filename', namespaces)
-                        original_url = filename_elem.text if filename_elem is not None else None
-                        
-                        # Create slug
-                        slug = create_slug(title)
-                        
-                        # Ensure unique slug within blog
-                        counter = 1
-                        original_slug = slug
-                        while Post.query.filter_by(blog_id=blog.id, slug=slug).first():
-                            slug = f"{original_slug}-{counter}"
-                            counter += 1
-                        
-                        # Check if post already exists (by original_id)
-                        if original_id:
-                            existing_post = Post.query.filter_by(original_id=original_id).first()
-                            if existing_post:
-                                continue  # Skip if already imported
-                        
-                        # Create excerpt
-                        excerpt = extract_excerpt(content)
-                        
-                        # Create post
-                        post = Post(
-                            title=title,
-                            slug=slug,
-                            content=content,
-                            excerpt=excerpt,
-                            blog_id=blog.id,
-                            author_id=author.id,
-                            status='published',
-                            original_url=original_url,
-                            original_id=original_id,
-                            published_at=published_at,
-                            meta_title=title,
-                            meta_description=excerpt
-                        )
-                        
-                        db.session.add(post)
-                        db.session.flush()
-                        
-                        # Extract and create categories
-                        categories = entry.findall('atom:category', namespaces)
-                        for cat_elem in categories:
-                            term = cat_elem.get('term')
-                            if term:
-                                # Get or create category
-                                category = Category.query.filter_by(name=term, blog_id=blog.id).first()
-                                if not category:
-                                    category = Category(
-                                        name=term,
-                                        slug=create_slug(term),
-                                        blog_id=blog.id
-                                    )
-                                    db.session.add(category)
-                                    db.session.flush()
-                                    results['categories_created'] += 1
-                                
-                                post.categories.append(category)
-                        
-                        results['posts_imported'] += 1
-                        
-                    except Exception as e:
-                        results['errors'].append(f"Error processing post in {blogger_folder}: {str(e)}")
-                        continue
-                
-                results['blogs_processed'] += 1
-                
-            except Exception as e:
-                results['errors'].append(f"Error processing blog {blogger_folder}: {str(e)}")
+            blog = Blog.query.filter_by(slug=blog_slug).first()
+            if not blog:
+                errors.append(f"Blog '{blog_slug}' not found")
+                continue
+            
+            # Path to the Blogger feed
+            feed_path = os.path.join(takeout_dir, blogger_folder, 'feed.atom')
+            
+            if not os.path.exists(feed_path):
+                errors.append(f"Feed file not found: {feed_path}")
                 continue
+            
+            feeds.append((blog, feed_path, blogger_folder))
         
-        # Commit all changes
-        db.session.commit()
+        if not feeds:
+            return jsonify({'success': False, 'error': 'No feeds to import', 'errors': errors}), 400
+        
+        job = create_job(feeds, batch_size=data.get('batch_size', DEFAULT_BATCH_SIZE), workers=workers)
+        
+        # Run inline when asked to (CLI, serverless handlers that can't keep threads alive)
+        if not data.get('background', True):
+            claim_job(job.id)  # Just created, so never running yet
+            job = run_job(job.id)
+            results = job.to_dict()['results']
+            results['errors'] = errors + results['errors']
+            return jsonify({
+                'success': job.status == 'completed',
+                'job': job.to_dict(),
+                'results': results
+            })
+        
+        start_job(current_app._get_current_object(), job.id)
         
         return jsonify({
             'success': True,
-            'results': results
-        })
+            'job': job.to_dict(),
+            'errors': errors,
+            'status_url': f"/api/migrate/status?job_id={job.id}"
+        }), 202
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@migration_bp.route('/migrate/jobs/<job_id>/resume', methods=['POST'])
+def resume_migration_job(job_id):
+    """Resume a failed or interrupted migration job from its last committed batch"""
+    try:
+        job = db.session.get(MigrationJob, job_id)
+        if not job:
+            return jsonify({'success': False, 'error': 'Job not found'}), 404
+        
+        if job.status == 'completed':
+            return jsonify({'success': False, 'error': 'Job already completed'}), 400
+        
+        if not start_job(current_app._get_current_object(), job.id):
+            return jsonify({'success': False, 'error': 'Job is already running'}), 409
+        
+        return jsonify({
+            'success': True,
+            'job': job.to_dict(),
+            'status_url': f"/api/migrate/status?job_id={job.id}"
+        }), 202
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @migration_bp.route('/migrate/setup-blogs', methods=['POST'])
 def setup_initial_blogs():
     """Set up the initial blog structure"""
@@ -333,6 +192,7 @@ def setup_initial_blogs():
             created_blogs.append(blog.to_dict())
         
         db.session.commit()
+        response_cache.invalidate('blogs')
         
         return jsonify({
             'success': True,
@@ -344,36 +204,46 @@ def setup_initial_blogs():
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def migration_overview():
+    """Site totals, per-blog counts and the recent jobs of GET /migrate/status"""
+    # Blogs as rows with their post counts, categories counted in one grouped query
+    blogs = [counted_dict(row) for row in db.session.execute(select(*BLOG_COLUMNS).order_by(Blog.id))]
+    category_counts = dict(db.session.query(Category.blog_id, func.count(Category.id)).group_by(Category.blog_id))
+    
+    return {
+        'stats': {
+            'total_blogs': len(blogs),
+            'total_posts': Post.query.count(),
+            'total_categories': Category.query.count(),
+            'total_authors': Author.query.count(),
+            'blog_breakdown': [{
+                'blog': blog,
+                'posts': blog['post_count'],
+                'categories': category_counts.get(blog['id'], 0)
+            } for blog in blogs]
+        },
+        'recent_jobs': [
+            dict(job.to_dict(), active=is_active(job.id))
+            for job in MigrationJob.query.options(selectinload(MigrationJob.blogs))
+                                         .order_by(MigrationJob.created_at.desc()).limit(10)
+        ]
+    }
+
 @migration_bp.route('/migrate/status', methods=['GET'])
 def get_migration_status():
-    """Get current migration status"""
+    """Get current migration status, or the progress of one job with ?job_id="""
     try:
-        blogs = Blog.query.all()
-        total_posts = Post.query.count()
-        total_categories = Category.query.count()
-        total_authors = Author.query.count()
-        
-        blog_stats = []
-        for blog in blogs:
-            blog_posts = Post.query.filter_by(blog_id=blog.id).count()
-            blog_categories = Category.query.filter_by(blog_id=blog.id).count()
+        job_id = request.args.get('job_id')
+        if job_id:
+            job = db.session.get(MigrationJob, job_id)
+            if not job:
+                return jsonify({'success': False, 'error': 'Job not found'}), 404
             
-            blog_stats.append({
-                'blog': blog.to_dict(),
-                'posts': blog_posts,
-                'categories': blog_categories
-            })
+            job_data = job.to_dict()
+            job_data['active'] = is_active(job.id)
+            return jsonify({'success': True, 'job': job_data})
         
-        return jsonify({
-            'success': True,
-            'stats': {
-                'total_blogs': len(blogs),
-                'total_posts': total_posts,
-                'total_categories': total_categories,
-                'total_authors': total_authors,
-                'blog_breakdown': blog_stats
-            }
-        })
+        return jsonify({'success': True, **migration_overview()})
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
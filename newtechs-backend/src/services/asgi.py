@@ -0,0 +1,166 @@
+import asyncio
+import io
+import logging
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import Map, Rule
+
+logger = logging.getLogger(__name__)
+
+class AsyncRoutes:
+    """Async views for ASGI mode, registered like blueprint routes"""
+
+    def __init__(self):
+        self.rules = []  # (rule, methods, view)
+
+    def route(self, rule, methods=('GET',)):
+        def decorator(view):
+            self.rules.append((rule, list(methods), view))
+            return view
+        return decorator
+
+def build_environ(scope, body):
+    """WSGI environ for an ASGI http scope and its (fully read) body"""
+    script_name = scope.get('root_path', '').encode('utf8').decode('latin1')
+    path_info = scope['path'].encode('utf8').decode('latin1')
+    if script_name and path_info.startswith(script_name):
+        path_info = path_info[len(script_name):]
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': script_name,
+        'PATH_INFO': path_info,
+        'QUERY_STRING': scope['query_string'].decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': scope['client'][0] if scope.get('client') else '',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin1')
+        if name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        elif name == 'content-type':
+            key = 'CONTENT_TYPE'
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        value = value.decode('latin1')
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+class AsgiApp:
+    """ASGI application: registered async views natively, everything else through Flask.
+
+    Async views run inside a Flask request context, so request, g, jsonify and
+    the cache and conditional decorators behave as in the WSGI views, and
+    after_request hooks (CORS) apply to their responses. Their database access
+    goes through async_db. Every other request runs the WSGI app on a thread
+    pool; asgiref's WsgiToAsgi would run them all on a single thread.
+    """
+
+    def __init__(self, flask_app, *routes):
+        self.flask_app = flask_app
+        self.async_views = flask_app.config.setdefault('ASGI_ASYNC_VIEWS', True)
+        self.url_map = Map([Rule(rule, endpoint=view, methods=methods)
+                            for group in routes for rule, methods, view in group.rules])
+        self.executor = ThreadPoolExecutor(max_workers=flask_app.config.setdefault('ASGI_WSGI_THREADS', 32),
+                                           thread_name_prefix='wsgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        environ = build_environ(scope, await self._read_body(receive))
+        view, values = self._match(environ)
+        if view is None:
+            loop = asyncio.get_running_loop()
+            status, headers, body = await loop.run_in_executor(self.executor, self._run_wsgi, environ)
+        else:
+            response = await self._run_async(view, values, environ)
+            status, headers, body = response.status_code, response.headers.to_wsgi_list(), response.get_data()
+
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers]
+        })
+        await send({'type': 'http.response.body', 'body': b'' if scope['method'] == 'HEAD' else body})
+
+    def _match(self, environ):
+        if not self.async_views:
+            return None, None
+        try:
+            return self.url_map.bind_to_environ(environ).match()
+        except HTTPException:  # 404, 405 and slash redirects are Flask's to answer
+            return None, None
+
+    async def _run_async(self, view, values, environ):
+        # Mirrors Flask.wsgi_app/full_dispatch_request with an awaited view
+        app = self.flask_app
+        with app.request_context(environ):
+            try:
+                try:
+                    rv = app.preprocess_request()
+                    if rv is None:
+                        rv = await view(**values)
+                except Exception as e:
+                    rv = app.handle_user_exception(e)
+                return app.finalize_request(rv)
+            except Exception as e:
+                return app.make_response(app.handle_exception(e))
+
+    def _run_wsgi(self, environ):
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'], started['headers'] = status, headers
+            return lambda data: None
+
+        result = self.flask_app(environ, start_response)
+        try:
+            body = b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return int(started['status'].split(' ', 1)[0]), started['headers'], body
+
+    async def _read_body(self, receive):
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                return b''.join(chunks)
+
+    async def _lifespan(self, receive, send):
+        async_db = self.flask_app.extensions.get('async_db')
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                if self.async_views and async_db is None:
+                    self.async_views = False
+                elif self.async_views:
+                    try:
+                        async_db.get_engine()
+                    except (ImportError, ValueError) as e:
+                        # No async driver for this database: serve everything through Flask
+                        logger.warning('Async views disabled: %s', e)
+                        self.async_views = False
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if async_db is not None:
+                    await async_db.dispose()
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
@@ -0,0 +1,72 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from src.services.database import set_pragmas, sqlite_pragmas
+
+# Synchronous URL backend -> asyncio driver. The drivers are optional
+# dependencies, only imported when ASGI mode creates the engine.
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+    'mysql': 'mysql+aiomysql',
+}
+
+def async_database_uri(uri):
+    """The async-driver equivalent of a SQLALCHEMY_DATABASE_URI"""
+    url = make_url(uri)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'No async driver known for {backend}; set ASYNC_DATABASE_URI')
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+class AsyncDatabase:
+    """Async engine on the same database as db.engine, for the async views of ASGI mode.
+
+    The engine is created on first use, from inside the server's event loop, so
+    WSGI deployments never load the async driver.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.engine = None
+        self._sessionmaker = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.config.setdefault('ASYNC_DATABASE_URI', None)  # Derived from SQLALCHEMY_DATABASE_URI when unset
+        app.config.setdefault('ASYNC_POOL_SIZE', 20)
+        app.config.setdefault('ASYNC_MAX_OVERFLOW', 20)
+        app.config.setdefault('ASYNC_POOL_TIMEOUT', 30)
+        app.extensions['async_db'] = self
+
+    def get_engine(self):
+        if self.engine is None:
+            config = self.app.config
+            url = make_url(config['ASYNC_DATABASE_URI'] or async_database_uri(config['SQLALCHEMY_DATABASE_URI']))
+            options = {}
+            if url.database not in (None, '', ':memory:'):  # In-memory SQLite uses a single shared connection
+                options = {
+                    'pool_size': config['ASYNC_POOL_SIZE'],
+                    'max_overflow': config['ASYNC_MAX_OVERFLOW'],
+                    'pool_timeout': config['ASYNC_POOL_TIMEOUT'],
+                }
+            self.engine = create_async_engine(url, **options)
+            if url.get_backend_name() == 'sqlite':
+                event.listen(self.engine.sync_engine, 'connect', set_pragmas(sqlite_pragmas(self.app)))
+            self._sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False)
+        return self.engine
+
+    def session(self):
+        """New AsyncSession, used as `async with async_db.session() as session:`"""
+        self.get_engine()
+        return self._sessionmaker()
+
+    async def dispose(self):
+        if self.engine is not None:
+            await self.engine.dispose()
+            self.engine = None
+            self._sessionmaker = None
+
+async_db = AsyncDatabase()
@@ -0,0 +1,465 @@
+import re
+import time
+from collections import deque
+from datetime import datetime
+from html import unescape
+from sqlalchemy import insert, select
+from src.models.user import db
+from src.models.blog import Post, Category, Author, post_categories, content_preview, content_text, estimate_read_time
+from src.services.slugs import SlugAllocator, with_slug_retry
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+BLOGGER = '{http://schemas.google.com/blogger/2018}'
+
+DEFAULT_BATCH_SIZE = 500
+# Entries cleaned per process pool task
+PREPARE_CHUNK_SIZE = 200
+# MigrationJobBlog columns the importer updates between commits
+PROGRESS_FIELDS = ('status', 'entries_seen', 'imported', 'skipped', 'errors', 'last_error')
+
+class BatchWriteError(Exception):
+    """A batch of posts could not be written; everything since the last commit was rolled back"""
+
+# Tokens: a tag, a run of text, or a stray '<'. Tags can't contain '<', so a
+# stray '<' in text never makes the scanner run ahead to a distant '>'
+_TOKEN_RE = re.compile(r'<[^<>]*>|[^<]+|<')
+_START_TAG_RE = re.compile(r'<(\w+)')
+# Elements holding nothing but a <br>, matched on the joined output
+_BR_ONLY_RE = re.compile(r'<(\w+)\b[^<>]*>\s*<br\s*/?\s*>\s*</\1>')
+# Whitespace that collapsing to a single space would actually change
+_WHITESPACE_RE = re.compile(r'\s\s+|[^\S ]')
+# Attributes dropped from tags, and Blogger-hosted image URLs
+_STRIP_RE = re.compile(
+    r'(?:style|class)="[^"]*"|data-[^=]*="[^"]*"|https://blogger\.googleusercontent\.com/img/[^"]*'
+)
+_BARE_TAGS = {'div': '<div>', 'span': '<span>', 'p': '<p>'}
+
+def clean_html_content(html_content):
+    """Clean and simplify HTML content from Blogger.
+
+    One pass over a token stream cleans each tag (bare <div>/<span>/<p>,
+    style/class/data attributes and Blogger image URLs removed) and drops
+    empty elements as it goes; elements holding a lone <br> and extra
+    whitespace are then removed from the joined output. All scans are linear.
+
+    The output matches the previous regex-per-pass cleaner (see
+    benchmarks/cleaner_corpus) except that: text outside tags is left alone;
+    only <div>, <span> and <p> themselves (not <pre>, <param>, ...) become
+    bare tags; a closing tag only pairs with a start tag of the same name,
+    where the old pattern also removed pairs like <br></b>; and a '<' inside
+    text is never taken as the start of a tag that ends at a later '>'.
+    """
+    if not html_content:
+        return ""
+
+    match_start_tag = _START_TAG_RE.match
+    strip = _STRIP_RE.sub
+    out = []
+    append = out.append
+    held_at = -1  # position in out of a start tag followed only by whitespace so far
+    closing = None
+
+    for token in _TOKEN_RE.findall(unescape(html_content)):
+        if token[0] != '<' or len(token) == 1:
+            if held_at >= 0 and not token.isspace():
+                held_at = -1
+            append(token)
+            continue
+
+        if token[1] == '/':
+            if held_at >= 0 and token == closing:
+                # Empty element: drop it along with the whitespace inside
+                del out[held_at:]
+            else:
+                append(token)
+            held_at = -1
+            continue
+
+        match = match_start_tag(token)
+        if match is None:
+            held_at = -1
+            append(token)
+            continue
+
+        name = match.group(1)
+        if name in _BARE_TAGS:
+            token = _BARE_TAGS[name]
+        elif '="' in token and ('style=' in token or 'class=' in token
+                                or 'data-' in token or 'googleusercontent' in token):
+            token = strip('', token)
+        held_at = len(out)
+        closing = f'</{name}>'
+        append(token)
+
+    content = _BR_ONLY_RE.sub('', ''.join(out))
+    return _WHITESPACE_RE.sub(' ', content).replace('> <', '><').strip()
+
+def extract_excerpt(content, max_length=200):
+    """Extract excerpt from content"""
+    # Remove HTML tags for excerpt
+    text = re.sub(r'<[^>]+>', '', content)
+    text = re.sub(r'\s+', ' ', text).strip()
+
+    if len(text) <= max_length:
+        return text
+
+    # Find last complete sentence within limit
+    excerpt = text[:max_length]
+    last_period = excerpt.rfind('.')
+    if last_period > max_length * 0.7:  # If period is reasonably close to end
+        return excerpt[:last_period + 1]
+
+    # Otherwise, cut at last space
+    last_space = excerpt.rfind(' ')
+    if last_space > 0:
+        return excerpt[:last_space] + '...'
+
+    return excerpt + '...'
+
+def create_slug(text):
+    """Create URL-friendly slug from text"""
+    slug = re.sub(r'[^\w\s-]', '', text.lower())
+    slug = re.sub(r'[-\s]+', '-', slug)
+    return slug.strip('-')
+
+def _child_text(elem, path):
+    child = elem.find(path)
+    return child.text if child is not None else None
+
+def parse_entry(entry):
+    """Extract the raw fields of a live Blogger post entry, or None for anything else"""
+    if _child_text(entry, BLOGGER + 'type') != 'POST':
+        return None
+    if _child_text(entry, BLOGGER + 'status') != 'LIVE':
+        return None
+
+    published = _child_text(entry, ATOM + 'published')
+    return {
+        'title': _child_text(entry, ATOM + 'title') or 'Untitled',
+        'content': _child_text(entry, ATOM + 'content') or '',
+        'author_name': _child_text(entry, f'{ATOM}author/{ATOM}name') or 'Unknown',
+        'published': published,
+        'original_id': _child_text(entry, ATOM + 'id'),
+        'original_url': _child_text(entry, BLOGGER + 'filename'),
+        'categories': [cat.get('term') for cat in entry.findall(ATOM + 'category') if cat.get('term')]
+    }
+
+def iter_feed_entries(feed_path):
+    """Stream parsed post entries from a Blogger feed.atom.
+
+    Entries are cleared from the tree as soon as they are read, so memory stays
+    flat no matter how large the feed is.
+    """
+    import xml.etree.ElementTree as ET  # Deferred, like the process pool below: only imports need them
+
+    context = ET.iterparse(feed_path, events=('start', 'end'))
+    _, root = next(context)
+    for event, elem in context:
+        if event == 'end' and elem.tag == ATOM + 'entry':
+            entry = parse_entry(elem)
+            root.clear()
+            if entry is not None:
+                yield entry
+
+def prepare_entry(entry):
+    """Clean the content and derive the excerpt, preview and read time for a parsed entry"""
+    content = clean_html_content(entry['content'])
+    published = entry['published']
+    prepared = dict(entry)
+    prepared['content'] = content
+    prepared['excerpt'] = extract_excerpt(content)
+    prepared['read_time'] = estimate_read_time(content)
+    prepared['content_preview'] = content_preview(content)
+    prepared['search_text'] = content_text(content)
+    prepared['published_at'] = datetime.fromisoformat(published.replace('Z', '+00:00')) if published else datetime.utcnow()
+    return prepared
+
+def prepare_entries(entries):
+    """Clean a chunk of parsed entries; runs in a worker process.
+
+    Entries that fail to prepare are kept as {'error': message} placeholders so
+    positions in the chunk match positions in the feed.
+    """
+    prepared = []
+    for entry in entries:
+        try:
+            prepared.append(prepare_entry(entry))
+        except Exception as e:
+            prepared.append({'error': str(e)})
+    return prepared
+
+def prepare_in_pool(pool, feed_path, workers):
+    """Stream a feed's prepared entries in order, cleaning PREPARE_CHUNK_SIZE entries per pool task.
+
+    The feed is parsed here as it is read; at most two chunks per worker are
+    queued or held at once, so memory stays flat however large the feed is.
+    """
+    in_flight = deque()
+    chunk = []
+    for entry in iter_feed_entries(feed_path):
+        chunk.append(entry)
+        if len(chunk) == PREPARE_CHUNK_SIZE:
+            in_flight.append(pool.submit(prepare_entries, chunk))
+            chunk = []
+            if len(in_flight) >= 2 * workers:
+                yield from in_flight.popleft().result()
+    if chunk:
+        in_flight.append(pool.submit(prepare_entries, chunk))
+    while in_flight:
+        yield from in_flight.popleft().result()
+
+class BloggerImporter:
+    """Writes Blogger entries with bulk inserts.
+
+    Existing authors, categories and original ids are loaded once into
+    in-memory maps, so importing a post costs no lookups; slugs are allocated
+    per batch with one SlugAllocator query per blog. Posts and their category
+    links are inserted `batch_size` at a time and committed per batch.
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE):
+        self.batch_size = max(1, batch_size)
+        self.results = {
+            'blogs_processed': 0,
+            'posts_imported': 0,
+            'posts_skipped': 0,
+            'categories_created': 0,
+            'authors_created': 0,
+            'errors': []
+        }
+        self._authors = {}
+        self._categories = {}
+        self._slugs = {}
+        self._original_ids = set()
+        self._batch = []
+        self._progress = None
+        self._started = None
+
+    def preload(self):
+        """Load the lookup maps for everything already in the database"""
+        self._authors = dict(db.session.execute(select(Author.name, Author.id)).all())
+        self._categories = {
+            (blog_id, name): category_id
+            for category_id, blog_id, name in db.session.execute(select(Category.id, Category.blog_id, Category.name))
+        }
+        self._slugs = {}  # blog id -> SlugAllocator
+        self._original_ids = set(db.session.execute(
+            select(Post.original_id).where(Post.original_id.isnot(None))
+        ).scalars())
+
+    def import_entries(self, blog, entries, source=None, prepare=prepare_entry, progress=None):
+        """Import entries into `blog`, committing every batch_size posts.
+
+        `prepare` is applied to each entry first; pass None for entries that
+        are already prepared. `progress` is an optional MigrationJobBlog whose
+        counters are updated and committed together with each batch; entries it
+        has already seen are skipped, which resumes from the last committed batch.
+        """
+        source = source or blog.slug
+        resume_from = (progress.entries_seen or 0) if progress is not None else 0
+        self.begin()
+        self._progress = progress
+        if progress is not None:
+            progress.status = 'running'
+            progress.last_error = None
+        try:
+            for index, entry in enumerate(entries):
+                if index < resume_from:
+                    continue
+                if progress is not None:
+                    progress.entries_seen = index + 1
+                try:
+                    if 'error' in entry:
+                        raise ValueError(entry['error'])
+                    queued = self.add(blog.id, prepare(entry) if prepare else entry)
+                    if not queued and progress is not None:
+                        progress.skipped = (progress.skipped or 0) + 1
+                except BatchWriteError:
+                    raise
+                except Exception as e:
+                    self.results['errors'].append(f"Error processing post in {source}: {str(e)}")
+                    if progress is not None:
+                        progress.errors = (progress.errors or 0) + 1
+                        progress.last_error = str(e)
+            self.flush()
+            if progress is not None:
+                progress.status = 'completed'
+                db.session.commit()
+        finally:
+            self._progress = None
+        self.results['blogs_processed'] += 1
+
+    def begin(self):
+        """Start the throughput clock, if it isn't running yet"""
+        if self._started is None:
+            self._started = time.perf_counter()
+
+    def add(self, blog_id, entry):
+        """Queue one prepared entry, flushing when the batch is full.
+
+        Returns False when the entry was already imported and is skipped.
+        """
+        original_id = entry.get('original_id')
+        if original_id and original_id in self._original_ids:
+            self.results['posts_skipped'] += 1
+            return False
+        if original_id:
+            self._original_ids.add(original_id)
+
+        title = entry['title']
+        self._batch.append({
+            'title': title,
+            'slug': None,  # Allocated when the batch is written
+            'content': entry['content'],
+            'excerpt': entry['excerpt'],
+            'read_time': entry['read_time'],
+            'content_preview': entry['content_preview'],
+            'search_text': entry['search_text'],
+            'blog_id': blog_id,
+            'author_id': None,  # Resolved when the batch is written
+            'status': 'published',
+            'original_url': entry.get('original_url'),
+            'original_id': original_id,
+            'published_at': entry['published_at'],
+            'meta_title': title,
+            'meta_description': entry['excerpt'],
+            '_author': entry['author_name'],
+            '_slug_base': create_slug(title),
+            '_categories': [(blog_id, term) for term in dict.fromkeys(entry['categories'])]
+        })
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+        return True
+
+    def flush(self):
+        """Bulk insert the queued posts, their new authors, categories and category links"""
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, []
+        progress = self._progress
+        # Counters of the progress row, to restore if a slug conflict rolls them back
+        saved = {name: getattr(progress, name) for name in PROGRESS_FIELDS} if progress is not None else {}
+
+        def reset():
+            self._slugs.clear()  # Reload the blogs' slugs, including the one taken concurrently
+            for name, value in saved.items():
+                setattr(progress, name, value)
+
+        try:
+            post_ids, new_authors, new_categories = with_slug_retry(lambda: self._write_batch(batch), reset)
+        except Exception as e:
+            db.session.rollback()
+            # Authors and categories created since the last commit were rolled back too
+            self.preload()
+            raise BatchWriteError(f"Error writing batch of {len(batch)} posts: {str(e)}") from e
+
+        self._authors.update(new_authors)
+        self._categories.update(new_categories)
+        self.results['authors_created'] += len(new_authors)
+        self.results['categories_created'] += len(new_categories)
+        self.results['posts_imported'] += len(post_ids)
+
+    def _write_batch(self, batch):
+        """Allocate slugs and insert the batch; returns the post ids and the authors and categories created.
+
+        The lookup maps are only updated by flush() once the batch is
+        committed, so a rolled back attempt leaves them as they were.
+        """
+        for blog_id in {row['blog_id'] for row in batch}:
+            allocator = self._slugs.setdefault(blog_id, SlugAllocator(blog_id))
+            allocator.load([row['_slug_base'] for row in batch if row['blog_id'] == blog_id])
+        for row in batch:
+            row['slug'] = self._slugs[row['blog_id']].allocate(row['_slug_base'])
+
+        new_names = [name for name in dict.fromkeys(row['_author'] for row in batch) if name not in self._authors]
+        new_authors = {}
+        if new_names:
+            new_authors = {name: author_id for author_id, name in db.session.execute(
+                insert(Author).returning(Author.id, Author.name), [{'name': name} for name in new_names]
+            )}
+        for row in batch:
+            row['author_id'] = new_authors.get(row['_author']) or self._authors[row['_author']]
+
+        new_keys = []
+        for row in batch:
+            for key in row['_categories']:
+                if key not in self._categories and key not in new_keys:
+                    new_keys.append(key)
+        new_categories = {}
+        if new_keys:
+            ids = db.session.scalars(
+                insert(Category).returning(Category.id, sort_by_parameter_order=True),
+                [{'blog_id': blog_id, 'name': name, 'slug': create_slug(name)} for blog_id, name in new_keys]
+            ).all()
+            new_categories = dict(zip(new_keys, ids))
+
+        post_ids = db.session.scalars(
+            insert(Post).returning(Post.id, sort_by_parameter_order=True),
+            [{key: value for key, value in row.items() if not key.startswith('_')} for row in batch]
+        ).all()
+
+        links = [
+            {'post_id': post_id, 'category_id': new_categories.get(key) or self._categories[key]}
+            for post_id, row in zip(post_ids, batch)
+            for key in row['_categories']
+        ]
+        if links:
+            db.session.execute(post_categories.insert(), links)
+
+        if self._progress is not None:
+            self._progress.imported = (self._progress.imported or 0) + len(post_ids)
+        db.session.commit()
+        return post_ids, new_authors, new_categories
+
+    def discard_pending(self):
+        """Drop queued, uncommitted posts and reload the lookup maps to match the database"""
+        self._batch = []
+        self.preload()
+
+    def summary(self):
+        """Results including throughput in posts/second"""
+        elapsed = time.perf_counter() - self._started if self._started is not None else 0.0
+        results = dict(self.results)
+        results['elapsed_seconds'] = round(elapsed, 3)
+        results['posts_per_second'] = round(self.results['posts_imported'] / elapsed, 1) if elapsed else 0.0
+        return results
+
+def import_feeds(importer, feeds, workers=1, progress=None):
+    """Import a list of (blog, feed_path, source) feeds.
+
+    With more than one worker, entries are cleaned in a process pool, chunk
+    by chunk, while this process parses the feeds and stays the only database
+    writer. Workers are spawned rather than forked, so they don't inherit this
+    process's database connections and threads. `progress` optionally maps
+    each source to its MigrationJobBlog.
+    """
+    progress = progress or {}
+    importer.begin()
+
+    def run(blog, entries, source, prepare):
+        try:
+            importer.import_entries(blog, entries, source=source, prepare=prepare, progress=progress.get(source))
+        except Exception as e:
+            db.session.rollback()
+            importer.discard_pending()
+            importer.results['errors'].append(f"Error processing blog {source}: {str(e)}")
+            _mark_failed(progress.get(source), e)
+
+    if workers <= 1:
+        for blog, feed_path, source in feeds:
+            run(blog, iter_feed_entries(feed_path), source, prepare_entry)
+        return
+
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        for blog, feed_path, source in feeds:
+            run(blog, prepare_in_pool(pool, feed_path, workers), source, None)
+
+def _mark_failed(progress, error):
+    if progress is None:
+        return
+    progress.status = 'failed'
+    progress.last_error = str(error)
+    db.session.commit()
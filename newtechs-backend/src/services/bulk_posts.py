@@ -0,0 +1,232 @@
+import json
+import time
+from datetime import datetime
+from sqlalchemy import insert, select, tuple_
+from src.models.user import db
+from src.models.blog import (Blog, Post, Category, Author, post_categories, content_preview, content_text,
+                             estimate_read_time)
+from src.services.blogger_import import create_slug
+from src.services.slugs import SlugAllocator, with_slug_retry
+
+DEFAULT_BULK_BATCH_SIZE = 500
+
+# Post columns a bulk item may set as is, as in create_post
+COPIED_FIELDS = ('content', 'excerpt', 'featured_image', 'meta_title', 'meta_description', 'original_url')
+
+def iter_ndjson(stream):
+    """Decoded items of a newline-delimited JSON body, read line by line.
+
+    A line that isn't valid JSON comes out as its ValueError, which is reported
+    as that item's failure.
+    """
+    for line in iter(stream.readline, b''):
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                yield e
+
+class BulkPostWriter:
+    """Creates posts in batches for POST /api/posts/bulk.
+
+    Each batch costs a fixed number of set-based queries whatever its size:
+    one each for its blogs, already-ingested original ids, authors,
+    categories and slug families (SlugAllocator), then bulk inserts of new
+    authors, categories, posts and category links, committed together. A batch
+    that loses a slug to a concurrent writer is written again; one failing
+    otherwise is rolled back and reported per item, and later batches still run.
+    """
+
+    def __init__(self, batch_size=DEFAULT_BULK_BATCH_SIZE):
+        self.batch_size = max(1, batch_size)
+        self.results = []
+        self.summary = {'received': 0, 'created': 0, 'skipped': 0, 'failed': 0,
+                        'authors_created': 0, 'categories_created': 0}
+        self.blog_ids = set()  # Blogs that received posts
+        self._batch = []
+        self._started = time.perf_counter()
+
+    def add(self, item):
+        index = self.summary['received']
+        self.summary['received'] += 1
+        self._batch.append((index, item))
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, []
+        reported = len(self.results)
+        summary = dict(self.summary)
+
+        def reset():
+            # Forget the rolled back attempt's results before writing the batch again
+            del self.results[reported:]
+            self.summary = dict(summary)
+
+        try:
+            with_slug_retry(lambda: self._write(batch), reset)
+        except Exception as e:
+            db.session.rollback()
+            done = {result['index'] for result in self.results[reported:]}
+            for index, _ in batch:
+                if index not in done:
+                    # The driver's message, without the statement and its parameters
+                    self._result(index, 'failed', error=f"Batch write failed: {str(getattr(e, 'orig', None) or e)}")
+
+    def finish(self):
+        """Flush the last batch and return (results, summary)"""
+        self.flush()
+        elapsed = time.perf_counter() - self._started
+        summary = dict(self.summary)
+        summary['elapsed_seconds'] = round(elapsed, 3)
+        summary['posts_per_second'] = round(self.summary['created'] / elapsed, 1) if elapsed else 0.0
+        return sorted(self.results, key=lambda result: result['index']), summary
+
+    def _write(self, batch):
+        items = []
+        for index, item in batch:
+            error = self._validate(item)
+            if error:
+                self._result(index, 'failed', error=error)
+            else:
+                items.append((index, item))
+        if not items:
+            return
+
+        blog_ids = {int(item['blog_id']) for _, item in items}
+        existing_blogs = set(db.session.scalars(select(Blog.id).where(Blog.id.in_(blog_ids))))
+        original_ids = {item['original_id'] for _, item in items if item.get('original_id')}
+        ingested = dict(db.session.execute(
+            select(Post.original_id, Post.id).where(Post.original_id.in_(original_ids))
+        ).all()) if original_ids else {}
+
+        rows = []
+        for index, item in items:
+            if int(item['blog_id']) not in existing_blogs:
+                self._result(index, 'failed', error='Blog not found')
+            elif item.get('original_id') and item['original_id'] in ingested:
+                self._result(index, 'skipped', id=ingested[item['original_id']], error='Already ingested')
+            else:
+                if item.get('original_id'):
+                    ingested[item['original_id']] = None  # Duplicates within the request
+                rows.append((index, item))
+        if not rows:
+            return
+
+        authors, authors_created = self._authors({item.get('author_name') or 'Admin': item.get('author_email')
+                                                  for _, item in rows})
+        categories, categories_created = self._categories({(int(item['blog_id']), name)
+                                                           for _, item in rows for name in item.get('categories') or []})
+
+        allocators = {}
+        for blog_id in {int(item['blog_id']) for _, item in rows}:
+            allocators[blog_id] = SlugAllocator(blog_id)
+            allocators[blog_id].load([self._base_slug(item) for _, item in rows if int(item['blog_id']) == blog_id])
+
+        posts = []
+        for index, item in rows:
+            blog_id = int(item['blog_id'])
+            post = {field: item.get(field) for field in COPIED_FIELDS}
+            post.update({
+                'title': item['title'],
+                'slug': allocators[blog_id].allocate(self._base_slug(item)),
+                'blog_id': blog_id,
+                'author_id': authors[item.get('author_name') or 'Admin'],
+                'status': item.get('status', 'published'),
+                'is_featured': bool(item.get('is_featured', False)),
+                'original_id': item.get('original_id'),
+                # Core inserts skip the Post.content listener
+                'read_time': estimate_read_time(item['content']),
+                'content_preview': content_preview(item['content']),
+                'search_text': content_text(item['content']),
+                'published_at': self._published_at(item)
+            })
+            posts.append(post)
+
+        # RETURNING without sort_by_parameter_order stays one multi-row statement per page on SQLite;
+        # the rows come back keyed by their (blog_id, slug) instead of in order
+        ids = {(blog_id, slug): post_id for post_id, blog_id, slug in db.session.execute(
+            insert(Post).returning(Post.id, Post.blog_id, Post.slug), posts
+        )}
+        post_ids = [ids[(post['blog_id'], post['slug'])] for post in posts]
+        links = [
+            {'post_id': post_id, 'category_id': categories[(int(item['blog_id']), name)]}
+            for post_id, (_, item) in zip(post_ids, rows)
+            for name in dict.fromkeys(item.get('categories') or [])
+        ]
+        if links:
+            db.session.execute(post_categories.insert(), links)
+        db.session.commit()
+
+        self.summary['authors_created'] += authors_created
+        self.summary['categories_created'] += categories_created
+        for post_id, post, (index, _) in zip(post_ids, posts, rows):
+            self._result(index, 'created', id=post_id, slug=post['slug'])
+        self.blog_ids.update(post['blog_id'] for post in posts)
+
+    def _validate(self, item):
+        if isinstance(item, ValueError):
+            return f"Invalid JSON: {str(item)}"
+        if not isinstance(item, dict):
+            return 'Each post must be a JSON object'
+        if not item.get('title'):
+            return 'Title required'
+        if not isinstance(item.get('content'), str):
+            return 'Content required'
+        try:
+            int(item.get('blog_id'))
+        except (TypeError, ValueError):
+            return 'blog_id required'
+        categories = item.get('categories') or []
+        if not isinstance(categories, list) or not all(isinstance(name, str) for name in categories):
+            return 'categories must be a list of names'
+        try:
+            self._published_at(item)
+        except (TypeError, ValueError):
+            return 'Invalid published_at'
+        return None
+
+    def _authors(self, emails_by_name):
+        """Author id by name and the number created, inserting the missing ones at once"""
+        ids = dict(db.session.execute(
+            select(Author.name, Author.id).where(Author.name.in_(emails_by_name))
+        ).all())
+        missing = [name for name in emails_by_name if name not in ids]
+        if missing:
+            ids.update((name, author_id) for author_id, name in db.session.execute(
+                insert(Author).returning(Author.id, Author.name),
+                [{'name': name, 'email': emails_by_name[name]} for name in missing]
+            ))
+        return ids, len(missing)
+
+    def _categories(self, keys):
+        """Category id by (blog_id, name) and the number created, inserting the missing ones at once"""
+        if not keys:
+            return {}, 0
+        ids = {}
+        for category_id, blog_id, name in db.session.execute(
+            select(Category.id, Category.blog_id, Category.name)
+            .where(tuple_(Category.blog_id, Category.name).in_(list(keys)))
+        ):
+            ids.setdefault((blog_id, name), category_id)
+        missing = sorted(key for key in keys if key not in ids)
+        if missing:
+            ids.update(((blog_id, name), category_id) for category_id, blog_id, name in db.session.execute(
+                insert(Category).returning(Category.id, Category.blog_id, Category.name),
+                [{'blog_id': blog_id, 'name': name, 'slug': create_slug(name)} for blog_id, name in missing]
+            ))
+        return ids, len(missing)
+
+    def _base_slug(self, item):
+        return create_slug(item.get('slug') or item['title']) or 'post'
+
+    def _published_at(self, item):
+        value = item.get('published_at')
+        return datetime.fromisoformat(value) if value else datetime.utcnow()
+
+    def _result(self, index, status, **fields):
+        self.results.append(dict({'index': index, 'status': status}, **fields))
+        self.summary[status] += 1
@@ -0,0 +1,243 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from inspect import iscoroutinefunction
+from urllib.parse import quote, urlencode
+from flask import g, request, current_app
+from src.services.http_cache import VALIDATOR_HEADERS
+
+class MemoryBackend:
+    """In-process LRU cache with per-entry TTL and a tag -> keys index"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value, tags)
+        self._tags = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl, tags):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, tags):
+        removed = 0
+        with self._lock:
+            for tag in tags:
+                for key in self._tags.pop(tag, ()):
+                    if key in self._entries:
+                        self._remove(key)
+                        removed += 1
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def size(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+class RedisBackend:
+    """Shared cache in Redis; tags are Redis sets of cache keys"""
+
+    def __init__(self, url, prefix='newtechs:'):
+        import redis  # Optional dependency, only needed for this backend
+        self._redis = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.evictions = 0  # Redis evicts on its own; see its INFO stats
+        self.expirations = 0
+
+    def get(self, key):
+        value = self._redis.get(self.prefix + key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl, tags):
+        pipe = self._redis.pipeline()
+        pipe.setex(self.prefix + key, int(max(1, ttl)), json.dumps(value))
+        for tag in tags:
+            pipe.sadd(self.prefix + 'tag:' + tag, key)
+            pipe.expire(self.prefix + 'tag:' + tag, int(max(1, ttl)))
+        pipe.execute()
+
+    def invalidate(self, tags):
+        removed = 0
+        for tag in tags:
+            tag_key = self.prefix + 'tag:' + tag
+            keys = self._redis.smembers(tag_key)
+            if keys:
+                removed += self._redis.delete(*[self.prefix + key.decode() for key in keys])
+            self._redis.delete(tag_key)
+        return removed
+
+    def clear(self):
+        keys = list(self._redis.scan_iter(self.prefix + '*'))
+        if keys:
+            self._redis.delete(*keys)
+
+    def size(self):
+        return None
+
+class ResponseCache:
+    """Caches JSON responses of read endpoints, invalidated by tag.
+
+    Views decorated with @cached add tags while they run (cache_tags('blog:x'))
+    and write endpoints call invalidate('blog:x') after committing.
+    """
+
+    def __init__(self, app=None):
+        self.backend = MemoryBackend()
+        self.default_ttl = 60
+        self.enabled = True
+        self._stats = {'hits': 0, 'misses': 0, 'sets': 0, 'invalidations': 0, 'invalidated_entries': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RESPONSE_CACHE_BACKEND', 'memory')  # memory, redis or none
+        app.config.setdefault('RESPONSE_CACHE_TTL', 60)
+        app.config.setdefault('RESPONSE_CACHE_MAX_ENTRIES', 1024)
+        app.config.setdefault('RESPONSE_CACHE_REDIS_URL', None)
+
+        backend = app.config['RESPONSE_CACHE_BACKEND']
+        self.enabled = backend != 'none'
+        self.default_ttl = app.config['RESPONSE_CACHE_TTL']
+        if backend == 'redis':
+            self.backend = RedisBackend(app.config['RESPONSE_CACHE_REDIS_URL'])
+        else:
+            self.backend = MemoryBackend(app.config['RESPONSE_CACHE_MAX_ENTRIES'])
+        app.extensions['response_cache'] = self
+
+    def cached(self, ttl=None):
+        """Decorator caching successful responses, keyed by path and query string (sync or async views)"""
+        def decorator(view):
+            if iscoroutinefunction(view):
+                @wraps(view)
+                async def async_wrapper(*args, **kwargs):
+                    if not self.enabled:
+                        return await view(*args, **kwargs)
+                    key = self._key()
+                    hit = self._lookup(key)
+                    if hit is not None:
+                        return hit
+                    g.cache_tags = set()
+                    return self._store(key, await view(*args, **kwargs), ttl)
+                return async_wrapper
+
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return view(*args, **kwargs)
+                key = self._key()
+                hit = self._lookup(key)
+                if hit is not None:
+                    return hit
+                g.cache_tags = set()
+                return self._store(key, view(*args, **kwargs), ttl)
+            return wrapper
+        return decorator
+
+    def invalidate(self, *tags):
+        """Drop every cached response carrying any of the tags"""
+        if not tags:
+            return 0
+        try:
+            removed = self.backend.invalidate(tags)
+        except Exception:
+            return 0
+        self._stats['invalidations'] += 1
+        self._stats['invalidated_entries'] += removed
+        return removed
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        lookups = self._stats['hits'] + self._stats['misses']
+        return dict(
+            self._stats,
+            backend=type(self.backend).__name__,
+            enabled=self.enabled,
+            hit_rate=round(self._stats['hits'] / lookups, 3) if lookups else 0.0,
+            evictions=self.backend.evictions,
+            expirations=self.backend.expirations,
+            size=self.backend.size(),
+            default_ttl=self.default_ttl
+        )
+
+    def _lookup(self, key):
+        try:
+            entry = self.backend.get(key)
+        except Exception:
+            entry = None
+        if entry is None:
+            self._stats['misses'] += 1
+            return None
+
+        self._stats['hits'] += 1
+        response = current_app.response_class(entry['body'], status=entry['status'], mimetype=entry['mimetype'],
+                                              headers=entry.get('headers'))
+        # Answer conditional requests from the stored validators
+        return response.make_conditional(request)
+
+    def _store(self, key, rv, ttl):
+        response = current_app.make_response(rv)
+        if response.status_code == 200 and not response.direct_passthrough:
+            entry = {
+                'body': response.get_data(as_text=True),
+                'status': response.status_code,
+                'mimetype': response.mimetype,
+                'headers': {name: response.headers[name] for name in VALIDATOR_HEADERS if name in response.headers}
+            }
+            try:
+                self.backend.set(key, entry, ttl or self.default_ttl, g.cache_tags)
+                self._stats['sets'] += 1
+            except Exception:
+                pass
+        return response
+
+    def _key(self):
+        # Re-escaped so a decoded '&' or '=' can't make two requests share a key
+        args = urlencode(sorted(request.args.items(multi=True)))
+        return f'resp:{quote(request.path)}?{args}'
+
+def cache_tags(*tags):
+    """Tag the response being cached by the current request"""
+    if 'cache_tags' in g:
+        g.cache_tags.update(tags)
+
+def blog_tag(slug):
+    return f'blog:{slug}'
+
+response_cache = ResponseCache()
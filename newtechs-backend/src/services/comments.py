@@ -0,0 +1,51 @@
+from collections import defaultdict
+from sqlalchemy import literal, select
+from src.models.user import db
+from src.models.blog import Comment
+from src.services.pagination import keyset_page
+
+DEFAULT_MAX_DEPTH = 5
+
+def load_comment_thread(post_id, per_page, cursor=None, max_depth=DEFAULT_MAX_DEPTH):
+    """One page of approved top-level comments plus their approved replies.
+
+    Costs two queries whatever the thread size: a keyset page of top-level
+    comments and a recursive CTE walking replies down to max_depth levels.
+    A reply whose parent isn't approved is left out together with its subtree.
+    Returns (roots, children_by_parent_id, pagination).
+    """
+    top_level = Comment.query.filter(
+        Comment.post_id == post_id,
+        Comment.parent_id.is_(None),
+        Comment.status == 'approved'
+    )
+    roots, pagination = keyset_page(top_level, per_page, cursor,
+                                    timestamp_column=Comment.created_at, id_column=Comment.id)
+
+    children = defaultdict(list)
+    if not roots or max_depth < 1:
+        return roots, children, pagination
+
+    # Replies share their parent's post; filtering on it in both steps lets
+    # each level seek ix_comments_post_parent_status_created on
+    # (post_id, parent_id, status)
+    thread = (
+        select(Comment.id, literal(1).label('depth'))
+        .where(Comment.post_id == post_id, Comment.parent_id.in_([root.id for root in roots]),
+               Comment.status == 'approved')
+        .cte('thread', recursive=True)
+    )
+    thread = thread.union_all(
+        select(Comment.id, thread.c.depth + 1)
+        .join(thread, Comment.parent_id == thread.c.id)
+        .where(Comment.post_id == post_id, Comment.status == 'approved', thread.c.depth < max_depth)
+    )
+    replies = (
+        db.session.query(Comment)
+        .join(thread, Comment.id == thread.c.id)
+        .order_by(Comment.created_at, Comment.id)
+        .all()
+    )
+    for reply in replies:
+        children[reply.parent_id].append(reply)
+    return roots, children, pagination
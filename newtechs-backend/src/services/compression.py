@@ -0,0 +1,243 @@
+import gzip
+import logging
+import mimetypes
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from flask import request, send_from_directory
+
+# Brotli is optional (brotli or brotlicffi, same API); without it responses are gzip only
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_MIMETYPES = (
+    'application/json', 'application/javascript', 'application/manifest+json', 'application/xml',
+    'image/svg+xml', 'image/x-icon', 'image/vnd.microsoft.icon', 'text/css', 'text/html',
+    'text/javascript', 'text/plain', 'text/xml'
+)
+# Static files worth precompressing; images other than SVG and icons are compressed already
+COMPRESSIBLE_EXTENSIONS = ('.css', '.html', '.ico', '.js', '.json', '.map', '.mjs', '.svg', '.txt',
+                           '.wasm', '.webmanifest', '.xml')
+# Fingerprinted build output (Vite's assets/, hex content hashes) never changes under its name
+DEFAULT_IMMUTABLE_PATTERN = r'(^|/)assets/|[.-][0-9a-f]{8,}\.[a-z0-9]+$'
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+VARIANT_SUFFIXES = {'br': 'br', 'gzip': 'gz'}
+STATIC_LEVELS = {'br': 11, 'gzip': 9}  # Built once, so compress as hard as possible
+
+def available_encodings():
+    """Content codings this process can produce, preferred first"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+def compress(data, encoding, level):
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+class CompressedBodyCache:
+    """LRU of compressed response bodies keyed by (ETag, encoding).
+
+    A view's ETag need not cover every byte (post pages leave out the live
+    view count), so entries also keep the length and Adler-32 of the body they
+    were made from and only answer for that exact body.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (etag, encoding) -> (length, checksum, compressed)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, etag, encoding, data):
+        key = (etag, encoding)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == len(data) and entry[1] == zlib.adler32(data):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+            return None
+
+    def set(self, etag, encoding, data, compressed):
+        with self._lock:
+            self._entries[(etag, encoding)] = (len(data), zlib.adler32(data), compressed)
+            self._entries.move_to_end((etag, encoding))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self):
+        return len(self._entries)
+
+class ResponseCompression:
+    """Negotiated gzip/Brotli for dynamic responses, precompressed variants for static files.
+
+    An after_request hook compresses 200 responses of a compressible mimetype
+    once they reach COMPRESSION_MIN_SIZE, in the client's preferred Accept-Encoding
+    coding. Bodies with an ETag are compressed once and then served from a
+    CompressedBodyCache; their ETag turns weak, as each coding is a different
+    representation, and If-None-Match still matches it. Static files are served
+    through send_static(), which picks a .br/.gz file built next to the original
+    by precompress_static() at startup or by `flask precompress-static` at deploy.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.min_size = 1024
+        self.levels = {'gzip': 6, 'br': 4}
+        self.mimetypes = COMPRESSIBLE_MIMETYPES
+        self.cache = CompressedBodyCache()
+        self._stats = {'compressed': 0, 'bytes_in': 0, 'bytes_out': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.setdefault('COMPRESSION_ENABLED', True)
+        self.min_size = app.config.setdefault('COMPRESSION_MIN_SIZE', 1024)  # Bytes
+        self.levels = {
+            'gzip': app.config.setdefault('COMPRESSION_GZIP_LEVEL', 6),
+            'br': app.config.setdefault('COMPRESSION_BR_QUALITY', 4)
+        }
+        self.mimetypes = app.config.setdefault('COMPRESSION_MIMETYPES', COMPRESSIBLE_MIMETYPES)
+        self.cache = CompressedBodyCache(app.config.setdefault('COMPRESSION_CACHE_SIZE', 256))
+        app.config.setdefault('STATIC_PRECOMPRESS', os.environ.get('STATIC_PRECOMPRESS', 'startup'))  # or off: built at deploy
+        app.config.setdefault('STATIC_MAX_AGE', 3600)  # Seconds, for files without a content hash
+        app.config.setdefault('STATIC_IMMUTABLE_PATTERN', DEFAULT_IMMUTABLE_PATTERN)
+        app.extensions['response_compression'] = self
+        if self.enabled:
+            app.after_request(self._compress_response)
+            if app.config['STATIC_PRECOMPRESS'] == 'startup' and app.static_folder:
+                try:
+                    precompress_static(app.static_folder, self.min_size)
+                except OSError as e:  # e.g. a read-only static folder
+                    logger.warning('Static files not precompressed: %s', e)
+
+    def negotiate(self):
+        """The coding to answer the current request with, or None for identity"""
+        return request.accept_encodings.best_match(available_encodings())
+
+    def stats(self):
+        return dict(
+            self._stats,
+            enabled=self.enabled,
+            encodings=list(available_encodings()),
+            min_size=self.min_size,
+            cache_size=self.cache.size(),
+            cache_hits=self.cache.hits,
+            cache_misses=self.cache.misses
+        )
+
+    def _compress_response(self, response):
+        if response.status_code == 304 and not response.direct_passthrough:
+            # Revalidations carry the validators and Vary of the 200 they stand for
+            etag, weak = response.get_etag()
+            if etag and not weak and self.negotiate():
+                response.set_etag(etag, weak=True)
+            response.vary.add('Accept-Encoding')
+            return response
+        if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers or response.mimetype not in self.mimetypes):
+            return response
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = self.negotiate()
+        if encoding is None:
+            return response
+
+        etag, weak = response.get_etag()
+        compressed = self.cache.get(etag, encoding, data) if etag else None
+        if compressed is None:
+            compressed = compress(data, encoding, self.levels[encoding])
+            if etag:
+                self.cache.set(etag, encoding, data, compressed)
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+
+        self._stats['compressed'] += 1
+        self._stats['bytes_in'] += len(data)
+        self._stats['bytes_out'] += len(compressed)
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+response_compression = ResponseCompression()
+
+def precompress_static(folder, min_size=1024, encodings=None):
+    """Write .gz (and .br) files next to the compressible files of a static folder.
+
+    Variants at least as new as their file are kept, so this is cheap to rerun;
+    a variant is only written if it saves space. Returns the paths written.
+    """
+    written = []
+    for root, _, files in os.walk(folder):
+        for name in files:
+            path = os.path.join(root, name)
+            if not name.endswith(COMPRESSIBLE_EXTENSIONS) or os.path.getsize(path) < min_size:
+                continue
+            stale = [encoding for encoding in encodings or available_encodings()
+                     if not _is_fresh(variant_path(path, encoding), path)]
+            if not stale:
+                continue
+            with open(path, 'rb') as f:
+                data = f.read()
+            for encoding in stale:
+                compressed = compress(data, encoding, STATIC_LEVELS[encoding])
+                if len(compressed) < len(data) * 0.95:
+                    with open(variant_path(path, encoding), 'wb') as out:
+                        out.write(compressed)
+                    written.append(variant_path(path, encoding))
+    return written
+
+def variant_path(path, encoding):
+    return f'{path}.{VARIANT_SUFFIXES[encoding]}'
+
+def _is_fresh(variant, path):
+    try:
+        return os.path.getmtime(variant) >= os.path.getmtime(path)
+    except OSError:
+        return False
+
+def send_static(app, folder, path):
+    """send_from_directory() of the precompressed variant the client prefers, with cache headers"""
+    full_path = os.path.join(folder, path)
+    compressible = path.endswith(COMPRESSIBLE_EXTENSIONS)
+    immutable = re.search(app.config.get('STATIC_IMMUTABLE_PATTERN', DEFAULT_IMMUTABLE_PATTERN), path)
+    max_age = IMMUTABLE_MAX_AGE if immutable else app.config.get('STATIC_MAX_AGE', 3600)
+    if path.endswith('.html'):
+        max_age = None  # The entry point names the current assets: always revalidate it
+
+    encoding = None
+    if compressible:
+        variants = [coding for coding in VARIANT_SUFFIXES if _is_fresh(variant_path(full_path, coding), full_path)]
+        encoding = request.accept_encodings.best_match(variants) if variants else None
+
+    if encoding:
+        response = send_from_directory(folder, variant_path(path, encoding),
+                                       mimetype=mimetypes.guess_type(path)[0] or 'application/octet-stream',
+                                       max_age=max_age)
+        response.headers['Content-Encoding'] = encoding
+    else:
+        response = send_from_directory(folder, path, max_age=max_age)
+    if max_age is None:
+        response.cache_control.no_cache = True
+    elif immutable:
+        response.cache_control.immutable = True
+    if compressible:
+        response.vary.add('Accept-Encoding')
+    return response
@@ -0,0 +1,176 @@
+import itertools
+import os
+import time
+from functools import wraps
+from flask import g, current_app
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool
+from src.models.user import db
+from src.models.session import STICKY_COOKIE
+
+# Set on every new SQLite connection. WAL lets readers run while a write is in
+# progress, and busy_timeout makes a writer wait for the lock instead of failing
+# with "database is locked".
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',  # Safe with WAL; only a power loss can drop the last commits
+    'busy_timeout': 5000,  # ms
+    'foreign_keys': 'ON',
+    'cache_size': -64000,  # Negative means KiB, per connection
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# Pool settings per deployment: (primary, read-only). SQLite has a single
+# writer, so production keeps the primary pool small and the read pool wide.
+POOL_PROFILES = {
+    'development': (
+        {'pool_size': 5, 'max_overflow': 10, 'pool_timeout': 30},
+        {'pool_size': 5, 'max_overflow': 10, 'pool_timeout': 30},
+    ),
+    'production': (
+        {'pool_size': 4, 'max_overflow': 4, 'pool_timeout': 10, 'pool_pre_ping': True},
+        {'pool_size': 16, 'max_overflow': 16, 'pool_timeout': 10, 'pool_pre_ping': True},
+    ),
+    # Short-lived processes (Api/index.py on Vercel): no connections kept between invocations
+    'serverless': (
+        {'poolclass': NullPool},
+        {'poolclass': NullPool},
+    ),
+}
+
+def readonly_uri(uri):
+    """Read-only URI for the same database, or None if it has no separate read-only form"""
+    url = make_url(uri)
+    if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:') or url.query.get('uri'):
+        return None
+    return url.set(database=f'file:{url.database}', query={'mode': 'ro', 'uri': 'true'})
+
+def sqlite_pragmas(app, readonly=False):
+    pragmas = dict(SQLITE_PRAGMAS, **app.config.get('SQLITE_PRAGMAS', {}))
+    if readonly:
+        # Read-only connections inherit the journal mode from the file and refuse writes
+        pragmas.pop('journal_mode', None)
+        pragmas['query_only'] = 'ON'
+    return pragmas
+
+def set_pragmas(pragmas):
+    """'connect' event listener applying the pragmas to each new connection"""
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+    return on_connect
+
+def normalize_uri(uri):
+    if uri.startswith('postgres://'):  # Heroku/Render style scheme, which SQLAlchemy doesn't accept
+        return 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+def database_uri(default):
+    """DATABASE_URL from the environment (SQLite or PostgreSQL), else the default"""
+    return normalize_uri(os.environ.get('DATABASE_URL') or default)
+
+def _replica_uris(app):
+    uris = app.config.setdefault('DATABASE_REPLICA_URIS', None)
+    if uris is None:
+        uris = os.environ.get('DATABASE_REPLICA_URLS', '')
+    if isinstance(uris, str):
+        uris = uris.split(',')
+    return [normalize_uri(uri.strip()) for uri in uris if uri.strip()]
+
+class ReadRouting:
+    """Read binds of an app and how long a client keeps reading from the primary after a write"""
+
+    def __init__(self, read_binds, sticky_seconds):
+        self.read_binds = read_binds
+        self.sticky_seconds = sticky_seconds
+        self._next = itertools.cycle(read_binds) if read_binds else None
+
+    def next_read_bind(self):
+        return next(self._next) if self._next else None
+
+    def stick_to_primary(self, response):
+        """after_request hook: a request that wrote pins its client to the primary for a while"""
+        if g.get('db_wrote') and self.read_binds and self.sticky_seconds:
+            response.set_cookie(STICKY_COOKIE, str(int(time.time() + self.sticky_seconds)),
+                                max_age=self.sticky_seconds, httponly=True, samesite='Lax')
+        return response
+
+def init_database(app):
+    """db.init_app(app) with the pool of the app's DATABASE_PROFILE, SQLite pragmas and read binds.
+
+    Reads of views marked @read_only go to a read bind: the replicas listed in
+    DATABASE_REPLICA_URIS (or the DATABASE_REPLICA_URLS environment variable,
+    comma-separated) in turn, or for a SQLite file without replicas a 'readonly'
+    bind with its own pool of read-only connections. Writes always go to the
+    primary, and for DATABASE_STICKY_SECONDS after a write the writing client's
+    reads do too, so it sees its own changes despite replication lag.
+    """
+    profile = app.config.setdefault('DATABASE_PROFILE', os.environ.get('DATABASE_PROFILE', 'development'))
+    if profile not in POOL_PROFILES:
+        raise ValueError(f'Unknown DATABASE_PROFILE {profile!r}; expected one of {", ".join(POOL_PROFILES)}')
+    app.config.setdefault('DATABASE_POOL', {})  # Overrides of the profile's primary pool settings
+    app.config.setdefault('DATABASE_READONLY_POOL', {})  # ... and of the read pools
+    app.config.setdefault('DATABASE_STICKY_SECONDS', 5)
+    app.config.setdefault('SQLITE_PRAGMAS', {})  # Overrides of SQLITE_PRAGMAS
+    primary_pool, readonly_pool = POOL_PROFILES[profile]
+    read_pool = dict(readonly_pool, **app.config['DATABASE_READONLY_POOL'])
+
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    if url.database not in (None, '', ':memory:') or url.get_backend_name() != 'sqlite':
+        options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+        for name, value in dict(primary_pool, **app.config['DATABASE_POOL']).items():
+            options.setdefault(name, value)
+
+    binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+    read_binds = []
+    for number, uri in enumerate(_replica_uris(app), start=1):
+        binds.setdefault(f'replica_{number}', dict(read_pool, url=uri))
+        read_binds.append(f'replica_{number}')
+    sticky_seconds = app.config['DATABASE_STICKY_SECONDS'] if read_binds else 0  # The readonly bind never lags
+    if not read_binds:
+        readonly = app.config.setdefault('DATABASE_READONLY_URI', readonly_uri(url))
+        if readonly:
+            binds.setdefault('readonly', dict(read_pool, url=readonly))
+            read_binds.append('readonly')
+
+    db.init_app(app)
+    routing = app.extensions['db_routing'] = ReadRouting(read_binds, sticky_seconds)
+    app.after_request(routing.stick_to_primary)
+
+    with app.app_context():
+        for key, engine in db.engines.items():
+            if engine.dialect.name == 'sqlite':
+                pragmas = sqlite_pragmas(app, readonly=key in read_binds)
+                event.listen(engine, 'connect', set_pragmas(pragmas))
+
+def read_only(view):
+    """Run the view's db.session queries on a read bind (see RoutingSession)"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.read_only = True
+        return view(*args, **kwargs)
+    return wrapper
+
+def database_stats():
+    """Pool state of every engine, the read routing and the pragmas in effect on the primary"""
+    routing = current_app.extensions['db_routing']
+    stats = {
+        'profile': current_app.config.get('DATABASE_PROFILE'),
+        'backend': db.engine.dialect.name,
+        'read_binds': routing.read_binds,
+        'sticky_seconds': routing.sticky_seconds,
+        'engines': {}
+    }
+    for key, engine in db.engines.items():
+        stats['engines'][key or 'primary'] = {
+            'url': engine.url.render_as_string(hide_password=True),
+            'pool': engine.pool.status()
+        }
+    if db.engine.dialect.name == 'sqlite':
+        with db.engine.connect() as conn:
+            stats['pragmas'] = {name: conn.exec_driver_sql(f'PRAGMA {name}').scalar() for name in SQLITE_PRAGMAS}
+    return stats
@@ -0,0 +1,69 @@
+import hashlib
+from functools import wraps
+from inspect import iscoroutinefunction
+from flask import g, request, current_app
+from werkzeug.http import is_resource_modified
+
+VALIDATOR_HEADERS = ('ETag', 'Last-Modified')
+
+def make_etag(*parts):
+    """ETag value built from the values a representation is derived from"""
+    digest = hashlib.sha1('|'.join('' if part is None else str(part) for part in parts).encode('utf-8'))
+    return digest.hexdigest()
+
+def latest(*values):
+    """Most recent of several timestamps, ignoring missing ones"""
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
+
+def last_modified(*values):
+    """Set the Last-Modified of the response being built by a @conditional view"""
+    g.last_modified = latest(g.get('last_modified'), *values)
+
+def not_modified(etag=None, last_modified=None, weak=False):
+    """304 response if the request's validators still match, otherwise None.
+
+    If-None-Match is compared weakly, so W/ tags sent back by clients match too.
+    """
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        return with_validators(current_app.response_class(status=304), etag, last_modified, weak)
+    return None
+
+def with_validators(response, etag=None, last_modified=None, weak=False):
+    """Set the validators; weak ETags are for bodies with parts the ETag does not cover"""
+    if etag:
+        response.set_etag(etag, weak=weak)
+    if last_modified:
+        response.last_modified = last_modified
+    return response
+
+def conditional(view):
+    """Decorator adding a body ETag and Last-Modified to 200 responses and answering 304.
+
+    The ETag hashes the serialized body, so it saves bandwidth rather than work;
+    views that can tell they are unchanged before serializing use not_modified().
+    Works on async views too (ASGI mode).
+    """
+    def finish(rv):
+        response = current_app.make_response(rv)
+        if response.status_code != 200 or response.direct_passthrough:
+            return response
+
+        if 'ETag' not in response.headers:
+            response.add_etag()
+        if g.last_modified and 'Last-Modified' not in response.headers:
+            response.last_modified = g.last_modified
+        return response.make_conditional(request)
+
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            g.last_modified = None
+            return finish(await view(*args, **kwargs))
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.last_modified = None
+        return finish(view(*args, **kwargs))
+    return wrapper
@@ -0,0 +1,78 @@
+import dataclasses
+import decimal
+import os
+import uuid
+from datetime import date, time
+from flask.json.provider import DefaultJSONProvider
+
+# orjson is an optional dependency: the app falls back to the stdlib encoder
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _default(o):
+    """Types json and orjson don't encode. Dates and times come out in ISO 8601,
+    exactly like the .isoformat() strings of to_dict(), so row tuples can be
+    serialized with their datetimes as they are."""
+    if isinstance(o, (date, time)):
+        return o.isoformat()
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if dataclasses.is_dataclass(o):
+        return dataclasses.asdict(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """Flask's json-module provider, with ISO 8601 instead of HTTP dates"""
+    default = staticmethod(_default)
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Encode responses with orjson, straight to bytes.
+
+    Same output as StdlibJSONProvider up to whitespace, except that non-ASCII
+    text is written as UTF-8 rather than \\u escapes. Calls passing json-module
+    arguments (indent, cls, ...) still go through the stdlib encoder.
+    """
+    default = staticmethod(_default)
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.encode(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def encode(self, obj, indent=False):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.encode(obj, indent) + b'\n', mimetype=self.mimetype)
+
+JSON_PROVIDERS = {
+    'json': StdlibJSONProvider,
+    'orjson': OrjsonProvider,
+}
+
+def init_json(app):
+    """Install the JSON_PROVIDER named in the config or environment: orjson when it is installed, else json"""
+    name = app.config.setdefault('JSON_PROVIDER', os.environ.get('JSON_PROVIDER')
+                                 or ('orjson' if orjson is not None else 'json'))
+    if name not in JSON_PROVIDERS:
+        raise ValueError(f'Unknown JSON_PROVIDER {name}; expected one of {", ".join(JSON_PROVIDERS)}')
+    if name == 'orjson' and orjson is None:
+        raise ValueError('JSON_PROVIDER is orjson but orjson is not installed')
+    app.json = JSON_PROVIDERS[name](app)
+    return app.json
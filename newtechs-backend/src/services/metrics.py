@@ -0,0 +1,260 @@
+import hmac
+import logging
+import os
+import reprlib
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from datetime import datetime
+from functools import wraps
+from flask import current_app, g, has_app_context, jsonify, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the request duration histogram
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Set by reverse proxies, which connect from loopback on behalf of remote clients
+PROXY_HEADERS = ('X-Forwarded-For', 'X-Real-IP', 'Forwarded')
+LIBRARY_DIRS = tuple({sys.base_prefix, sys.prefix, os.path.dirname(os.path.dirname(os.__file__))})
+
+# Bounded repr of statement parameters: an executemany batch can hold thousands of rows
+_parameters_repr = reprlib.Repr()
+_parameters_repr.maxlist = 3
+_parameters_repr.maxtuple = 20
+_parameters_repr.maxdict = 10
+_parameters_repr.maxstring = _parameters_repr.maxother = 60
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _frame_location(frame):
+    path = os.path.relpath(frame.filename, SRC_DIR) if frame.filename.startswith(SRC_DIR) else frame.filename
+    return f'{path}:{frame.lineno} in {frame.name}'
+
+def query_origin(limit=3):
+    """Innermost application frames (not this module, the stdlib or installed packages) behind the current query"""
+    frames = [frame for frame in traceback.extract_stack() if frame.filename != __file__ and
+              (frame.filename.startswith(SRC_DIR) or not frame.filename.startswith(LIBRARY_DIRS))]
+    return ' <- '.join(_frame_location(frame) for frame in reversed(frames[-limit:])) or 'unknown'
+
+class RequestMetrics:
+    """Per-endpoint request timings: wall time, SQL statements and SQL time, response size.
+
+    SQL is timed with cursor events on every engine, so it covers the primary,
+    the read binds and async_db alike. Each response gets a Server-Timing
+    header; the totals are exported in Prometheus format by /api/metrics.
+    Statements slower than SLOW_QUERY_MS are logged with the application frames
+    that issued them; their parameters hold emails and IP addresses, so they
+    are only kept with SLOW_QUERY_LOG_PARAMETERS on. With QUERY_BUDGET_CHECK on, a
+    request running more statements than its budget (QUERY_BUDGET, or a
+    per-route @query_budget) is flagged: usually an N+1 query in a loop.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.server_timing = True
+        self.slow_query_seconds = 0.1
+        self.log_parameters = False
+        self.budget_check = False
+        self.default_budget = 10
+        self.budgets = {}
+        self._endpoints = {}
+        self._slow_queries = deque(maxlen=100)
+        self._stats = {'slow_queries': 0, 'budget_exceeded': 0}
+        self._lock = threading.Lock()
+        self._listening = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.setdefault('METRICS_ENABLED', True)
+        self.server_timing = app.config.setdefault('METRICS_SERVER_TIMING', True)
+        self.slow_query_seconds = app.config.setdefault('SLOW_QUERY_MS', 100) / 1000.0
+        self._slow_queries = deque(self._slow_queries, maxlen=app.config.setdefault('SLOW_QUERY_LOG_SIZE', 100))
+        self.log_parameters = app.config.setdefault('SLOW_QUERY_LOG_PARAMETERS', False)
+        app.config.setdefault('METRICS_TOKEN', os.environ.get('METRICS_TOKEN'))  # See internal_only
+        self.budget_check = app.config.setdefault('QUERY_BUDGET_CHECK', False)
+        self.default_budget = app.config.setdefault('QUERY_BUDGET', 10)  # Statements per request
+        self.budgets = app.config.setdefault('QUERY_BUDGETS', {})  # endpoint -> budget
+        app.extensions['request_metrics'] = self
+        if self.enabled:
+            app.before_request(self._start_request)
+            app.after_request(self._finish_request)
+            if not self._listening:
+                event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+                event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+                self._listening = True
+
+    def _start_request(self):
+        g.request_metrics = {'started': time.perf_counter(), 'queries': 0, 'sql_seconds': 0.0,
+                             'statements': Counter() if self.budget_check else None}
+
+    def _current(self):
+        return g.get('request_metrics') if has_app_context() else None
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_metrics_started', None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        current = self._current()
+        if current is not None:
+            current['queries'] += 1
+            current['sql_seconds'] += elapsed
+            if current['statements'] is not None:
+                current['statements'][statement] += 1
+        if elapsed >= self.slow_query_seconds:
+            self._record_slow_query(statement, parameters, elapsed, current is not None)
+
+    def _record_slow_query(self, statement, parameters, elapsed, in_request):
+        entry = {
+            'statement': ' '.join(statement.split()),
+            'parameters': _parameters_repr.repr(parameters) if self.log_parameters else '<redacted>',
+            'duration_ms': round(elapsed * 1000, 2),
+            'endpoint': (request.endpoint or 'unmatched') if in_request else 'background',
+            'origin': query_origin(),
+            'at': datetime.utcnow().isoformat()
+        }
+        with self._lock:
+            self._slow_queries.append(entry)
+            self._stats['slow_queries'] += 1
+        logger.warning('Slow query (%.1f ms) in %s from %s: %s %s', entry['duration_ms'], entry['endpoint'],
+                       entry['origin'], entry['statement'][:500], entry['parameters'])
+
+    def _finish_request(self, response):
+        current = g.pop('request_metrics', None)
+        if current is None:
+            return response
+        elapsed = time.perf_counter() - current['started']
+        endpoint = request.endpoint or 'unmatched'
+        size = response.content_length
+        if size is None and not response.direct_passthrough and not response.is_streamed:
+            size = response.calculate_content_length()
+
+        budget = g.get('query_budget') or self.budgets.get(endpoint) or self.default_budget
+        over_budget = self.budget_check and budget and current['queries'] > budget
+        if over_budget:
+            statement, repeats = current['statements'].most_common(1)[0]
+            logger.warning('%s ran %d SQL statements (budget %d); most repeated (%dx): %s',
+                           endpoint, current['queries'], budget, repeats, ' '.join(statement.split())[:500])
+            response.headers['X-Query-Budget-Exceeded'] = f"{current['queries']}/{budget}"
+
+        with self._lock:
+            totals = self._endpoints.get(endpoint)
+            if totals is None:
+                totals = self._endpoints[endpoint] = {
+                    'requests': 0, 'seconds': 0.0, 'queries': 0, 'sql_seconds': 0.0, 'response_bytes': 0,
+                    'over_budget': 0, 'buckets': [0] * len(DURATION_BUCKETS)
+                }
+            totals['requests'] += 1
+            totals['seconds'] += elapsed
+            totals['queries'] += current['queries']
+            totals['sql_seconds'] += current['sql_seconds']
+            totals['response_bytes'] += size or 0
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if elapsed <= bound:
+                    totals['buckets'][i] += 1
+            if over_budget:
+                totals['over_budget'] += 1
+                self._stats['budget_exceeded'] += 1
+
+        if self.server_timing:
+            response.headers['Server-Timing'] = (
+                f"db;dur={current['sql_seconds'] * 1000:.1f};desc=\"{current['queries']} queries\", "
+                f"app;dur={elapsed * 1000:.1f}"
+            )
+        return response
+
+    def slow_queries(self):
+        """Most recent slow queries, newest first"""
+        with self._lock:
+            return list(reversed(self._slow_queries))
+
+    def stats(self):
+        with self._lock:
+            endpoints = {endpoint: {key: value for key, value in totals.items() if key != 'buckets'}
+                         for endpoint, totals in self._endpoints.items()}
+            return dict(self._stats, endpoints=endpoints)
+
+    def prometheus(self):
+        """All endpoint totals in the Prometheus text exposition format"""
+        with self._lock:
+            endpoints = {endpoint: dict(totals, buckets=list(totals['buckets']))
+                         for endpoint, totals in sorted(self._endpoints.items())}
+            stats = dict(self._stats)
+
+        lines = [
+            '# HELP newtechs_request_duration_seconds Wall time of requests, per endpoint.',
+            '# TYPE newtechs_request_duration_seconds histogram',
+        ]
+        for endpoint, totals in endpoints.items():
+            label = f'endpoint="{_label(endpoint)}"'
+            for bound, count in zip(DURATION_BUCKETS, totals['buckets']):
+                lines.append(f'newtechs_request_duration_seconds_bucket{{{label},le="{bound}"}} {count}')
+            lines.append(f'newtechs_request_duration_seconds_bucket{{{label},le="+Inf"}} {totals["requests"]}')
+            lines.append(f'newtechs_request_duration_seconds_sum{{{label}}} {totals["seconds"]:.6f}')
+            lines.append(f'newtechs_request_duration_seconds_count{{{label}}} {totals["requests"]}')
+
+        counters = [
+            ('newtechs_sql_queries_total', 'SQL statements run by requests, per endpoint.', 'queries', 'd'),
+            ('newtechs_sql_duration_seconds_total', 'Time spent in SQL by requests, per endpoint.', 'sql_seconds', '.6f'),
+            ('newtechs_response_bytes_total', 'Response body bytes, per endpoint.', 'response_bytes', 'd'),
+            ('newtechs_query_budget_exceeded_total', 'Requests over their SQL statement budget, per endpoint.',
+             'over_budget', 'd'),
+        ]
+        for name, help_text, key, number_format in counters:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            for endpoint, totals in endpoints.items():
+                lines.append(f'{name}{{endpoint="{_label(endpoint)}"}} {totals[key]:{number_format}}')
+
+        lines.append('# HELP newtechs_slow_queries_total SQL statements slower than SLOW_QUERY_MS.')
+        lines.append('# TYPE newtechs_slow_queries_total counter')
+        lines.append(f'newtechs_slow_queries_total {stats["slow_queries"]}')
+        return '\n'.join(lines) + '\n'
+
+def query_budget(limit):
+    """Budget of SQL statements for the view's requests, checked when QUERY_BUDGET_CHECK is on"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            g.query_budget = limit
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def internal_only(view):
+    """Restrict an operational endpoint to monitoring clients.
+
+    With METRICS_TOKEN set the request needs `Authorization: Bearer <token>`.
+    Without one only the development profile answers, and only loopback
+    clients that didn't come through a proxy: behind a reverse proxy every
+    request arrives from loopback, carrying X-Forwarded-For or Forwarded.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = current_app.config.get('METRICS_TOKEN')
+        if token:
+            scheme, _, given = request.headers.get('Authorization', '').partition(' ')
+            allowed = scheme.lower() == 'bearer' and hmac.compare_digest(given.encode(), token.encode())
+        else:
+            allowed = (
+                current_app.config.get('DATABASE_PROFILE', 'development') == 'development'
+                and request.remote_addr in ('127.0.0.1', '::1')
+                and not any(header in request.headers for header in PROXY_HEADERS)
+            )
+        if not allowed:
+            return jsonify({'success': False, 'error': 'Forbidden'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+request_metrics = RequestMetrics()
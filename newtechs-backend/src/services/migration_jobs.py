@@ -0,0 +1,117 @@
+import json
+import threading
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import exists, or_, select
+from src.models.user import db
+from src.models.blog import Blog
+from src.models.migration import MigrationJob, MigrationJobBlog
+from src.services.blogger_import import BloggerImporter, DEFAULT_BATCH_SIZE, import_feeds
+from src.services.cache import response_cache, blog_tag
+
+# Jobs with a worker thread in this process
+_active_jobs = set()
+_active_lock = threading.Lock()
+
+# A running job whose progress hasn't moved for this long lost its worker (process killed) and may be resumed
+STALE_JOB_AFTER = timedelta(minutes=30)
+
+def create_job(feeds, batch_size=DEFAULT_BATCH_SIZE, workers=1):
+    """Persist a new job for a list of (blog, feed_path, source) feeds"""
+    job = MigrationJob(
+        id=str(uuid.uuid4()),
+        status='pending',
+        options=json.dumps({'batch_size': batch_size, 'workers': workers})
+    )
+    for blog, feed_path, source in feeds:
+        job.blogs.append(MigrationJobBlog(source=source, blog_id=blog.id, feed_path=feed_path))
+
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+def is_active(job_id):
+    with _active_lock:
+        return job_id in _active_jobs
+
+def claim_job(job_id):
+    """Mark a job running unless a worker in any process already runs it; returns whether this call did.
+
+    A single conditional UPDATE decides, so two resume requests can't both
+    start the job.
+    """
+    jobs = MigrationJob.__table__
+    blogs = MigrationJobBlog.__table__
+    now = datetime.utcnow()
+    stale_before = now - STALE_JOB_AFTER
+    abandoned = (jobs.c.updated_at < stale_before) & ~exists(
+        select(blogs.c.id).where(blogs.c.job_id == jobs.c.id, blogs.c.updated_at >= stale_before)
+    )
+    claimed = db.session.execute(
+        jobs.update()
+        .where(jobs.c.id == job_id, jobs.c.status != 'completed', or_(jobs.c.status != 'running', abandoned))
+        .values(status='running', updated_at=now)
+    )
+    db.session.commit()
+    return claimed.rowcount == 1
+
+def start_job(app, job_id):
+    """Claim a job and run it in a background thread; returns False if it is already running"""
+    if not claim_job(job_id):
+        return False
+    with _active_lock:
+        _active_jobs.add(job_id)
+
+    thread = threading.Thread(target=_run_in_thread, args=(app, job_id), name=f'migration-{job_id}', daemon=True)
+    thread.start()
+    return True
+
+def run_job(job_id):
+    """Import every blog of a job that hasn't completed yet, resuming from the last committed batch.
+
+    The caller claims the job first (claim_job, or start_job for a thread).
+    """
+    job = db.session.get(MigrationJob, job_id)
+    options = json.loads(job.options) if job.options else {}
+
+    job.status = 'running'
+    job.error = None
+    job.attempts = (job.attempts or 0) + 1
+    job.started_at = job.started_at or datetime.utcnow()
+    job.finished_at = None
+    db.session.commit()
+
+    importer = BloggerImporter(batch_size=options.get('batch_size', DEFAULT_BATCH_SIZE))
+    try:
+        importer.preload()
+        pending = [blog for blog in job.blogs if blog.status != 'completed']
+        blogs = {blog.id: blog for blog in Blog.query.filter(Blog.id.in_([p.blog_id for p in pending])).all()}
+        feeds = [(blogs[p.blog_id], p.feed_path, p.source) for p in pending]
+
+        import_feeds(importer, feeds, workers=options.get('workers', 1),
+                     progress={p.source: p for p in pending})
+
+        failed = [blog.source for blog in job.blogs if blog.status != 'completed']
+        job.status = 'failed' if failed else 'completed'
+        job.error = f"Blogs not completed: {', '.join(failed)}" if failed else None
+    except Exception as e:
+        db.session.rollback()
+        job.status = 'failed'
+        job.error = str(e)
+
+    job.results = json.dumps(importer.summary())
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+
+    # Imported posts change blog listings, post counts and categories
+    slugs = [slug for (slug,) in db.session.query(Blog.slug).filter(Blog.id.in_([b.blog_id for b in job.blogs]))]
+    response_cache.invalidate('blogs', 'posts', *[blog_tag(slug) for slug in slugs])
+    return job
+
+def _run_in_thread(app, job_id):
+    try:
+        with app.app_context():
+            run_job(job_id)
+    finally:
+        with _active_lock:
+            _active_jobs.discard(job_id)
@@ -0,0 +1,89 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from flask import current_app, request
+from sqlalchemy import and_, tuple_
+from src.models.blog import Post
+
+DEFAULT_MAX_PER_PAGE = 100
+
+def page_size(default=10):
+    """per_page from the query string, clamped to 1..MAX_PER_PAGE"""
+    per_page = request.args.get('per_page', default, type=int) or default
+    return max(1, min(per_page, current_app.config.get('MAX_PER_PAGE', DEFAULT_MAX_PER_PAGE)))
+
+def cursor_requested():
+    """Cursor mode is opt-in: any `cursor` argument, empty for the first page"""
+    return 'cursor' in request.args
+
+def total_requested():
+    return request.args.get('include_total', 'false').lower() in ('1', 'true', 'yes')
+
+def encode_cursor(timestamp, row_id):
+    """Opaque cursor pointing just after the row (timestamp, row_id) in DESC order"""
+    raw = json.dumps([timestamp.isoformat() if timestamp else None, row_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """(timestamp, row_id) from a cursor, None for the first page; ValueError if malformed"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        timestamp, row_id = json.loads(raw)
+        if isinstance(row_id, bool) or not isinstance(row_id, (int, str)):
+            raise ValueError(row_id)
+        return (datetime.fromisoformat(timestamp) if timestamp else None), row_id
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+
+def after_position(position, timestamp_column=Post.published_at, id_column=Post.id):
+    """Filter for rows after `position` in (timestamp DESC, id DESC) order.
+
+    NULL timestamps sort last. After a dated position this only matches dated
+    rows, as a row-value comparison the index can range-seek; null_tail()
+    picks up the undated rows once those run out.
+    """
+    timestamp, row_id = position
+    if timestamp is None:
+        return and_(timestamp_column.is_(None), id_column < row_id)
+    return tuple_(timestamp_column, id_column) < (timestamp, row_id)
+
+def null_tail(position, rows, per_page, timestamp_column=Post.published_at):
+    """Filter for the undated rows that follow a short page of dated rows, None when not needed"""
+    if position is None or position[0] is None or len(rows) > per_page:
+        return None
+    return timestamp_column.is_(None)
+
+def keyset_page(query, per_page, cursor, include_total=False, timestamp_column=Post.published_at, id_column=Post.id):
+    """Fetch one page of a query by cursor instead of OFFSET, newest first.
+
+    Returns (rows, pagination). The total is only counted when asked for, since
+    that COUNT(*) is the other full scan .paginate() runs on every page.
+    """
+    position = decode_cursor(cursor)
+    total = query.order_by(None).count() if include_total else None
+
+    ordered = query.order_by(timestamp_column.desc(), id_column.desc())
+    if position is not None:
+        ordered = ordered.filter(after_position(position, timestamp_column, id_column))
+    rows = ordered.limit(per_page + 1).all()
+
+    tail = null_tail(position, rows, per_page, timestamp_column)
+    if tail is not None:
+        rows += query.filter(tail).order_by(id_column.desc()).limit(per_page + 1 - len(rows)).all()
+    return rows[:per_page], cursor_pagination(rows, per_page, total, timestamp_column.key)
+
+def cursor_pagination(rows, per_page, total=None, timestamp_attr='published_at'):
+    """Pagination block for a page fetched with one extra row to detect a next page"""
+    has_next = len(rows) > per_page
+    last = rows[per_page - 1] if has_next else None
+    pagination = {
+        'per_page': per_page,
+        'has_next': has_next,
+        'next_cursor': encode_cursor(getattr(last, timestamp_attr), last.id) if has_next else None
+    }
+    if total is not None:
+        pagination['total'] = total
+    return pagination
@@ -0,0 +1,144 @@
+import json
+from sqlalchemy import and_, or_, select, text
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+from src.models.blog import Post
+
+# Attempts at a write whose slugs another writer may take first
+SLUG_RETRIES = 3
+# How the unique (blog_id, slug) index shows up in SQLite / PostgreSQL and MySQL errors
+SLUG_CONFLICT_MARKERS = ('posts.blog_id, posts.slug', 'uq_posts_blog_slug')
+
+# OR-ed prefix ranges per query on backends without json_each
+PREFIX_CHUNK = 200
+
+# Per base: whether the slug itself is taken and the highest numeric suffix in
+# use, aggregated inside one range scan of uq_posts_blog_slug per base rather
+# than fetching the whole family. CROSS JOIN keeps the bases as the outer
+# loop; left to itself the planner rescans them for every post.
+SQLITE_SUFFIX_QUERY = text(
+    "SELECT base.value, max(posts.slug = base.value), "
+    "max(CASE WHEN posts.slug > base.value || '-' AND substr(posts.slug, length(base.value) + 2) NOT GLOB '*[^0-9]*' "
+    "THEN CAST(substr(posts.slug, length(base.value) + 2) AS INTEGER) END) "
+    "FROM json_each(:bases) AS base CROSS JOIN posts "
+    "WHERE posts.blog_id = :blog_id AND posts.slug >= base.value AND posts.slug < base.value || '.' "
+    "GROUP BY base.value"
+)
+
+def slug_column(dialect):
+    """Post.slug for range comparisons: PostgreSQL's locale collations ignore punctuation, so it compares in "C" """
+    if dialect.name == 'postgresql':
+        return Post.slug.collate('C')
+    return Post.slug
+
+def slug_family(column, base):
+    """`base` itself or base-<anything>: one index range on (blog_id, slug) per base.
+
+    Slugs only hold word characters and '-', and '-' sorts right before '.',
+    so base <= slug < base. is exactly that family.
+    """
+    return and_(column >= base, column < base + '.')
+
+def numeric_suffix(slug, base):
+    """n for a slug base-<n>, else None"""
+    suffix = slug[len(base) + 1:]
+    if slug.startswith(base + '-') and suffix.isascii() and suffix.isdigit():
+        return int(suffix)
+    return None
+
+def slug_suffixes(blog_id, bases, connection=None):
+    """{base: (taken, highest numeric suffix or None)} for the bases with slugs in the blog.
+
+    Reads through db.session, or `connection` during schema migrations.
+    """
+    bases = list(bases)
+    executor = db.session if connection is None else connection
+    dialect = db.engine.dialect if connection is None else connection.dialect
+    if dialect.name == 'sqlite':
+        return {base: (bool(taken), highest) for base, taken, highest in executor.execute(
+            SQLITE_SUFFIX_QUERY, {'bases': json.dumps(bases), 'blog_id': blog_id}
+        )}
+
+    column = slug_column(dialect)
+    found = {}
+    for start in range(0, len(bases), PREFIX_CHUNK):
+        chunk = bases[start:start + PREFIX_CHUNK]
+        slugs = executor.scalars(
+            select(Post.slug).where(Post.blog_id == blog_id, or_(*[slug_family(column, base) for base in chunk]))
+        ).all()
+        for base in chunk:
+            suffixes = [suffix for suffix in (numeric_suffix(slug, base) for slug in slugs) if suffix is not None]
+            if base in slugs or suffixes:
+                found[base] = (base in slugs, max(suffixes, default=None))
+    return found
+
+def is_slug_conflict(error):
+    """Whether an IntegrityError comes from the unique (blog_id, slug) index"""
+    message = str(getattr(error, 'orig', None) or error)
+    return any(marker in message for marker in SLUG_CONFLICT_MARKERS)
+
+def with_slug_retry(write, reset=None, retries=SLUG_RETRIES):
+    """Run write(), which allocates slugs and commits, and return its result.
+
+    The allocators only see committed slugs, so a concurrent writer can take
+    one between allocation and commit; the unique index then rejects the
+    write, which is rolled back and run again (after reset(), if given) with
+    freshly loaded slugs. Other errors, and the last conflict, propagate.
+    """
+    for attempt in range(retries):
+        try:
+            return write()
+        except IntegrityError as e:
+            db.session.rollback()
+            if attempt == retries - 1 or not is_slug_conflict(e):
+                raise
+            if reset is not None:
+                reset()
+
+class SlugAllocator:
+    """Unique post slugs for one blog, allocating many at a time.
+
+    load() asks the database, in one query for any number of bases (a few on
+    backends other than SQLite), whether each base is taken and for its
+    highest numeric suffix; allocate() then hands out base,
+    base-<highest + 1>, ... from memory, so a title shared by thousands of
+    posts costs no more than a new one. The unique (blog_id, slug) index
+    catches slugs taken by other writers in the meantime; see with_slug_retry.
+    """
+
+    def __init__(self, blog_id, connection=None):
+        self.blog_id = blog_id
+        self.connection = connection
+        self.taken = set()  # Bases found taken, and every slug allocated
+        self._next_suffix = {}
+
+    def load(self, bases):
+        bases = sorted({base for base in bases if base not in self._next_suffix})
+        if not bases:
+            return
+        found = slug_suffixes(self.blog_id, bases, self.connection)
+        for base in bases:
+            taken, highest = found.get(base, (False, None))
+            if taken:
+                self.taken.add(base)
+            self._next_suffix[base] = (highest or 0) + 1
+
+    def allocate(self, base):
+        if base not in self._next_suffix:
+            self.load([base])
+        candidate = base
+        if candidate in self.taken:
+            suffix = self._next_suffix[base]
+            candidate = f"{base}-{suffix}"
+            while candidate in self.taken:
+                suffix += 1
+                candidate = f"{base}-{suffix}"
+        self.taken.add(candidate)
+        self._note_suffix(candidate)
+        return candidate
+
+    def _note_suffix(self, slug):
+        # An allocated base-<n> (or a base that looks like one) moves that base's next suffix past n
+        base, _, suffix = slug.rpartition('-')
+        if base in self._next_suffix and suffix.isascii() and suffix.isdigit():
+            self._next_suffix[base] = max(self._next_suffix[base], int(suffix) + 1)
@@ -0,0 +1,249 @@
+import atexit
+import os
+import socket
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam, column, func, select, text
+from src.models.user import db
+from src.models.blog import Post
+from src.models.trending import PostActivity, TrendingPost, claim_lease, hour_bucket
+from src.services.cache import response_cache
+
+# timeframe -> (window in hours, score half-life in hours); 'all' ranks lifetime totals
+WINDOWS = {
+    'day': (24, 6),
+    'week': (24 * 7, 24),
+    'month': (24 * 30, 72),
+}
+TIMEFRAMES = tuple(WINDOWS) + ('all',)
+LEASE_NAME = 'trending'
+
+class TrendingEngine:
+    """Ranks posts from hourly activity buckets and materializes the result.
+
+    Each bucket contributes (views + comment_weight * comments), halved every
+    half-life hours of age, so recent activity outweighs old totals. A window
+    without any activity (e.g. a database imported without history) falls back
+    to the lifetime ranking. refresh() rewrites the trending_posts table,
+    keeping the top keep_per_blog posts of every blog per timeframe; the API
+    then reads it in a single query. `flask init-db` computes the first ranking,
+    requests only ever refresh in the background.
+
+    Every process runs the scheduler thread, but a refresh first claims the
+    'trending' lease in refresh_leases: the process holding it keeps renewing
+    it, and another one takes over only once it has lapsed for two intervals.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.refresh_interval = 300
+        self.keep_per_blog = 50
+        self.comment_weight = 5
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._stats = {'refreshes': 0, 'failed_refreshes': 0, 'last_refresh_at': None, 'last_refresh_seconds': None,
+                       'ranked_posts': {}, 'lifetime_fallbacks': []}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.refresh_interval = app.config.setdefault('TRENDING_REFRESH_INTERVAL', 300)
+        self.keep_per_blog = app.config.setdefault('TRENDING_KEEP_PER_BLOG', 50)
+        self.comment_weight = app.config.setdefault('TRENDING_COMMENT_WEIGHT', 5)
+        app.extensions['trending'] = self
+        atexit.register(self.shutdown)
+
+    def ensure_fresh(self):
+        """Called on reads: start a background refresh if never computed or stale.
+
+        Returns False while no ranking has been materialized yet; the caller
+        then ranks by lifetime_score() itself.
+        """
+        self._ensure_thread()
+        last = self._stats['last_refresh_at']
+        if last is None:
+            computed_at = db.session.query(func.max(TrendingPost.computed_at)).scalar()
+            if computed_at is None:
+                self._refresh_in_background()
+                return False
+            last = self._stats['last_refresh_at'] = computed_at
+        if self.refresh_interval and datetime.utcnow() - last > timedelta(seconds=self.refresh_interval * 2):
+            # The scheduler isn't keeping up (e.g. no long-lived process); refresh off the request path
+            self._refresh_in_background()
+        return True
+
+    def lifetime_score(self):
+        """Score of the 'all' timeframe as a SQL expression over posts"""
+        return func.coalesce(Post.views, 0) + self.comment_weight * Post.comment_count
+
+    def refresh(self, now=None):
+        """Recompute every timeframe and swap the materialized rankings in one transaction"""
+        with self._refresh_lock:
+            started = time.perf_counter()
+            now = now or datetime.utcnow()
+            try:
+                with db.engine.begin() as conn:
+                    lifetime = self._score_lifetime(conn)
+                    rankings, fallbacks = {}, []
+                    for timeframe, window in WINDOWS.items():
+                        rankings[timeframe] = self._score_window(conn, now, *window)
+                        if not rankings[timeframe]:
+                            rankings[timeframe] = lifetime
+                            fallbacks.append(timeframe)
+                    rankings['all'] = lifetime
+
+                    rows = []
+                    for timeframe, scored in rankings.items():
+                        rows.extend(self._top_rows(timeframe, scored, now))
+
+                    conn.execute(TrendingPost.__table__.delete())
+                    if rows:
+                        conn.execute(TrendingPost.__table__.insert(), rows)
+                    # Buckets older than the longest window no longer affect any score
+                    oldest = hour_bucket(now) - timedelta(hours=max(hours for hours, _ in WINDOWS.values()))
+                    conn.execute(PostActivity.__table__.delete().where(PostActivity.bucket < oldest))
+            except Exception:
+                self._stats['failed_refreshes'] += 1
+                raise
+
+            self._stats['refreshes'] += 1
+            self._stats['last_refresh_at'] = now
+            self._stats['last_refresh_seconds'] = round(time.perf_counter() - started, 3)
+            self._stats['ranked_posts'] = {timeframe: len(scored) for timeframe, scored in rankings.items()}
+            self._stats['lifetime_fallbacks'] = fallbacks
+            response_cache.invalidate('trending')
+            return self._stats['ranked_posts']
+
+    def stats(self):
+        last = self._stats['last_refresh_at']
+        return dict(
+            self._stats,
+            last_refresh_at=last.isoformat() if last else None,
+            refresh_interval=self.refresh_interval,
+            keep_per_blog=self.keep_per_blog,
+            comment_weight=self.comment_weight
+        )
+
+    def shutdown(self):
+        self._stop.set()
+
+    def _score_window(self, conn, now, window_hours, half_life_hours):
+        """{post_id: (blog_id, score, views, comments)} of each blog's top posts inside the window.
+
+        The buckets are summed per post in SQL; each hour's decay factor comes
+        from a VALUES list joined on the bucket, so no bucket row reaches Python.
+        """
+        latest = hour_bucket(now)
+        buckets = [latest - timedelta(hours=age) for age in range(window_hours)]
+        decay = self._decay_factors(buckets, now, half_life_hours)
+        activity = PostActivity.views + self.comment_weight * PostActivity.comments
+        scored = (
+            select(PostActivity.post_id, Post.blog_id, func.sum(activity * decay.c.factor).label('score'),
+                   func.sum(PostActivity.views).label('views'), func.sum(PostActivity.comments).label('comments'))
+            .join(decay, decay.c.bucket == PostActivity.bucket)
+            .join(Post, Post.id == PostActivity.post_id)
+            .where(PostActivity.bucket >= buckets[-1], Post.status == 'published')
+            .group_by(PostActivity.post_id, Post.blog_id)
+            .subquery()
+        )
+        rank = func.row_number().over(partition_by=scored.c.blog_id, order_by=scored.c.score.desc()).label('rank')
+        ranked = select(scored, rank).where(scored.c.score > 0).subquery()
+        rows = conn.execute(
+            select(ranked.c.post_id, ranked.c.blog_id, ranked.c.score, ranked.c.views, ranked.c.comments)
+            .where(ranked.c.rank <= self.keep_per_blog)
+        ).all()
+        return {post_id: (blog_id, float(score), views, comments) for post_id, blog_id, score, views, comments in rows}
+
+    def _decay_factors(self, buckets, now, half_life_hours):
+        # SQLite can't name a VALUES list's columns in its alias; both SQLite and
+        # PostgreSQL call them column1, column2 and a select renames them
+        rows = ', '.join(f'(:decay_bucket_{i}, :decay_factor_{i})' for i in range(len(buckets)))
+        params = []
+        for i, bucket in enumerate(buckets):
+            age_hours = max(0.0, (now - bucket).total_seconds() / 3600)
+            params.append(bindparam(f'decay_bucket_{i}', bucket, type_=db.DateTime))
+            params.append(bindparam(f'decay_factor_{i}', 0.5 ** (age_hours / half_life_hours), type_=db.Float))
+        return (
+            text(f'SELECT column1 AS bucket, column2 AS factor FROM (VALUES {rows}) AS decay_values')
+            .bindparams(*params)
+            .columns(column('bucket', db.DateTime), column('factor', db.Float))
+            .subquery('decay')
+        )
+
+    def _score_lifetime(self, conn):
+        score = self.lifetime_score()
+        rank = func.row_number().over(partition_by=Post.blog_id, order_by=score.desc()).label('rank')
+        ranked = (
+            select(Post.id, Post.blog_id, score.label('score'), Post.views, Post.comment_count, rank)
+            .where(Post.status == 'published')
+            .subquery()
+        )
+        rows = conn.execute(
+            select(ranked.c.id, ranked.c.blog_id, ranked.c.score, ranked.c.views, ranked.c.comment_count)
+            .where(ranked.c.rank <= self.keep_per_blog, ranked.c.score > 0)
+        ).all()
+        return {post_id: (blog_id, float(score), views or 0, comments) for post_id, blog_id, score, views, comments in rows}
+
+    def _top_rows(self, timeframe, scored, now):
+        by_blog = defaultdict(list)
+        for post_id, (blog_id, score, views, comments) in scored.items():
+            by_blog[blog_id].append((score, post_id, views, comments))
+
+        top_score = max((entry[1] for entry in scored.values()), default=0) or 1
+        rows = []
+        for blog_id, entries in by_blog.items():
+            entries.sort(reverse=True)
+            for score, post_id, views, comments in entries[:self.keep_per_blog]:
+                rows.append({
+                    'timeframe': timeframe,
+                    'post_id': post_id,
+                    'blog_id': blog_id,
+                    'score': score,
+                    'normalized_score': round(100 * score / top_score),
+                    'views': views,
+                    'comments': comments,
+                    'computed_at': now
+                })
+        return rows
+
+    def _refresh_in_background(self):
+        if not self._refresh_lock.locked():
+            threading.Thread(target=self._refresh_in_context, name='trending-refresh', daemon=True).start()
+
+    def _refresh_in_context(self):
+        try:
+            with self.app.app_context():
+                with db.engine.begin() as conn:
+                    claimed = claim_lease(conn, LEASE_NAME, self._owner(), self._lease_seconds())
+                if claimed:
+                    self.refresh()
+        except Exception:
+            pass
+
+    def _owner(self):
+        # Read on every claim: a forked worker must not pass for its parent
+        return f'{socket.gethostname()}:{os.getpid()}'
+
+    def _lease_seconds(self):
+        interval = self.refresh_interval if self.refresh_interval and self.refresh_interval > 0 else 300
+        return interval * 2
+
+    def _ensure_thread(self):
+        # Started lazily so importing the app (CLI, serverless cold start) spawns no threads
+        if self._thread is not None or self.app is None or not self.refresh_interval or self.refresh_interval <= 0:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='trending-scheduler', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_interval):
+            self._refresh_in_context()
+
+trending = TrendingEngine()
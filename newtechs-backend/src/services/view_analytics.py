@@ -0,0 +1,229 @@
+import atexit
+import threading
+from collections import Counter
+from itertools import takewhile
+from datetime import datetime, timedelta
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from src.models.user import db
+from src.models.blog import Post
+from src.models.analytics import ViewEvent, PostViewRollup, BlogViewRollup, RollupState, upsert_counters
+
+GRANULARITIES = {
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+}
+MAX_SERIES_POINTS = 2000
+ROLLUP_NAME = 'views'
+
+def truncate(moment, granularity):
+    if granularity == 'day':
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+class ViewAnalytics:
+    """Folds the view_events log into hourly and daily rollups and compacts it.
+
+    rollup() is incremental: it reads events past the stored watermark in
+    batches and adds them to the post and blog rollup tables, moving the
+    watermark in the same transaction. Events older than the retention period
+    are deleted once rolled up; hourly rollups are kept for a limited time and
+    daily rollups indefinitely.
+
+    Each batch locks the watermark row first, so concurrent rollups (one per
+    process) run one after the other instead of counting the same events
+    twice. A batch stops at the first event written less than grace_seconds
+    ago: on PostgreSQL an id can commit after higher ones, and the watermark
+    would otherwise move past it.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.rollup_interval = 60
+        self.batch_size = 10000
+        self.event_retention_days = 30
+        self.hourly_retention_days = 90
+        self.grace_seconds = 10
+        self._lock = threading.Lock()
+        self._rollup_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._last_rollup_at = None
+        self._stats = {'rollups': 0, 'rolled_up_events': 0, 'compacted_events': 0, 'compacted_hourly_rows': 0,
+                       'failed_rollups': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.rollup_interval = app.config.setdefault('VIEW_ROLLUP_INTERVAL', 60)
+        self.batch_size = app.config.setdefault('VIEW_ROLLUP_BATCH_SIZE', 10000)
+        self.event_retention_days = app.config.setdefault('VIEW_EVENTS_RETENTION_DAYS', 30)
+        self.hourly_retention_days = app.config.setdefault('VIEW_ROLLUP_HOURLY_RETENTION_DAYS', 90)
+        self.grace_seconds = app.config.setdefault('VIEW_ROLLUP_GRACE_SECONDS', 10)
+        app.extensions['view_analytics'] = self
+        atexit.register(self.shutdown)
+
+    def ensure_fresh(self):
+        """Called on reads: start a background rollup if the last one is older than the interval.
+
+        The read itself serves the rollups as they are; responses carry the
+        watermark so clients can tell how far they go.
+        """
+        self._ensure_thread()
+        last = self._last_rollup_at
+        if last is None or (datetime.utcnow() - last).total_seconds() >= (self.rollup_interval or 0):
+            self._rollup_in_background()
+
+    def rollup(self, now=None):
+        """Roll up every event past the watermark, then compact; returns the number of events rolled up"""
+        with self._rollup_lock:
+            now = now or datetime.utcnow()
+            total = 0
+            try:
+                while True:
+                    rolled = self._rollup_batch(now)
+                    total += rolled
+                    if rolled < self.batch_size:
+                        break
+                self._compact(now)
+            except Exception:
+                self._stats['failed_rollups'] += 1
+                raise
+            self._stats['rollups'] += 1
+            self._stats['rolled_up_events'] += total
+            self._last_rollup_at = now
+            return total
+
+    def series(self, granularity, start, end, post_id=None, blog_id=None):
+        """[(bucket, views)] for every bucket in [start, end], zero-filled"""
+        step = GRANULARITIES[granularity]
+        start, end = truncate(start, granularity), truncate(end, granularity)
+
+        if post_id is not None:
+            rollup, scope = PostViewRollup, PostViewRollup.post_id == post_id
+        else:
+            rollup = BlogViewRollup
+            scope = BlogViewRollup.blog_id == blog_id if blog_id is not None else None
+
+        query = select(rollup.bucket, func.sum(rollup.views)).where(
+            rollup.granularity == granularity, rollup.bucket >= start, rollup.bucket <= end
+        )
+        if scope is not None:
+            query = query.where(scope)
+        views = dict(db.session.execute(query.group_by(rollup.bucket)).all())
+
+        points = []
+        bucket = start
+        while bucket <= end:
+            points.append((bucket, views.get(bucket, 0)))
+            bucket += step
+        return points
+
+    def watermark(self):
+        state = db.session.get(RollupState, ROLLUP_NAME)
+        return state.last_event_at if state else None
+
+    def stats(self):
+        return dict(
+            self._stats,
+            last_rollup_at=self._last_rollup_at.isoformat() if self._last_rollup_at else None,
+            rollup_interval=self.rollup_interval,
+            event_retention_days=self.event_retention_days,
+            hourly_retention_days=self.hourly_retention_days
+        )
+
+    def shutdown(self):
+        self._stop.set()
+
+    def _rollup_batch(self, now):
+        events = ViewEvent.__table__
+        state_table = RollupState.__table__
+        with db.engine.begin() as conn:
+            # Creating the row if needed takes SQLite's write lock; FOR UPDATE holds the row on PostgreSQL
+            dialect = postgresql if conn.dialect.name == 'postgresql' else sqlite
+            conn.execute(dialect.insert(state_table).values(name=ROLLUP_NAME, last_event_id=0)
+                         .on_conflict_do_nothing(index_elements=['name']))
+            state = conn.execute(
+                select(RollupState.last_event_id).where(RollupState.name == ROLLUP_NAME).with_for_update()
+            ).scalar()
+            rows = conn.execute(
+                select(events.c.id, events.c.post_id, events.c.viewed_at, events.c.views, events.c.recorded_at,
+                       Post.blog_id)
+                .outerjoin(Post, Post.id == events.c.post_id)
+                .where(events.c.id > state)
+                .order_by(events.c.id)
+                .limit(self.batch_size)
+            ).all()
+            # Stop before the first event that may still have earlier ids committing around it
+            settled_before = now - timedelta(seconds=self.grace_seconds)
+            rows = list(takewhile(lambda row: row.recorded_at is None or row.recorded_at < settled_before, rows))
+            if not rows:
+                return 0
+
+            post_views = Counter()
+            blog_views = Counter()
+            for _, post_id, viewed_at, views, _, blog_id in rows:
+                for granularity in GRANULARITIES:
+                    bucket = truncate(viewed_at, granularity)
+                    post_views[(post_id, granularity, bucket)] += views
+                    if blog_id is not None:  # Post deleted since the view
+                        blog_views[(blog_id, granularity, bucket)] += views
+
+            upsert_counters(conn, PostViewRollup.__table__, ['post_id', 'granularity', 'bucket'], [
+                {'post_id': post_id, 'granularity': granularity, 'bucket': bucket, 'views': views}
+                for (post_id, granularity, bucket), views in post_views.items()
+            ])
+            upsert_counters(conn, BlogViewRollup.__table__, ['blog_id', 'granularity', 'bucket'], [
+                {'blog_id': blog_id, 'granularity': granularity, 'bucket': bucket, 'views': views}
+                for (blog_id, granularity, bucket), views in blog_views.items()
+            ])
+
+            watermark = {'last_event_id': rows[-1].id, 'last_event_at': rows[-1].viewed_at, 'updated_at': now}
+            conn.execute(state_table.update().where(RollupState.name == ROLLUP_NAME).values(**watermark))
+            return len(rows)
+
+    def _compact(self, now):
+        with db.engine.begin() as conn:
+            watermark = conn.execute(
+                select(RollupState.last_event_id).where(RollupState.name == ROLLUP_NAME)
+            ).scalar() or 0
+            # Only events already folded into the rollups may go
+            deleted = conn.execute(ViewEvent.__table__.delete().where(
+                ViewEvent.viewed_at < now - timedelta(days=self.event_retention_days),
+                ViewEvent.id <= watermark
+            )).rowcount
+            hourly_cutoff = now - timedelta(days=self.hourly_retention_days)
+            hourly = 0
+            for rollup in (PostViewRollup, BlogViewRollup):
+                hourly += conn.execute(rollup.__table__.delete().where(
+                    rollup.granularity == 'hour', rollup.bucket < hourly_cutoff
+                )).rowcount
+        self._stats['compacted_events'] += max(deleted, 0)
+        self._stats['compacted_hourly_rows'] += max(hourly, 0)
+
+    def _rollup_in_background(self):
+        if not self._rollup_lock.locked():
+            threading.Thread(target=self._rollup_in_context, name='view-rollup-once', daemon=True).start()
+
+    def _rollup_in_context(self):
+        try:
+            with self.app.app_context():
+                self.rollup()
+        except Exception:
+            pass
+
+    def _ensure_thread(self):
+        # Started lazily so importing the app (CLI, serverless cold start) spawns no threads
+        if self._thread is not None or self.app is None or not self.rollup_interval or self.rollup_interval <= 0:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='view-rollup', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.rollup_interval):
+            self._rollup_in_context()
+
+view_analytics = ViewAnalytics()
@@ -0,0 +1,192 @@
+import atexit
+import threading
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import bindparam, func
+from src.models.user import db
+from src.models.blog import Post
+from src.models.trending import record_activity
+from src.models.analytics import ViewEvent
+
+# Longest wait between retries while flushes keep failing
+MAX_FLUSH_BACKOFF = 60.0
+
+class ViewCounter:
+    """Buffers post view increments in memory and writes them in batches.
+
+    Each flush applies every pending increment with a single executemany
+    `UPDATE posts SET views = views + n` inside one transaction, so page views
+    no longer take the SQLite write lock one by one and concurrent hits can't
+    overwrite each other's read-modify-write. The same transaction appends the
+    views, counted per post and minute, to the view_events log for time-based
+    analytics; per-minute counts keep the buffer bounded while the database
+    is unavailable.
+
+    Flushes never run on the request path: a full buffer wakes the flush
+    thread, and a failed flush keeps its views for the next attempt, which
+    backs off while failures continue.
+    Serverless invocations can't count on the flush thread or the atexit hook,
+    so with VIEW_COUNTER_FLUSH_ON_TEARDOWN (the default on the serverless
+    profile) each request writes its buffered views once it has been answered.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.flush_interval = 5.0
+        self.max_pending = 500
+        self._pending = Counter()
+        self._events = Counter()  # (post_id, minute) -> views
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._atexit_registered = False
+        self._stats = {'flushes': 0, 'flushed_views': 0, 'flushed_events': 0, 'failed_flushes': 0, 'last_flush_at': None}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.flush_interval = app.config.setdefault('VIEW_COUNTER_FLUSH_INTERVAL', 5.0)
+        self.max_pending = app.config.setdefault('VIEW_COUNTER_MAX_PENDING', 500)
+        flush_on_teardown = app.config.setdefault('VIEW_COUNTER_FLUSH_ON_TEARDOWN',
+                                                  app.config.get('DATABASE_PROFILE') == 'serverless')
+        app.extensions['view_counter'] = self
+        if flush_on_teardown:
+            app.teardown_request(self._flush_on_teardown)
+        if not self._atexit_registered:
+            atexit.register(self.shutdown)
+            self._atexit_registered = True
+
+    def increment(self, post_id, amount=1):
+        """Record a view; once the buffer reaches max_pending the flush thread is woken.
+
+        Returns whether the buffer was full.
+        """
+        minute = datetime.utcnow().replace(second=0, microsecond=0)
+        with self._lock:
+            self._pending[post_id] += amount
+            self._events[(post_id, minute)] += amount
+            pending_total = sum(self._pending.values())
+        self._ensure_thread()
+
+        full = pending_total >= self.max_pending
+        if full:
+            self._wake.set()
+        return full
+
+    def pending(self, post_id):
+        """Views recorded for a post but not yet written to the database"""
+        with self._lock:
+            return self._pending.get(post_id, 0)
+
+    def flush(self):
+        """Write all pending increments to the database, returning the number of views written"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, Counter()
+                events, self._events = self._events, Counter()
+            if not batch:
+                return 0
+
+            table = Post.__table__
+            statement = table.update().where(table.c.id == bindparam('post_id')).values(
+                views=func.coalesce(table.c.views, 0) + bindparam('increment'),
+                updated_at=table.c.updated_at  # Views don't modify the post; keep its ETag and Last-Modified
+            )
+            rows = [{'post_id': post_id, 'increment': increment} for post_id, increment in batch.items()]
+
+            try:
+                with self.app.app_context():
+                    with db.engine.begin() as conn:
+                        conn.execute(statement, rows)
+                        record_activity(conn, views=batch)
+                        recorded_at = datetime.utcnow()
+                        conn.execute(ViewEvent.__table__.insert(), [
+                            {'post_id': post_id, 'viewed_at': minute, 'views': views, 'recorded_at': recorded_at}
+                            for (post_id, minute), views in events.items()
+                        ])
+            except Exception:
+                # Put the increments back so the next flush retries them
+                with self._lock:
+                    self._pending.update(batch)
+                    self._events.update(events)
+                self._stats['failed_flushes'] += 1
+                raise
+
+            flushed = sum(batch.values())
+            self._stats['flushes'] += 1
+            self._stats['flushed_views'] += flushed
+            self._stats['flushed_events'] += len(events)
+            self._stats['last_flush_at'] = datetime.utcnow()
+            return flushed
+
+    def stats(self):
+        with self._lock:
+            pending = dict(self._pending)
+        return {
+            'pending_posts': len(pending),
+            'pending_views': sum(pending.values()),
+            'pending': {str(post_id): count for post_id, count in pending.items()},
+            'flushes': self._stats['flushes'],
+            'flushed_views': self._stats['flushed_views'],
+            'flushed_events': self._stats['flushed_events'],
+            'failed_flushes': self._stats['failed_flushes'],
+            'last_flush_at': self._stats['last_flush_at'].isoformat() if self._stats['last_flush_at'] else None,
+            'flush_interval': self.flush_interval,
+            'max_pending': self.max_pending
+        }
+
+    def shutdown(self):
+        """Stop the flush thread and write out anything still buffered"""
+        self._stop.set()
+        self._wake.set()
+        if self.app is not None:
+            try:
+                self.flush()
+            except Exception:
+                pass
+
+    def _flush_quietly(self):
+        """flush() without raising; returns whether it succeeded"""
+        try:
+            self.flush()
+        except Exception:
+            return False  # Counted in failed_flushes; the views stay buffered for the next flush
+        return True
+
+    def _flush_on_teardown(self, exc):
+        with self._lock:
+            if not self._pending:
+                return
+        self._flush_quietly()
+
+    def _ensure_thread(self):
+        # Started lazily so importing the app (CLI, serverless cold start) spawns no threads.
+        # Without a flush interval it only runs when a full buffer wakes it
+        if self._thread is not None or self.app is None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='view-counter-flush', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        interval = self.flush_interval if self.flush_interval and self.flush_interval > 0 else None
+        failures = 0
+        while not self._stop.is_set():
+            if failures:
+                # Back off, ignoring full-buffer wake-ups, until the database takes writes again
+                backoff = min((interval or 1.0) * 2 ** failures, MAX_FLUSH_BACKOFF)
+                if self._stop.wait(backoff):
+                    break
+            else:
+                self._wake.wait(interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break  # shutdown() writes the rest
+            failures = 0 if self._flush_quietly() else failures + 1
+
+view_counter = ViewCounter()